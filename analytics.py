@@ -0,0 +1,199 @@
+"""
+Валидация шкал на когорте: чувствительность и специфичность при каждом
+пороге, ROC-кривая, AUC и бутстреп-доверительные интервалы
+
+Баллы шкал — небольшие целые числа, поэтому вся когорта сводится
+к гистограмме «балл × исход», которая накапливается блоками (файл любого
+размера читается за один проход). Чувствительность и специфичность при
+всех порогах «балл ≥ c» получаются кумулятивными суммами гистограммы,
+AUC — по той же гистограмме с учётом совпадающих баллов.
+
+Бутстреп по пациентам эквивалентен выборке числа пациентов в каждой
+ячейке гистограммы из мультиномиального распределения с вероятностями
+ячеек, поэтому 1000 повторов не зависят от размера когорты: считается
+матрица повторы × ячейки, а не повторная выборка миллионов строк.
+
+Пример:
+    python analytics.py scores.csv --outcome icu --bootstrap 1000 --output thresholds.csv
+    python analytics.py vitals.parquet --outcome icu --from-vitals
+"""
+
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from calculations import SCALE_PARAMS, calculate_all_batch
+
+SCALE_IDS = tuple(SCALE_PARAMS)
+DEFAULT_BOOTSTRAP = 1000
+DEFAULT_CONFIDENCE = 0.95
+
+def _outcome(outcome):
+    """Исход в виде массива 0/1 и маски строк с известным исходом"""
+    if hasattr(outcome, 'to_numpy'):
+        outcome = outcome.to_numpy(dtype=np.float64, na_value=np.nan)
+    outcome = np.asarray(outcome, dtype=np.float64)
+    known = ~np.isnan(outcome)
+    if not np.isin(outcome[known], (0.0, 1.0)).all():
+        raise ValueError('Исход должен принимать значения 0/1 (или быть пустым)')
+    return np.where(known, outcome, 0).astype(np.int64), known
+
+def score_histogram(scores, outcome, size=0):
+    """Гистограмма (балл, исход): массив (число баллов, 2) — без исхода и с исходом"""
+    outcome, known = _outcome(outcome)
+    scores = np.asarray(scores, dtype=np.int64)
+    if not known.all():
+        scores, outcome = scores[known], outcome[known]
+    if len(scores):
+        if scores.min() < 0:
+            raise ValueError('Баллы шкал не могут быть отрицательными')
+        size = max(size, int(scores.max()) + 1)
+    return np.bincount(scores * 2 + outcome, minlength=2 * size).reshape(-1, 2)
+
+def add_histograms(left, right):
+    """Сумма гистограмм разной длины"""
+    if len(left) < len(right):
+        left, right = right, left
+    total = left.copy()
+    total[:len(right)] += right
+    return total
+
+def curves(counts):
+    """
+    Чувствительность и специфичность при порогах «балл ≥ c» (c = 0 … число баллов − 1) и AUC
+
+    counts — гистограмма (…, баллы, 2); ведущие оси (например, повторы бутстрепа)
+    обрабатываются векторно.
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    negatives, positives = counts[..., 0], counts[..., 1]
+    total_negative = negatives.sum(axis=-1, keepdims=True)
+    total_positive = positives.sum(axis=-1, keepdims=True)
+    # Истинно положительные при пороге c — пациенты с исходом и баллом ≥ c
+    true_positive = np.cumsum(positives[..., ::-1], axis=-1)[..., ::-1]
+    # Истинно отрицательные при пороге c — пациенты без исхода с баллом < c
+    true_negative = np.cumsum(negatives, axis=-1) - negatives
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sensitivity = true_positive / total_positive
+        specificity = true_negative / total_negative
+        # Доля пар (с исходом, без исхода), где у пациента с исходом балл выше; равные баллы — половина
+        auc = (positives * (true_negative + 0.5 * negatives)).sum(axis=-1) / (total_positive * total_negative)[..., 0]
+    return sensitivity, specificity, auc
+
+def bootstrap(counts, n_bootstrap=DEFAULT_BOOTSTRAP, seed=0):
+    """Повторы бутстрепа по пациентам: гистограммы (n_bootstrap, баллы, 2)"""
+    counts = np.asarray(counts)
+    total = int(counts.sum())
+    rng = np.random.default_rng(seed)
+    samples = rng.multinomial(total, counts.ravel() / total, size=n_bootstrap)
+    return samples.reshape((n_bootstrap,) + counts.shape)
+
+def _interval(values, confidence):
+    """Процентильный интервал по оси повторов"""
+    tail = (1 - confidence) / 2 * 100
+    with np.errstate(invalid='ignore'):
+        return np.nanpercentile(values, [tail, 100 - tail], axis=0)
+
+def evaluate(counts, n_bootstrap=DEFAULT_BOOTSTRAP, confidence=DEFAULT_CONFIDENCE, seed=0):
+    """Показатели шкалы по гистограмме (балл, исход)"""
+    counts = np.asarray(counts, dtype=np.int64)
+    if counts[:, 0].sum() == 0 or counts[:, 1].sum() == 0:
+        raise ValueError('В когорте должны быть пациенты и с исходом, и без него')
+    sensitivity, specificity, auc = curves(counts)
+    result = {
+        'cutoffs': np.arange(len(counts)),
+        'negatives': counts[:, 0],
+        'positives': counts[:, 1],
+        'sensitivity': sensitivity,
+        'specificity': specificity,
+        # ROC от порога выше максимального балла (0, 0) до порога 0 (1, 1)
+        'fpr': np.concatenate(([0.0], 1 - specificity[::-1])),
+        'tpr': np.concatenate(([0.0], sensitivity[::-1])),
+        'auc': float(auc)
+    }
+    if n_bootstrap:
+        boot_sensitivity, boot_specificity, boot_auc = curves(bootstrap(counts, n_bootstrap, seed))
+        result['auc_ci'] = tuple(float(value) for value in _interval(boot_auc, confidence))
+        result['sensitivity_ci'] = _interval(boot_sensitivity, confidence)
+        result['specificity_ci'] = _interval(boot_specificity, confidence)
+    return result
+
+def cohort_histograms(scored, outcome, scales=SCALE_IDS):
+    """Гистограммы по шкалам для рассчитанной когорты (результат calculate_all_batch)"""
+    return {scale_id: score_histogram(scored[f'{scale_id}_score'], outcome) for scale_id in scales}
+
+def evaluate_histograms(histograms, n_bootstrap=DEFAULT_BOOTSTRAP, confidence=DEFAULT_CONFIDENCE, seed=0):
+    """Показатели по накопленным гистограммам шкал"""
+    return {
+        scale_id: evaluate(counts, n_bootstrap, confidence, seed + index)
+        for index, (scale_id, counts) in enumerate(histograms.items())
+    }
+
+def analyze(scored, outcome, scales=SCALE_IDS, n_bootstrap=DEFAULT_BOOTSTRAP, confidence=DEFAULT_CONFIDENCE,
+            seed=0):
+    """Показатели всех шкал для рассчитанной когорты и исхода (0/1, пусто — исключается)"""
+    return evaluate_histograms(cohort_histograms(scored, outcome, scales), n_bootstrap, confidence, seed)
+
+def file_histograms(path, outcome, from_vitals=False, chunk_size=None, input_format=None):
+    """Гистограммы шкал по файлу за один проход блоками"""
+    from score_file import DEFAULT_CHUNK_SIZE, iter_chunks
+
+    keep = [outcome] if from_vitals else [outcome] + [f'{scale_id}_score' for scale_id in SCALE_IDS]
+    histograms = {scale_id: np.zeros((0, 2), dtype=np.int64) for scale_id in SCALE_IDS}
+    for chunk in iter_chunks(path, chunk_size or DEFAULT_CHUNK_SIZE, input_format, keep):
+        scored = calculate_all_batch(chunk) if from_vitals else chunk
+        for scale_id in SCALE_IDS:
+            scores = scored[f'{scale_id}_score']
+            if scores.isna().any():
+                raise ValueError(f'Нет баллов {scale_id} в части строк: рассчитайте файл или укажите --from-vitals')
+            histograms[scale_id] = add_histograms(histograms[scale_id], score_histogram(scores, chunk[outcome]))
+    return histograms
+
+def threshold_table(results):
+    """Таблица порогов всех шкал: чувствительность, специфичность, интервалы и индекс Юдена"""
+    frames = []
+    for scale_id, result in results.items():
+        frame = pd.DataFrame({
+            'scale': scale_id,
+            'cutoff': result['cutoffs'],
+            'negatives': result['negatives'],
+            'positives': result['positives'],
+            'sensitivity': result['sensitivity'],
+            'specificity': result['specificity']
+        })
+        if 'sensitivity_ci' in result:
+            frame['sensitivity_low'], frame['sensitivity_high'] = result['sensitivity_ci']
+            frame['specificity_low'], frame['specificity_high'] = result['specificity_ci']
+        frame['youden'] = frame['sensitivity'] + frame['specificity'] - 1
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+def main(argv=None):
+    """Точка входа командной строки"""
+    parser = argparse.ArgumentParser(description='ROC/AUC и пороги шкал сепсиса на когорте')
+    parser.add_argument('input', help='файл CSV, JSONL, Parquet или Arrow IPC с баллами (<шкала>_score) и исходом')
+    parser.add_argument('--outcome', required=True, help='столбец исхода (0/1)')
+    parser.add_argument('--from-vitals', action='store_true', help='рассчитать баллы по показателям из файла')
+    parser.add_argument('--bootstrap', type=int, default=DEFAULT_BOOTSTRAP, help='повторов бутстрепа (0 — без интервалов)')
+    parser.add_argument('--confidence', type=float, default=DEFAULT_CONFIDENCE, help='уровень доверия')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='CSV-файл для таблицы порогов')
+    args = parser.parse_args(argv)
+    if args.bootstrap < 0 or not 0 < args.confidence < 1:
+        raise SystemExit('--bootstrap должен быть неотрицательным, --confidence — в интервале (0, 1)')
+
+    histograms = file_histograms(args.input, args.outcome, args.from_vitals)
+    results = evaluate_histograms(histograms, args.bootstrap, args.confidence, args.seed)
+    for scale_id, result in results.items():
+        interval = ''
+        if 'auc_ci' in result:
+            interval = f' [{result["auc_ci"][0]:.3f}; {result["auc_ci"][1]:.3f}]'
+        print(f'{scale_id:<8} AUC {result["auc"]:.3f}{interval}')
+    if args.output:
+        threshold_table(results).to_csv(args.output, index=False)
+        print(f'Таблица порогов сохранена в {args.output}', file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,219 @@
+import os
+import time
+import uuid
+
 import streamlit as st
-import pandas as pd
-from utils.calculations import *
+import calculations
+import instrumentation
+from instrumentation import timed
+# Обёртки замера времени ставятся до импорта функций расчёта по имени (только при SEPSIS_METRICS=1)
+instrumentation.install(calculations)
+from calculations import *
+from cache import LRUCache, values_key
+from sensitivity import grid, thresholds
+from store import AssessmentStore
+from trends import TrendBuffer, trend_figure
+
+# Размер общих для всех сессий кэшей результатов (на каждую шкалу) и их отображения
+CACHE_SIZE = 256
+
+# Число расчётов, сохраняемых в тренде сессии
+TREND_CAPACITY = 10_000
+
+# База данных оценок и число оценок в истории пациента
+DB_PATH = os.environ.get('SEPSIS_DB', 'assessments.db')
+HISTORY_SIZE = 10
+
+# Версия определений шкал: при её изменении кэши создаются заново
+CACHE_VERSION = tuple(SCALE_VERSIONS.items())
+
+# Отображение шкал
+SCALES_DISPLAY = {
+    'sirs': {'name': 'SIRS', 'color': '#FF6B6B'},
+    'qsofa': {'name': 'qSOFA', 'color': '#4ECDC4'},
+    'omqsofa': {'name': 'omqSOFA', 'color': '#45B7D1'},
+    'moews': {'name': 'MOEWS', 'color': '#96CEB4'},
+    'sos': {'name': 'SOS', 'color': '#FFEAA7'}
+}
+
+# Краткие названия параметров для таблицы границ и осей сетки «что если»
+PARAM_NAMES = {
+    'temp': 'Температура, °C',
+    'hr': 'ЧСС, уд/мин',
+    'rr': 'ЧД, /мин',
+    'sbp': 'АД сист., мм рт.ст.',
+    'dbp': 'АД диаст., мм рт.ст.',
+    'spo2': 'SpO₂, %',
+    'wbc': 'Лейкоциты, ×10⁹/л',
+    'bands': 'Юные нейтрофилы, %',
+    'lactate': 'Лактат, ммоль/л',
+    'gcs': 'GCS',
+    'mental': 'Ментальный статус',
+    'o2_therapy': 'Кислородная терапия',
+    'pph': 'Тяжёлое ПРК/ССЗ'
+}
+
+# Пары параметров для сетки «что если» (ось X, ось Y)
+GRID_PAIRS = {
+    'ЧСС × АД систолическое': ('hr', 'sbp'),
+    'ЧД × SpO₂': ('rr', 'spo2'),
+    'Температура × ЧСС': ('temp', 'hr'),
+    'Лейкоциты × лактат': ('wbc', 'lactate')
+}
+RISK_COLORS = ('#4CAF50', '#FF9800', '#F44336')
+
+@st.cache_resource
+def get_caches(version):
+    """Кэши, общие для всех сессий сервера: результаты расчёта по разобранной записи и готовое отображение"""
+    return {
+        'results': LRUCache(CACHE_SIZE),
+        'view': LRUCache(CACHE_SIZE)
+    }
+
+@st.cache_resource
+def get_store(path):
+    """Хранилище оценок, общее для всех сессий сервера"""
+    return AssessmentStore(path)
+
+# pandas и plotly импортируются только при отображении результатов: холодный старт
+# страницы без результатов их не загружает (проверка — benchmarks/startup.py)
+
+def build_history(assessments):
+    """Таблица последних оценок пациента"""
+    import pandas as pd
+
+    return pd.DataFrame([
+        {
+            'Время': time.strftime('%d.%m.%Y %H:%M:%S', time.localtime(assessment['assessed_at'])),
+            **{SCALES_DISPLAY[scale_id]['name']: result['score'] for scale_id, result in assessment['results'].items()},
+            'Риск MOEWS': assessment['results']['moews']['riskClass']
+        }
+        for assessment in assessments
+    ])
+
+def build_results_view(results):
+    """HTML карточек шкал, сводная таблица и график по результатам расчёта"""
+    import pandas as pd
+    import plotly.express as px
+
+    cards = []
+    for scale_id, scale_info in SCALES_DISPLAY.items():
+        if scale_id in results:
+            result = results[scale_id]
+            cards.append(f"""
+                    <div class="scale-card">
+                        <div style="display: flex; justify-content: space-between; align-items: center;">
+                            <h3 style="color: {scale_info['color']}; margin: 0;">{scale_info['name']}</h3>
+                            <div>
+                                <span class="score-badge">{result['score']}</span>
+                                <span style="font-size: 0.8rem; color: #666;">/{result['totalParams']}</span>
+                            </div>
+                        </div>
+                        <div style="margin: 10px 0;">
+                            <span class="risk-{result['riskClass']}">🔸 {result['risk']}</span>
+                        </div>
+                        <p style="color: #555; font-size: 0.9rem; margin: 0;">{result['interpretation']}</p>
+                    </div>
+                    """)
+    
+    summary_data = []
+    for scale_id, result in results.items():
+        summary_data.append({
+            'Шкала': SCALES_DISPLAY[scale_id]['name'],
+            'Баллы': f"{result['score']}/{result['totalParams']}",
+            'Риск': result['risk'],
+            'Интерпретация': result['interpretation']
+        })
+    df_summary = pd.DataFrame(summary_data)
+    
+    # Создаем DataFrame для визуализации
+    scores_df = pd.DataFrame({
+        'Шкала': [SCALES_DISPLAY[sid]['name'] for sid in results.keys()],
+        'Баллы': [results[sid]['score'] for sid in results.keys()],
+        'Максимум': [results[sid]['totalParams'] for sid in results.keys()],
+        'Риск': [results[sid]['riskClass'] for sid in results.keys()]
+    })
+    
+    # График
+    fig = px.bar(scores_df, 
+                 x='Шкала', 
+                 y='Баллы',
+                 title='Результаты по всем шкалам',
+                 color='Риск',
+                 color_discrete_map={
+                     'low-risk': '#4CAF50',
+                     'medium-risk': '#FF9800',
+                     'high-risk': '#F44336'
+                 })
+    
+    # Добавляем линию максимума
+    fig.add_scatter(x=scores_df['Шкала'], 
+                   y=scores_df['Максимум'], 
+                   mode='lines+markers',
+                   name='Максимальный балл',
+                   line=dict(color='gray', dash='dash'))
+    
+    fig.update_layout(
+        xaxis_title="Шкала",
+        yaxis_title="Баллы",
+        showlegend=True
+    )
+    
+    return cards, df_summary, fig
+
+def _risk_label(risk_class):
+    """Подпись уровня риска по коду вида 'high-risk'"""
+    return RISK_LABELS[RISK_CLASS_NAMES.index(risk_class.split('-')[0])]
+
+def build_thresholds_view(values):
+    """Таблица ближайших изменений параметров, меняющих уровень риска шкал"""
+    import pandas as pd
+
+    rows = []
+    for scale_id, scale in thresholds(values).items():
+        for key, param in scale['params'].items():
+            if 'options' in param:
+                changes = [f"{option} → {_risk_label(option_result['riskClass'])}"
+                           for option, option_result in param['options'].items()
+                           if option_result['riskClass'] != scale['riskClass']]
+            else:
+                changes = [f"{crossing['condition']} ({crossing['delta']:+g}) → {_risk_label(crossing['riskClass'])}"
+                           for crossing in (param['riskDown'], param['riskUp']) if crossing is not None]
+            if changes:
+                rows.append({
+                    'Шкала': SCALES_DISPLAY[scale_id]['name'],
+                    'Параметр': PARAM_NAMES[key],
+                    'Значение': f"{param['value']:g}" if isinstance(param['value'], float) else param['value'],
+                    'Изменение риска': '; '.join(changes)
+                })
+    return pd.DataFrame(rows, columns=['Шкала', 'Параметр', 'Значение', 'Изменение риска'])
+
+def build_grid_figure(values, x_key, y_key, scale_id):
+    """Тепловая карта уровня риска шкалы по сетке двух параметров с отметкой пациента"""
+    import plotly.graph_objects as go
+
+    result = grid(values, x_key, y_key, scale_ids=(scale_id,))
+    fig = go.Figure(go.Heatmap(
+        x=result['x'],
+        y=result['y'],
+        z=result['levels'][scale_id],
+        customdata=result['scores'][scale_id],
+        zmin=0,
+        zmax=2,
+        colorscale=[[0, RISK_COLORS[0]], [0.5, RISK_COLORS[1]], [1, RISK_COLORS[2]]],
+        showscale=False,
+        hovertemplate=f'{PARAM_NAMES[x_key]}: %{{x:.1f}}<br>{PARAM_NAMES[y_key]}: %{{y:.1f}}'
+                      '<br>Баллы: %{customdata}<extra></extra>'
+    ))
+    fig.add_scatter(x=[values[x_key]], y=[values[y_key]], mode='markers', name='Пациент',
+                    marker=dict(color='black', size=12, symbol='x'))
+    fig.update_layout(
+        title=f"{SCALES_DISPLAY[scale_id]['name']}: уровень риска",
+        xaxis_title=PARAM_NAMES[x_key],
+        yaxis_title=PARAM_NAMES[y_key],
+        showlegend=False
+    )
+    return fig
 
 # Настройка страницы
 st.set_page_config(
@@ -61,13 +274,23 @@ if 'values' not in st.session_state:
     st.session_state.values = {}
 if 'results' not in st.session_state:
     st.session_state.results = {}
+if 'trend' not in st.session_state:
+    st.session_state.trend = TrendBuffer(TREND_CAPACITY)
+if 'session_patient' not in st.session_state:
+    st.session_state.session_patient = f'session-{uuid.uuid4().hex[:8]}'
 
 # Создание колонок для макета
 col1, col2 = st.columns([1, 1])
 
-with col1:
+with col1, timed('inputs'):
     st.markdown("### 📋 Введите параметры пациента")
     
+    # Идентификатор, под которым сохраняется история оценок
+    patient_id = st.text_input(
+        "ID пациента",
+        help="Оценки сохраняются под этим идентификатором; если он не указан — под идентификатором сеанса"
+    ).strip() or st.session_state.session_patient
+    
     # Создание вкладок для группировки параметров
     tab1, tab2, tab3 = st.tabs(["Основные", "Лабораторные", "Дополнительные"])
     
@@ -78,8 +301,8 @@ with col1:
         # Температура
         temp = st.number_input(
             "Температура тела (°C)",
-            min_value=20.0,
-            max_value=45.0,
+            min_value=INPUT_RANGES['temp'][0],
+            max_value=INPUT_RANGES['temp'][1],
             value=36.6,
             step=0.1,
             help="Норма: 36.0-37.5°C"
@@ -90,8 +313,8 @@ with col1:
         with col_hr_rr[0]:
             hr = st.number_input(
                 "ЧСС (уд/мин)",
-                min_value=0,
-                max_value=300,
+                min_value=INPUT_RANGES['hr'][0],
+                max_value=INPUT_RANGES['hr'][1],
                 value=80,
                 help="Норма: 60-100 уд/мин"
             )
@@ -99,8 +322,8 @@ with col1:
         with col_hr_rr[1]:
             rr = st.number_input(
                 "ЧД (/мин)",
-                min_value=0,
-                max_value=100,
+                min_value=INPUT_RANGES['rr'][0],
+                max_value=INPUT_RANGES['rr'][1],
                 value=16,
                 help="Норма: 12-20/мин"
             )
@@ -110,8 +333,8 @@ with col1:
         with col_bp[0]:
             sbp = st.number_input(
                 "АД систолическое (мм рт.ст.)",
-                min_value=0,
-                max_value=300,
+                min_value=INPUT_RANGES['sbp'][0],
+                max_value=INPUT_RANGES['sbp'][1],
                 value=120,
                 help="Норма: 90-140 мм рт.ст."
             )
@@ -119,8 +342,8 @@ with col1:
         with col_bp[1]:
             dbp = st.number_input(
                 "АД диастолическое (мм рт.ст.)",
-                min_value=0,
-                max_value=200,
+                min_value=INPUT_RANGES['dbp'][0],
+                max_value=INPUT_RANGES['dbp'][1],
                 value=80,
                 help="Норма: 60-90 мм рт.ст."
             )
@@ -128,8 +351,8 @@ with col1:
         # SpO2
         spo2 = st.slider(
             "SpO₂ (%)",
-            min_value=0,
-            max_value=100,
+            min_value=INPUT_RANGES['spo2'][0],
+            max_value=INPUT_RANGES['spo2'][1],
             value=98,
             help="Насыщение крови кислородом"
         )
@@ -141,8 +364,8 @@ with col1:
         # Лейкоциты
         wbc = st.number_input(
             "Лейкоциты (×10⁹/л)",
-            min_value=0.0,
-            max_value=100.0,
+            min_value=INPUT_RANGES['wbc'][0],
+            max_value=INPUT_RANGES['wbc'][1],
             value=7.0,
             step=0.1,
             help="Норма: 4.0-11.0 ×10⁹/л"
@@ -151,8 +374,8 @@ with col1:
         # Юные нейтрофилы
         bands = st.slider(
             "Юные нейтрофилы (%)",
-            min_value=0,
-            max_value=100,
+            min_value=INPUT_RANGES['bands'][0],
+            max_value=INPUT_RANGES['bands'][1],
             value=3,
             help="Норма: 1-6%"
         )
@@ -160,8 +383,8 @@ with col1:
         # Лактат
         lactate = st.number_input(
             "Лактат (ммоль/л)",
-            min_value=0.0,
-            max_value=20.0,
+            min_value=INPUT_RANGES['lactate'][0],
+            max_value=INPUT_RANGES['lactate'][1],
             value=1.2,
             step=0.1,
             help="Норма: 0.5-2.2 ммоль/л"
@@ -174,8 +397,8 @@ with col1:
         # ШКГ (GCS)
         gcs = st.slider(
             "Шкала комы Глазго (GCS)",
-            min_value=3,
-            max_value=15,
+            min_value=INPUT_RANGES['gcs'][0],
+            max_value=INPUT_RANGES['gcs'][1],
             value=15,
             help="15 - ясное сознание, 3 - глубокая кома"
         )
@@ -183,7 +406,7 @@ with col1:
         # Ментальный статус
         mental = st.radio(
             "Ментальный статус",
-            options=["alert", "not_alert"],
+            options=CHOICE_OPTIONS['mental'],
             format_func=lambda x: "Сознание ясное" if x == "alert" else "Сознание нарушено",
             index=0
         )
@@ -191,7 +414,7 @@ with col1:
         # Кислородная терапия
         o2_therapy = st.selectbox(
             "Кислородная терапия",
-            options=["air", "nasal", "mask"],
+            options=CHOICE_OPTIONS['o2_therapy'],
             format_func=lambda x: {
                 "air": "Атмосферный воздух",
                 "nasal": "Носовые канюли",
@@ -202,7 +425,7 @@ with col1:
         # ППК/ССЗ
         pph = st.radio(
             "Тяжёлое ПРК/Тяжелое ССЗ",
-            options=["no", "yes"],
+            options=CHOICE_OPTIONS['pph'],
             format_func=lambda x: "Нет" if x == "no" else "Да",
             index=0
         )
@@ -229,14 +452,14 @@ with col1:
         # Сохраняем в сессию
         st.session_state.values = values
         
-        # Выполняем расчёты
-        st.session_state.results = {
-            'sirs': calculate_sirs(values),
-            'qsofa': calculate_qsofa(values),
-            'omqsofa': calculate_omqsofa(values),
-            'moews': calculate_moews(values),
-            'sos': calculate_sos(values)
-        }
+        # Выполняем расчёты: запись разбирается один раз, результаты всех шкал
+        # берутся из общего кэша по разобранным значениям или считаются за один проход
+        record = calculations.parse_record(values)
+        st.session_state.results = get_caches(CACHE_VERSION)['results'].get_or_compute(
+            (record.numeric, record.choice), lambda: calculations.calculate_all(record)
+        )
+        st.session_state.trend.append_results(time.time(), st.session_state.results)
+        get_store(DB_PATH).add(patient_id, values, st.session_state.results)
         
         st.success("✅ Расчёты выполнены!")
     
@@ -244,99 +467,88 @@ with col1:
     if st.button("🗑️ Сбросить все значения", use_container_width=True):
         st.session_state.values = {}
         st.session_state.results = {}
+        st.session_state.trend = TrendBuffer(TREND_CAPACITY)
         st.rerun()
 
-with col2:
+with col2, timed('results'):
     st.markdown("### 📊 Результаты оценки риска")
     
     if not st.session_state.results:
         st.info("Введите параметры пациента и нажмите 'Рассчитать все шкалы'")
     else:
-        # Отображение результатов по шкалам
-        scales_display = {
-            'sirs': {'name': 'SIRS', 'color': '#FF6B6B'},
-            'qsofa': {'name': 'qSOFA', 'color': '#4ECDC4'},
-            'omqsofa': {'name': 'omqSOFA', 'color': '#45B7D1'},
-            'moews': {'name': 'MOEWS', 'color': '#96CEB4'},
-            'sos': {'name': 'SOS', 'color': '#FFEAA7'}
-        }
+        # Карточки, таблица и график строятся один раз для каждого набора значений
+        cards, df_summary, fig = get_caches(CACHE_VERSION)['view'].get_or_compute(
+            values_key(st.session_state['values']),
+            lambda: build_results_view(st.session_state.results)
+        )
         
-        for scale_id, scale_info in scales_display.items():
-            if scale_id in st.session_state.results:
-                result = st.session_state.results[scale_id]
-                
-                with st.container():
-                    st.markdown(f"""
-                    <div class="scale-card">
-                        <div style="display: flex; justify-content: space-between; align-items: center;">
-                            <h3 style="color: {scale_info['color']}; margin: 0;">{scale_info['name']}</h3>
-                            <div>
-                                <span class="score-badge">{result['score']}</span>
-                                <span style="font-size: 0.8rem; color: #666;">/{result['totalParams']}</span>
-                            </div>
-                        </div>
-                        <div style="margin: 10px 0;">
-                            <span class="risk-{result['riskClass']}">🔸 {result['risk']}</span>
-                        </div>
-                        <p style="color: #555; font-size: 0.9rem; margin: 0;">{result['interpretation']}</p>
-                    </div>
-                    """, unsafe_allow_html=True)
+        # Отображение результатов по шкалам
+        for card in cards:
+            with st.container():
+                st.markdown(card, unsafe_allow_html=True)
         
         # Сводная таблица
         st.markdown("---")
         st.markdown("#### 📈 Сводная таблица результатов")
-        
-        summary_data = []
-        for scale_id, result in st.session_state.results.items():
-            summary_data.append({
-                'Шкала': scales_display[scale_id]['name'],
-                'Баллы': f"{result['score']}/{result['totalParams']}",
-                'Риск': result['risk'],
-                'Интерпретация': result['interpretation']
-            })
-        
-        df_summary = pd.DataFrame(summary_data)
         st.dataframe(df_summary, use_container_width=True, hide_index=True)
         
         # Визуализация рисков
         st.markdown("---")
         st.markdown("#### 📊 Визуализация рисков")
+        st.plotly_chart(fig, use_container_width=True)
         
-        # Создаем DataFrame для визуализации
-        scores_df = pd.DataFrame({
-            'Шкала': [scales_display[sid]['name'] for sid in st.session_state.results.keys()],
-            'Баллы': [st.session_state.results[sid]['score'] for sid in st.session_state.results.keys()],
-            'Максимум': [st.session_state.results[sid]['totalParams'] for sid in st.session_state.results.keys()],
-            'Риск': [st.session_state.results[sid]['riskClass'] for sid in st.session_state.results.keys()]
-        })
-        
-        # График
-        import plotly.express as px
-        fig = px.bar(scores_df, 
-                     x='Шкала', 
-                     y='Баллы',
-                     title='Результаты по всем шкалам',
-                     color='Риск',
-                     color_discrete_map={
-                         'low-risk': '#4CAF50',
-                         'medium-risk': '#FF9800',
-                         'high-risk': '#F44336'
-                     })
+        # Что если: ближайшие границы, меняющие риск, и сетка по двум параметрам
+        st.markdown("---")
+        st.markdown("#### 🎯 Что если")
+        view_cache = get_caches(CACHE_VERSION)['view']
+        values_id = values_key(st.session_state['values'])
+        st.dataframe(
+            view_cache.get_or_compute(('thresholds', values_id),
+                                      lambda: build_thresholds_view(st.session_state['values'])),
+            use_container_width=True, hide_index=True
+        )
+        col_pair, col_scale = st.columns(2)
+        with col_pair:
+            pair_name = st.selectbox("Параметры сетки", list(GRID_PAIRS))
+        with col_scale:
+            grid_scale = st.selectbox("Шкала сетки", list(SCALES_DISPLAY),
+                                      format_func=lambda sid: SCALES_DISPLAY[sid]['name'])
+        st.plotly_chart(
+            view_cache.get_or_compute(('grid', values_id, pair_name, grid_scale),
+                                      lambda: build_grid_figure(st.session_state['values'],
+                                                                *GRID_PAIRS[pair_name], grid_scale)),
+            use_container_width=True
+        )
         
-        # Добавляем линию максимума
-        fig.add_scatter(x=scores_df['Шкала'], 
-                       y=scores_df['Максимум'], 
-                       mode='lines+markers',
-                       name='Максимальный балл',
-                       line=dict(color='gray', dash='dash'))
+        # История оценок пациента из базы данных
+        with st.expander(f"🗂️ История оценок: {patient_id}"):
+            st.dataframe(build_history(get_store(DB_PATH).latest(patient_id, HISTORY_SIZE)),
+                         use_container_width=True, hide_index=True)
         
-        fig.update_layout(
-            xaxis_title="Шкала",
-            yaxis_title="Баллы",
-            showlegend=True
+        # Динамика по всем расчётам сессии (ряды прореживаются до фиксированного числа точек)
+        if len(st.session_state.trend) >= 2:
+            st.markdown("---")
+            st.markdown("#### 📉 Динамика шкал")
+            st.plotly_chart(
+                trend_figure(st.session_state.trend,
+                             names={sid: info['name'] for sid, info in SCALES_DISPLAY.items()}),
+                use_container_width=True
+            )
+
+# Отладочная панель: статистика кэшей
+with st.sidebar.expander("🛠️ Отладка: кэш"), timed('sidebar'):
+    for cache_name, cache in get_caches(CACHE_VERSION).items():
+        stats = cache.stats()
+        st.markdown(
+            f"**{cache_name}**: попаданий {stats['hits']}, промахов {stats['misses']}, "
+            f"доля попаданий {stats['hitRate']:.0%}, записей {stats['size']}/{stats['maxsize']}, "
+            f"вытеснено {stats['evictions']}"
         )
-        
-        st.plotly_chart(fig, use_container_width=True)
+        if 'scales' in stats:
+            st.caption(", ".join(
+                f"{SCALES_DISPLAY[scale_id]['name']}: {scale_stats['hitRate']:.0%}"
+                for scale_id, scale_stats in stats['scales'].items()
+            ))
 
 # Информационный блок в футере
 st.markdown("---")
@@ -346,3 +558,6 @@ st.markdown("""
     <p>Для точной диагностики обратитесь к специалисту.</p>
 </div>
 """, unsafe_allow_html=True)
+
+# Выгрузка метрик в файл/эндпоинт Prometheus (только при SEPSIS_METRICS=1)
+instrumentation.export()
@@ -0,0 +1,190 @@
+"""
+Двоичный архив показателей для многолетних исследовательских выгрузок
+
+Архив — файл .npy с одномерным массивом записей фиксированной ширины:
+float32 для каждого числового параметра (NaN — нет значения) и uint8-код
+для категориальных (0 — нет значения, 1… — варианты из CHOICE_CODES,
+255 — неизвестное значение). Запись занимает 43 байта вместо ~60–80
+в CSV, порядок строк совпадает с исходным файлом.
+
+Числа хранятся с округлением до 3 знаков после запятой и при чтении
+округляются так же, поэтому значения с не более чем тремя знаками
+(все поля ввода приложения) восстанавливаются точно и баллы совпадают
+с расчётом по исходному файлу.
+
+Расчёт открывает архив через np.memmap и идёт блоками по chunk_size
+строк: в память процесса попадает только текущий блок, остальное читает
+и вытесняет страничный кэш ОС. Результаты пишутся в CSV/JSONL/Parquet/
+Arrow IPC или в компактный .npy (баллы, число учтённых параметров
+и уровень риска каждой шкалы — по одному байту).
+
+Пример:
+    python archive.py convert vitals.csv vitals.npy
+    python archive.py score vitals.npy scores.npy --chunk-size 1000000
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from calculations import (CHOICE_OPTIONS, CHOICE_PARAMS, NUMERIC_PARAMS, SCALE_PARAMS, calculate_all_batch,
+                          parse_batch, score_parsed_batch)
+from score_file import DEFAULT_CHUNK_SIZE, detect_format, iter_chunks, open_writer
+
+RECORD_DTYPE = np.dtype(
+    [(key, '<f4') for key in NUMERIC_PARAMS] + [(key, 'u1') for key in CHOICE_PARAMS]
+)
+SCALE_IDS = tuple(SCALE_PARAMS)
+RESULT_DTYPE = np.dtype(
+    [(f'{scale_id}_{field}', 'u1') for scale_id in SCALE_IDS for field in ('score', 'used', 'risk')]
+)
+
+# Коды вариантов — номера вариантов полей ввода, начиная с 1
+CHOICE_CODES = CHOICE_OPTIONS
+MISSING_CODE = 0
+UNKNOWN_CODE = 255
+# Неизвестный вариант не даёт баллов, но учитывается как заполненный параметр
+UNKNOWN_VALUE = 'other'
+
+DECIMALS = 3
+# Заголовок .npy фиксированного размера: после потоковой записи в нём обновляется число строк
+HEADER_SIZE = 512
+MAGIC = b'\x93NUMPY\x01\x00'
+
+_DECODE = {
+    key: np.array([None, *options] + [UNKNOWN_VALUE] * (UNKNOWN_CODE - len(options)), dtype=object)
+    for key, options in CHOICE_CODES.items()
+}
+
+def _header(rows):
+    """Заголовок .npy версии 1.0 длиной HEADER_SIZE байт для rows записей"""
+    text = repr({
+        'descr': np.lib.format.dtype_to_descr(RECORD_DTYPE),
+        'fortran_order': False,
+        'shape': (rows,)
+    })
+    length = HEADER_SIZE - len(MAGIC) - 2
+    text = text.ljust(length - 1) + '\n'
+    if len(text) != length:
+        raise ValueError('Описание записи не помещается в заголовок архива')
+    return MAGIC + length.to_bytes(2, 'little') + text.encode('latin1')
+
+def encode(data):
+    """Записи архива по DataFrame или словарю столбцов"""
+    parsed = parse_batch(data)
+    n = len(parsed[NUMERIC_PARAMS[0]])
+    records = np.empty(n, dtype=RECORD_DTYPE)
+    for key in NUMERIC_PARAMS:
+        records[key] = np.round(parsed[key], DECIMALS)
+    for key in CHOICE_PARAMS:
+        column = parsed[key]
+        codes = np.full(n, UNKNOWN_CODE, dtype=np.uint8)
+        codes[np.equal(column, None)] = MISSING_CODE
+        for code, option in enumerate(CHOICE_CODES[key], start=1):
+            codes[np.equal(column, option)] = code
+        records[key] = codes
+    return records
+
+def decode(records):
+    """Столбцы параметров по записям архива в виде результата parse_batch"""
+    columns = {key: np.round(records[key].astype(np.float64), DECIMALS) for key in NUMERIC_PARAMS}
+    for key in CHOICE_PARAMS:
+        columns[key] = _DECODE[key][records[key]]
+    return columns
+
+def convert(input_path, archive_path, input_format=None, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """Построение архива по файлу CSV/JSONL/Parquet/Arrow; возвращает число строк и время в секундах"""
+    rows = 0
+    started = time.perf_counter()
+    with open(archive_path, 'wb') as handle:
+        handle.write(_header(0))
+        for chunk in iter_chunks(input_path, chunk_size, input_format):
+            encode(chunk).tofile(handle)
+            rows += len(chunk)
+            if progress is not None:
+                progress(rows, time.perf_counter() - started)
+        handle.seek(0)
+        handle.write(_header(rows))
+    return rows, time.perf_counter() - started
+
+def open_archive(path):
+    """Архив как np.memmap только для чтения"""
+    records = np.load(path, mmap_mode='r')
+    if records.dtype != RECORD_DTYPE or records.ndim != 1:
+        raise ValueError(f'{path} не является архивом показателей')
+    return records
+
+def _score_results(columns, out):
+    """Баллы, число параметров и уровни риска блока в записи RESULT_DTYPE"""
+    for scale_id, (score, used_params, level) in score_parsed_batch(columns).items():
+        out[f'{scale_id}_score'] = score
+        out[f'{scale_id}_used'] = used_params
+        out[f'{scale_id}_risk'] = level
+
+def score_archive(archive_path, output_path, chunk_size=DEFAULT_CHUNK_SIZE, output_format=None, progress=None):
+    """Расчёт всех шкал по архиву блоками; возвращает число строк и время в секундах"""
+    records = open_archive(archive_path)
+    rows = len(records)
+    started = time.perf_counter()
+    output_format = 'npy' if output_path.lower().endswith('.npy') else detect_format(output_path, output_format)
+
+    if output_format == 'npy':
+        results = np.lib.format.open_memmap(output_path, mode='w+', dtype=RESULT_DTYPE, shape=(rows,))
+        for start in range(0, rows, chunk_size):
+            _score_results(decode(records[start:start + chunk_size]), results[start:start + chunk_size])
+            if progress is not None:
+                progress(min(start + chunk_size, rows), time.perf_counter() - started)
+        results.flush()
+        del results
+        return rows, time.perf_counter() - started
+
+    writer = open_writer(output_path, output_format)
+    try:
+        for start in range(0, max(rows, 1), chunk_size):
+            writer.write(pd.DataFrame(calculate_all_batch(decode(records[start:start + chunk_size]))))
+            if progress is not None:
+                progress(min(start + chunk_size, rows), time.perf_counter() - started)
+    finally:
+        writer.close()
+    return rows, time.perf_counter() - started
+
+def _report_progress(rows, elapsed):
+    """Вывод прогресса и пропускной способности в stderr"""
+    rate = rows / elapsed if elapsed > 0 else 0.0
+    print(f'{rows} строк, {elapsed:.1f} с, {rate:,.0f} строк/с', file=sys.stderr)
+
+def main(argv=None):
+    """Точка входа командной строки"""
+    parser = argparse.ArgumentParser(description='Двоичный архив показателей и расчёт шкал по нему')
+    commands = parser.add_subparsers(dest='command', required=True)
+    converter = commands.add_parser('convert', help='построить архив по CSV/JSONL/Parquet/Arrow')
+    converter.add_argument('input', help='входной файл')
+    converter.add_argument('archive', help='файл архива .npy')
+    converter.add_argument('--input-format', choices=['csv', 'jsonl', 'parquet', 'arrow'],
+                           help='формат входного файла')
+    scorer = commands.add_parser('score', help='рассчитать шкалы по архиву')
+    scorer.add_argument('archive', help='файл архива .npy')
+    scorer.add_argument('output', help='выходной файл .npy, CSV, JSONL, Parquet или Arrow IPC')
+    scorer.add_argument('--output-format', choices=['csv', 'jsonl', 'parquet', 'arrow'],
+                        help='формат выходного файла')
+    for command in (converter, scorer):
+        command.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                             help=f'строк в блоке (по умолчанию {DEFAULT_CHUNK_SIZE})')
+        command.add_argument('--quiet', action='store_true', help='не выводить прогресс по блокам')
+    args = parser.parse_args(argv)
+    if args.chunk_size <= 0:
+        raise SystemExit('--chunk-size должен быть положительным')
+
+    progress = None if args.quiet else _report_progress
+    if args.command == 'convert':
+        rows, elapsed = convert(args.input, args.archive, args.input_format, args.chunk_size, progress)
+    else:
+        rows, elapsed = score_archive(args.archive, args.output, args.chunk_size, args.output_format, progress)
+    rate = rows / elapsed if elapsed > 0 else 0.0
+    print(f'Готово: {rows} строк за {elapsed:.1f} с ({rate:,.0f} строк/с)', file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,3 @@
+"""
+Бенчмарки и нагрузочные тесты; запуск из корня проекта: python -m benchmarks.<модуль>
+"""
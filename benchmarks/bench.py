@@ -0,0 +1,224 @@
+"""
+Бенчмарки расчёта шкал на синтетической когорте
+
+Замеряются скалярные функции calculate_*, calculate_all (и компактные
+результаты), инкрементальный расчёт, пакетные функции, проверка входных данных (validation.py)
+и потоковая обработка файла на когортах заданных размеров. Результаты сохраняются в JSON; режим --compare сравнивает их
+с сохранённым базовым прогоном и завершается с кодом 1 при регрессии.
+
+Скалярные пути при больших размерах выполняются очень долго, поэтому
+по умолчанию ограничены --scalar-max-rows (0 — без ограничения);
+потоковая обработка ограничена --stream-max-rows.
+
+Пример:
+    python -m benchmarks.bench --output bench.json
+    python -m benchmarks.bench --sizes 1 10000 --compare bench.json --threshold 0.15
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from archive import convert, score_archive
+from benchmarks.synthetic import generate_cohort, to_records, write_csv, write_parquet
+from calculations import (BATCH_FUNCTIONS, SCALE_FUNCTIONS, calculate_all, calculate_all_batch,
+                          calculate_all_batch_compact, calculate_all_compact, parse_record)
+from incremental import PatientScorer
+from score_file import score_file
+from validation import validate
+
+DEFAULT_SIZES = [1, 10_000, 1_000_000, 10_000_000]
+GROUPS = ('scalar', 'batch', 'stream')
+# Число различных записей, по которым циклически идут скалярные замеры
+RECORD_POOL = 100_000
+MIN_TIME = 0.2
+
+def measure(run, repeat):
+    """Минимальное время одного вызова run() из repeat серий; короткие вызовы повторяются до MIN_TIME"""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            run()
+        elapsed = time.perf_counter() - started
+        if elapsed >= MIN_TIME or loops >= 1_000_000:
+            break
+        loops *= 10
+    best = elapsed / loops
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            run()
+        best = min(best, (time.perf_counter() - started) / loops)
+    return best
+
+def _cycle(records, rows, function):
+    """Вызов function для rows записей, циклически по пулу"""
+    pool = len(records)
+    def run():
+        for row in range(rows):
+            function(records[row % pool])
+    return run
+
+def scalar_cases(columns, rows):
+    """Скалярные замеры: (имя, функция без аргументов)"""
+    records = to_records(columns, min(rows, RECORD_POOL))
+    cases = [(f'scalar/{function.__name__}', _cycle(records, rows, function)) for function in SCALE_FUNCTIONS.values()]
+    cases.append(('scalar/calculate_all', _cycle(records, rows, lambda values: calculate_all(parse_record(values)))))
+    cases.append(('scalar/calculate_all_compact',
+                  _cycle(records, rows, lambda values: calculate_all_compact(parse_record(values)))))
+
+    scorer = PatientScorer(records[0])
+    updates = [(key, record[key]) for record in records for key in ('hr', 'lactate')]
+    def incremental():
+        for row in range(rows):
+            key, value = updates[row % len(updates)]
+            scorer.update(key, value)
+    cases.append(('scalar/incremental_update', incremental))
+    return cases
+
+def batch_cases(columns, rows):
+    """Пакетные замеры"""
+    cases = [(f'batch/{function.__name__}', lambda function=function: function(columns))
+             for function in BATCH_FUNCTIONS.values()]
+    cases.append(('batch/calculate_all_batch', lambda: calculate_all_batch(columns)))
+    cases.append(('batch/calculate_all_batch_compact', lambda: calculate_all_batch_compact(columns)))
+    frame = pd.DataFrame(columns)
+    cases.append(('batch/calculate_all_batch_dataframe', lambda: calculate_all_batch(frame)))
+    cases.append(('batch/validate', lambda: validate(frame)))
+    # Текстовые значения, как из CSV без разбора типов, с десятичной запятой
+    text = frame.astype('string')
+    text['temp'] = text['temp'].str.replace('.', ',', regex=False)
+    cases.append(('batch/validate_text', lambda: validate(text, decimal_comma=True)))
+    return cases
+
+def stream_cases(rows, seed, directory):
+    """Замеры потоковой обработки CSV, Parquet и архива .npy (подготовка файлов в замер не входит)"""
+    csv_path = os.path.join(directory, f'cohort_{rows}.csv')
+    parquet_path = os.path.join(directory, f'cohort_{rows}.parquet')
+    archive_path = os.path.join(directory, f'cohort_{rows}.npy')
+    write_csv(csv_path, rows, seed=seed)
+    write_parquet(parquet_path, rows, seed=seed)
+    convert(parquet_path, archive_path)
+    return [
+        ('stream/score_file_csv', lambda: score_file(csv_path, os.path.join(directory, f'scores_{rows}.csv'))),
+        ('stream/score_file_csv_quarantine',
+         lambda: score_file(csv_path, os.path.join(directory, f'scores_{rows}.csv'),
+                            quarantine=os.path.join(directory, f'quarantine_{rows}.csv'))),
+        ('stream/score_file_parquet',
+         lambda: score_file(parquet_path, os.path.join(directory, f'scores_{rows}.parquet'))),
+        ('stream/score_archive',
+         lambda: score_archive(archive_path, os.path.join(directory, f'scores_{rows}.npy')))
+    ]
+
+def run_benchmarks(sizes, groups, seed=0, repeat=3, scalar_max_rows=1_000_000, stream_max_rows=1_000_000,
+                   report=print):
+    """Прогон замеров; возвращает список результатов"""
+    results = []
+
+    def record(name, rows, run):
+        seconds = measure(run, repeat if rows < 1_000_000 else 1)
+        results.append({'name': name, 'rows': rows, 'seconds': seconds, 'rows_per_s': rows / seconds})
+        report(f'{name:<45} {rows:>10} строк {seconds:>12.6f} с {rows / seconds:>14,.0f} строк/с')
+
+    def skip(name, rows, reason):
+        results.append({'name': name, 'rows': rows, 'skipped': reason})
+        report(f'{name:<45} {rows:>10} строк  пропущено ({reason})')
+
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in sizes:
+            columns = generate_cohort(rows, seed=seed)
+            if 'scalar' in groups:
+                if scalar_max_rows and rows > scalar_max_rows:
+                    skip('scalar/*', rows, f'больше --scalar-max-rows={scalar_max_rows}')
+                else:
+                    for name, run in scalar_cases(columns, rows):
+                        record(name, rows, run)
+            if 'batch' in groups:
+                for name, run in batch_cases(columns, rows):
+                    record(name, rows, run)
+            del columns
+            if 'stream' in groups:
+                if stream_max_rows and rows > stream_max_rows:
+                    skip('stream/*', rows, f'больше --stream-max-rows={stream_max_rows}')
+                else:
+                    for name, run in stream_cases(rows, seed, directory):
+                        record(name, rows, run)
+    return results
+
+def compare(results, baseline, threshold):
+    """Сравнение с базовым прогоном; возвращает список регрессий"""
+    base = {(item['name'], item['rows']): item for item in baseline['results'] if 'seconds' in item}
+    regressions = []
+    print(f'\n{"замер":<45} {"строк":>10} {"база, с":>12} {"сейчас, с":>12} {"отношение":>10}')
+    for item in results:
+        reference = base.get((item['name'], item['rows']))
+        if reference is None or 'seconds' not in item:
+            continue
+        ratio = item['seconds'] / reference['seconds']
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  РЕГРЕССИЯ'
+            regressions.append({**item, 'baseline_seconds': reference['seconds'], 'ratio': ratio})
+        print(f'{item["name"]:<45} {item["rows"]:>10} {reference["seconds"]:>12.6f} '
+              f'{item["seconds"]:>12.6f} {ratio:>10.2f}{flag}')
+    return regressions
+
+def metadata(seed):
+    """Сведения об окружении прогона"""
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'seed': seed
+    }
+
+def main(argv=None):
+    """Точка входа командной строки"""
+    parser = argparse.ArgumentParser(description='Бенчмарки расчёта шкал сепсиса')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='размеры когорт, строк')
+    parser.add_argument('--groups', nargs='+', choices=GROUPS, default=list(GROUPS), help='группы замеров')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help='серий замера (для когорт меньше 1 млн строк)')
+    parser.add_argument('--scalar-max-rows', type=int, default=1_000_000,
+                        help='максимальный размер когорты для скалярных замеров (0 — без ограничения)')
+    parser.add_argument('--stream-max-rows', type=int, default=1_000_000,
+                        help='максимальный размер когорты для потоковых замеров (0 — без ограничения)')
+    parser.add_argument('--output', default='bench_results.json', help='файл результатов JSON')
+    parser.add_argument('--compare', help='файл JSON базового прогона для сравнения')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='допустимое замедление относительно базы (0.10 — 10%%)')
+    args = parser.parse_args(argv)
+
+    # База читается до прогона: --output может совпадать с --compare и перезаписать её
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as handle:
+            baseline = json.load(handle)
+
+    results = run_benchmarks(args.sizes, args.groups, args.seed, args.repeat,
+                             args.scalar_max_rows, args.stream_max_rows)
+    with open(args.output, 'w', encoding='utf-8') as handle:
+        json.dump({'meta': metadata(args.seed), 'results': results}, handle, ensure_ascii=False, indent=2)
+    print(f'Результаты сохранены в {args.output}')
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f'Обнаружено регрессий: {len(regressions)}')
+            sys.exit(1)
+        print('Регрессий не обнаружено')
+
+if __name__ == '__main__':
+    main()
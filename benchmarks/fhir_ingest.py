@@ -0,0 +1,128 @@
+"""
+Бенчмарк потокового приёма FHIR (fhir.py)
+
+Синтетическая когорта (benchmarks.synthetic) записывается ресурсами
+Observation: по наблюдению на заполненный числовой параметр, АД — панелью
+85354-9 с компонентами, часть температур — в °F, часть лактата — в мг/дл,
+у каждого пациента --visits наборов показателей с интервалом в час.
+Один и тот же набор ресурсов пишется как один Bundle и как NDJSON;
+для каждого файла замеряются время приёма и расчёта, ресурсы в секунду,
+МБ/с и прирост пикового RSS процесса (для второго файла — сверх пика первого).
+
+Пример:
+    python -m benchmarks.fhir_ingest --patients 100000 --visits 3
+"""
+
+import argparse
+import json
+import os
+import resource
+import tempfile
+
+import numpy as np
+
+from benchmarks.synthetic import generate_cohort
+from calculations import NUMERIC_PARAMS
+from fhir import score_fhir
+
+# Параметр -> (код LOINC, единица UCUM)
+_CODES = {
+    'temp': ('8310-5', 'Cel'),
+    'hr': ('8867-4', '/min'),
+    'rr': ('9279-1', '/min'),
+    'spo2': ('59408-5', '%'),
+    'wbc': ('6690-2', '10*3/uL'),
+    'bands': ('764-1', '%'),
+    'lactate': ('2524-7', 'mmol/L'),
+    'gcs': ('9269-2', '{score}')
+}
+START = 1_714_521_600  # 2024-05-01T00:00:00Z
+
+def _coding(code):
+    return {'coding': [{'system': 'http://loinc.org', 'code': code}]}
+
+def _quantity(value, unit):
+    return {'value': value, 'unit': unit, 'system': 'http://unitsofmeasure.org', 'code': unit}
+
+def observations(patients, visits=1, seed=0):
+    """Ресурсы Observation синтетической когорты (генератор словарей)"""
+    rng = np.random.default_rng(seed)
+    number = 0
+    for visit in range(visits):
+        columns = generate_cohort(patients, seed=seed + visit)
+        fahrenheit = rng.random(patients) < 0.1
+        mass_lactate = rng.random(patients) < 0.1
+        values = {key: columns[key].tolist() for key in NUMERIC_PARAMS}
+        for row in range(patients):
+            moment = np.datetime_as_string(np.datetime64(START + visit * 3600 + row % 3600, 's')) + 'Z'
+            common = {'status': 'final', 'subject': {'reference': f'Patient/{row}'}, 'effectiveDateTime': moment}
+            for key, (code, unit) in _CODES.items():
+                value = values[key][row]
+                if value != value:
+                    continue
+                if key == 'temp' and fahrenheit[row]:
+                    value, unit = round(value * 9 / 5 + 32, 1), '[degF]'
+                elif key == 'lactate' and mass_lactate[row]:
+                    value, unit = round(value * 9.008, 1), 'mg/dL'
+                number += 1
+                yield {'resourceType': 'Observation', 'id': str(number), **common,
+                       'code': _coding(code), 'valueQuantity': _quantity(value, unit)}
+            components = [
+                {'code': _coding(code), 'valueQuantity': _quantity(values[key][row], 'mm[Hg]')}
+                for key, code in (('sbp', '8480-6'), ('dbp', '8462-4'))
+                if values[key][row] == values[key][row]
+            ]
+            if components:
+                number += 1
+                yield {'resourceType': 'Observation', 'id': str(number), **common,
+                       'code': _coding('85354-9'), 'component': components}
+
+def write_ndjson(path, patients, visits=1, seed=0):
+    """NDJSON: по ресурсу на строку; возвращает число ресурсов"""
+    count = 0
+    with open(path, 'w', encoding='utf-8') as handle:
+        for observation in observations(patients, visits, seed):
+            handle.write(json.dumps(observation, separators=(',', ':')))
+            handle.write('\n')
+            count += 1
+    return count
+
+def write_bundle(path, patients, visits=1, seed=0):
+    """Один Bundle типа collection со всеми ресурсами; возвращает число ресурсов"""
+    count = 0
+    with open(path, 'w', encoding='utf-8') as handle:
+        handle.write('{"resourceType":"Bundle","type":"collection","entry":[')
+        for observation in observations(patients, visits, seed):
+            if count:
+                handle.write(',')
+            handle.write(json.dumps({'resource': observation}, separators=(',', ':')))
+            count += 1
+        handle.write(']}')
+    return count
+
+def _peak_rss_mb():
+    """Пиковый RSS процесса, МБ (Linux: ru_maxrss в КБ)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def main(argv=None):
+    """Точка входа командной строки"""
+    parser = argparse.ArgumentParser(description='Бенчмарк потокового приёма FHIR')
+    parser.add_argument('--patients', type=int, default=100_000, help='число пациентов')
+    parser.add_argument('--visits', type=int, default=3, help='наборов показателей на пациента')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, write in (('bundle', write_bundle), ('ndjson', write_ndjson)):
+            path = os.path.join(directory, f'observations.{name}.json')
+            resources = write(path, args.patients, args.visits, args.seed)
+            size_mb = os.path.getsize(path) / 2**20
+            rss_before = _peak_rss_mb()
+            rows, elapsed, counts = score_fhir([path], os.path.join(directory, 'scores.csv'))
+            growth = _peak_rss_mb() - rss_before
+            print(f'{name:<7} {size_mb:>8.0f} МБ {resources:>10,} ресурсов {rows:>9,} пациентов '
+                  f'{elapsed:>7.1f} с {counts["resources"] / elapsed:>10,.0f} ресурсов/с '
+                  f'{size_mb / elapsed:>6.1f} МБ/с  прирост пикового RSS {growth:.0f} МБ')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+"""
+Нагрузочный тест приложения Streamlit (app.py) с параллельными сеансами
+
+Каждый сеанс — отдельный streamlit.testing.v1.AppTest в своём потоке
+одного процесса, как сеансы сервера; кэши st.cache_resource (общие кэши
+результатов, хранилище оценок) общие для всех сеансов. Сеанс открывает
+страницу, затем --rounds раз вводит случайные показатели и нажимает
+«Рассчитать все шкалы» с паузой около --think секунд между нажатиями.
+
+AppTest меняет глобальное состояние Streamlit на время перезапуска,
+поэтому перезапуски выполняются по очереди под общей блокировкой.
+Для скрипта, который почти всё время занят Python-кодом, это близко
+к работе сервера под GIL: задержка сеанса — ожидание очереди плюс
+выполнение скрипта. Сериализация и передача по WebSocket в замер
+не входят.
+
+Для каждого числа сеансов выводятся перцентили задержки перезапуска
+(открытие страницы и расчёт отдельно), медиана чистого времени
+выполнения скрипта, перезапуски в секунду, загрузка CPU процесса
+и RSS (в среднем и максимум).
+
+Оценки пишутся во временную базу (SEPSIS_DB), если не указана --db.
+
+Пример:
+    python -m benchmarks.loadtest_app --sessions 50 100 200 --rounds 5 --think 0.5
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.loadtest_service import random_values
+from benchmarks.startup import APP_PATH
+
+CALCULATE_LABEL = 'Рассчитать все шкалы'
+PATIENT_LABEL = 'ID пациента'
+# Поля ввода приложения: параметр -> подпись виджета
+WIDGET_LABELS = {
+    'temp': 'Температура тела (°C)',
+    'hr': 'ЧСС (уд/мин)',
+    'rr': 'ЧД (/мин)',
+    'sbp': 'АД систолическое (мм рт.ст.)',
+    'dbp': 'АД диастолическое (мм рт.ст.)',
+    'spo2': 'SpO₂ (%)',
+    'wbc': 'Лейкоциты (×10⁹/л)',
+    'bands': 'Юные нейтрофилы (%)',
+    'lactate': 'Лактат (ммоль/л)',
+    'gcs': 'Шкала комы Глазго (GCS)',
+    'mental': 'Ментальный статус',
+    'o2_therapy': 'Кислородная терапия',
+    'pph': 'Тяжёлое ПРК/Тяжелое ССЗ'
+}
+PERCENTILES = (50, 90, 99)
+SAMPLE_INTERVAL = 0.1
+
+_RUN_LOCK = threading.Lock()
+
+def _widgets(at):
+    """Виджеты страницы по подписи"""
+    widgets = {}
+    for kind in ('number_input', 'slider', 'radio', 'selectbox', 'text_input', 'button'):
+        for widget in getattr(at, kind):
+            widgets[widget.label] = widget
+    return widgets
+
+def _button(widgets, text):
+    """Кнопка, подпись которой содержит text"""
+    return next(widget for label, widget in widgets.items() if text in label)
+
+class ResourceSampler:
+    """Фоновый замер CPU и RSS процесса"""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.rss = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def current_rss():
+        """Текущий RSS процесса, МБ (Linux: /proc/self/statm)"""
+        try:
+            with open('/proc/self/statm') as handle:
+                return int(handle.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+        except (OSError, ValueError):
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.rss.append(self.current_rss())
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self.cpu_started = sum(os.times()[:2])
+        self.rss.append(self.current_rss())
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.wall = time.perf_counter() - self.started
+        self.cpu = sum(os.times()[:2]) - self.cpu_started
+        return False
+
+class Session:
+    """Один сеанс пользователя"""
+
+    def __init__(self, script, index, rounds, think, seed, timeout):
+        self.at = AppTest.from_string(script, default_timeout=timeout)
+        self.patient_id = f'LOAD-{index:04d}'
+        self.rounds = rounds
+        self.think = think
+        self.rng = random.Random(seed * 100_003 + index)
+
+    def _run(self, kind, latencies):
+        """Перезапуск скрипта: (вид, задержка с ожиданием очереди, время выполнения)"""
+        queued = time.perf_counter()
+        with _RUN_LOCK:
+            started = time.perf_counter()
+            self.at.run()
+            finished = time.perf_counter()
+        latencies.append((kind, finished - queued, finished - started))
+        if self.at.exception:
+            raise RuntimeError(self.at.exception[0].message)
+
+    def __call__(self, latencies):
+        self._run('open', latencies)
+        widgets = _widgets(self.at)
+        widgets[PATIENT_LABEL].input(self.patient_id)
+        for _ in range(self.rounds):
+            time.sleep(self.rng.uniform(0, 2 * self.think))
+            for key, value in random_values(self.rng).items():
+                widgets[WIDGET_LABELS[key]].set_value(value)
+            _button(widgets, CALCULATE_LABEL).click()
+            self._run('calculate', latencies)
+            widgets = _widgets(self.at)
+
+def run_level(script, sessions, rounds, think, seed, timeout):
+    """Прогон sessions параллельных сеансов; задержки по видам перезапуска, ошибки и ресурсы"""
+    latencies = []
+    errors = []
+    clients = [Session(script, index, rounds, think, seed, timeout) for index in range(sessions)]
+
+    def worker(session):
+        try:
+            session(latencies)
+        except Exception as error:
+            errors.append(repr(error))
+
+    with ResourceSampler() as sampler, ThreadPoolExecutor(max_workers=sessions) as executor:
+        list(executor.map(worker, clients))
+    return latencies, errors, sampler
+
+def summarize(sessions, latencies, errors, sampler):
+    """Сводка прогона: перцентили задержки (мс), перезапуски/с, CPU и RSS"""
+    summary = {
+        'sessions': sessions,
+        'reruns': len(latencies),
+        'errors': len(errors),
+        'reruns_per_s': len(latencies) / sampler.wall,
+        'cpu_percent': 100 * sampler.cpu / sampler.wall,
+        'rss_mean_mb': float(np.mean(sampler.rss)),
+        'rss_max_mb': float(np.max(sampler.rss))
+    }
+    for kind in ('open', 'calculate'):
+        values = np.array([(latency, run) for name, latency, run in latencies if name == kind]).reshape(-1, 2) * 1000
+        if len(values):
+            for percentile, value in zip(PERCENTILES, np.percentile(values[:, 0], PERCENTILES)):
+                summary[f'{kind}_p{percentile}_ms'] = float(value)
+            summary[f'{kind}_max_ms'] = float(values[:, 0].max())
+            summary[f'{kind}_run_p50_ms'] = float(np.median(values[:, 1]))
+    return summary
+
+def main(argv=None):
+    """Точка входа командной строки"""
+    parser = argparse.ArgumentParser(description='Нагрузочный тест приложения Streamlit')
+    parser.add_argument('--app', default=APP_PATH, help='файл приложения')
+    parser.add_argument('--sessions', type=int, nargs='+', default=[50, 100, 200], help='число параллельных сеансов')
+    parser.add_argument('--rounds', type=int, default=5, help='расчётов на сеанс')
+    parser.add_argument('--think', type=float, default=0.5, help='средняя пауза между расчётами, с')
+    parser.add_argument('--timeout', type=float, default=120.0, help='предельное время одного перезапуска, с')
+    parser.add_argument('--db', help='файл базы оценок (по умолчанию — временный)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='файл JSON со сводкой')
+    args = parser.parse_args(argv)
+
+    directory = None
+    if args.db is None:
+        directory = tempfile.TemporaryDirectory()
+        args.db = os.path.join(directory.name, 'assessments.db')
+    os.environ['SEPSIS_DB'] = args.db
+    # Вне сервера Streamlit предупреждает о каждом вызове без контекста сеанса
+    logging.getLogger('streamlit.runtime.scriptrunner_utils.script_run_context').setLevel(logging.ERROR)
+    with open(args.app, encoding='utf-8') as handle:
+        script = handle.read()
+
+    results = []
+    try:
+        print(f'{"сеансов":>8} {"перезап.":>9} {"ошибок":>7} {"перез./с":>9} '
+              f'{"откр. p50":>10} {"p99":>8} {"расч. p50":>10} {"p90":>8} {"p99":>8} {"скрипт":>7} '
+              f'{"CPU, %":>7} {"RSS ср.":>8} {"RSS макс.":>10}')
+        for sessions in args.sessions:
+            latencies, errors, sampler = run_level(script, sessions, args.rounds, args.think, args.seed, args.timeout)
+            summary = summarize(sessions, latencies, errors, sampler)
+            results.append(summary)
+            print(f'{sessions:>8} {summary["reruns"]:>9} {summary["errors"]:>7} {summary["reruns_per_s"]:>9.1f} '
+                  f'{summary.get("open_p50_ms", 0):>10.0f} {summary.get("open_p99_ms", 0):>8.0f} '
+                  f'{summary.get("calculate_p50_ms", 0):>10.0f} {summary.get("calculate_p90_ms", 0):>8.0f} '
+                  f'{summary.get("calculate_p99_ms", 0):>8.0f} {summary.get("calculate_run_p50_ms", 0):>7.0f} '
+                  f'{summary["cpu_percent"]:>7.0f} '
+                  f'{summary["rss_mean_mb"]:>8.0f} {summary["rss_max_mb"]:>10.0f}')
+            for error in errors[:3]:
+                print(f'  ошибка: {error}')
+    finally:
+        if directory is not None:
+            directory.cleanup()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump(results, handle, ensure_ascii=False, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""
+Нагрузочный тест локального сервиса расчёта шкал (service.py)
+
+Для каждого уровня параллельности запускается заданное число клиентов
+с постоянными соединениями; каждый клиент отправляет запросы со случайными
+показателями пациента. Выводятся запросы/с и перцентили задержки p50/p99.
+
+Пример:
+    python -m benchmarks.loadtest_service --spawn --concurrency 1 8 32 128 --duration 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def random_values(rng):
+    """Случайный словарь values в диапазонах полей ввода приложения"""
+    return {
+        'temp': round(rng.uniform(34.0, 41.0), 1),
+        'hr': rng.randint(40, 180),
+        'rr': rng.randint(8, 40),
+        'sbp': rng.randint(70, 180),
+        'dbp': rng.randint(40, 120),
+        'spo2': rng.randint(82, 100),
+        'wbc': round(rng.uniform(2.0, 30.0), 1),
+        'bands': rng.randint(0, 20),
+        'lactate': round(rng.uniform(0.5, 6.0), 1),
+        'gcs': rng.randint(3, 15),
+        'mental': rng.choice(['alert', 'not_alert']),
+        'o2_therapy': rng.choice(['air', 'nasal', 'mask']),
+        'pph': rng.choice(['no', 'yes'])
+    }
+
+def build_request(host, port, payload):
+    """HTTP-запрос POST /score с телом JSON"""
+    body = json.dumps(payload).encode('utf-8')
+    head = (
+        'POST /score HTTP/1.1\r\n'
+        f'Host: {host}:{port}\r\n'
+        'Content-Type: application/json\r\n'
+        f'Content-Length: {len(body)}\r\n\r\n'
+    )
+    return head.encode('latin-1') + body
+
+async def read_response(reader):
+    """Код ответа и тело"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('Соединение закрыто сервером')
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value.strip())
+    body = await reader.readexactly(length)
+    return int(status_line.split()[1]), body
+
+async def client(host, port, deadline, rng, bulk, latencies, errors):
+    """Один клиент: последовательные запросы по одному соединению до истечения времени"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            payload = [random_values(rng) for _ in range(bulk)] if bulk > 1 else random_values(rng)
+            started = time.perf_counter()
+            writer.write(build_request(host, port, payload))
+            await writer.drain()
+            status, _ = await read_response(reader)
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+async def run_level(host, port, concurrency, duration, bulk, seed):
+    """Прогон одного уровня параллельности"""
+    latencies = []
+    errors = []
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        client(host, port, deadline, random.Random(seed + index), bulk, latencies, errors)
+        for index in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+    values = np.asarray(latencies) * 1000
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'rps': len(latencies) / elapsed,
+        'p50_ms': float(np.percentile(values, 50)) if values.size else float('nan'),
+        'p99_ms': float(np.percentile(values, 99)) if values.size else float('nan')
+    }
+
+async def wait_for_port(host, port, timeout=15.0):
+    """Ожидание готовности запущенного сервиса"""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f'Сервис на {host}:{port} не запустился за {timeout} с')
+
+async def run(args):
+    """Прогон всех уровней параллельности"""
+    await wait_for_port(args.host, args.port)
+    print(f'{"клиентов":>9} {"запросов":>9} {"ошибок":>7} {"запр/с":>9} {"p50, мс":>9} {"p99, мс":>9}')
+    results = []
+    for concurrency in args.concurrency:
+        result = await run_level(args.host, args.port, concurrency, args.duration, args.bulk, args.seed)
+        results.append(result)
+        print(f'{result["concurrency"]:>9} {result["requests"]:>9} {result["errors"]:>7} '
+              f'{result["rps"]:>9.0f} {result["p50_ms"]:>9.2f} {result["p99_ms"]:>9.2f}')
+    return results
+
+def main(argv=None):
+    """Точка входа командной строки"""
+    parser = argparse.ArgumentParser(description='Нагрузочный тест сервиса расчёта шкал')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 128],
+                        help='уровни параллельности (число клиентов)')
+    parser.add_argument('--duration', type=float, default=5.0, help='длительность уровня, с')
+    parser.add_argument('--bulk', type=int, default=1, help='пациентов в одном запросе')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--spawn', action='store_true', help='запустить service.py на время теста')
+    parser.add_argument('--window-ms', type=float, default=2.0, help='окно микропакета для --spawn')
+    parser.add_argument('--json', help='сохранить результаты в файл JSON')
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.spawn:
+        server = subprocess.Popen([
+            sys.executable, os.path.join(ROOT, 'service.py'),
+            '--host', args.host, '--port', str(args.port), '--window-ms', str(args.window_ms)
+        ], stdout=subprocess.DEVNULL)
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as handle:
+            json.dump(results, handle, ensure_ascii=False, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Бенчмарк планировщика повторных оценок (scheduler.py)
+
+Планировщик заполняется --patients пациентами с результатами синтетической
+когорты, затем замеряются отдельные операции: новый результат пациента
+(перепланирование и проверка тревоги), извлечение ближайшего пациента,
+ближайший срок, первые OVERDUE_LIMIT просроченных и полный их список.
+Для каждой операции выводятся медиана, 99-й перцентиль и максимум
+в микросекундах.
+
+Пример:
+    python -m benchmarks.scheduler --patients 50000 --operations 100000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import generate_cohort
+from calculations import calculate_all_batch
+from scheduler import REASSESSMENT_INTERVALS, ReassessmentScheduler
+
+POOL = 10_000
+# Сколько просроченных пациентов показывает список на экране
+OVERDUE_LIMIT = 100
+
+def result_pool(size, seed):
+    """Словари результатов шкал по синтетической когорте (только riskClass)"""
+    scores = calculate_all_batch(generate_cohort(size, seed=seed))
+    scales = [name[:-len('_riskClass')] for name in scores if name.endswith('_riskClass')]
+    return [
+        {scale_id: {'riskClass': scores[f'{scale_id}_riskClass'][row]} for scale_id in scales}
+        for row in range(size)
+    ]
+
+def _timings(run, count):
+    """Времена count вызовов run(i), мкс"""
+    timings = np.empty(count)
+    clock = time.perf_counter
+    for index in range(count):
+        started = clock()
+        run(index)
+        timings[index] = clock() - started
+    return timings * 1e6
+
+def bench(patients, operations, seed=0):
+    """Медиана, p99 и максимум по операциям, мкс"""
+    rng = np.random.default_rng(seed)
+    pool = result_pool(min(patients, POOL), seed)
+    scheduler = ReassessmentScheduler()
+    start = 1.7e9
+    # Пациенты поступают равномерно в течение интервала низкого риска
+    arrivals = start + rng.random(patients) * REASSESSMENT_INTERVALS[0]
+    for index in range(patients):
+        scheduler.update(f'P{index:06d}', pool[index % len(pool)], arrivals[index])
+    clock = start + REASSESSMENT_INTERVALS[0]
+
+    targets = rng.integers(0, patients, operations)
+    choices = rng.integers(0, len(pool), operations)
+    timings = {}
+    timings['update'] = _timings(
+        lambda i: scheduler.update(f'P{targets[i]:06d}', pool[choices[i]], clock + i * 0.01), operations)
+    timings['next_due'] = _timings(lambda i: scheduler.next_due(), operations)
+    now = clock + REASSESSMENT_INTERVALS[1]
+    overdue = len(scheduler.overdue(now))
+    timings['overdue'] = _timings(lambda i: scheduler.overdue(now, limit=OVERDUE_LIMIT), max(1, operations // 100))
+    timings['overdue_all'] = _timings(lambda i: scheduler.overdue(now), max(1, operations // 10_000))
+    popped = min(operations, len(scheduler))
+    timings['pop'] = _timings(lambda i: scheduler.pop(), popped)
+    summary = {
+        name: (float(np.median(values)), float(np.percentile(values, 99)), float(values.max()))
+        for name, values in timings.items()
+    }
+    return summary, overdue, len(scheduler.alerts)
+
+def main(argv=None):
+    """Точка входа командной строки"""
+    parser = argparse.ArgumentParser(description='Бенчмарк планировщика повторных оценок')
+    parser.add_argument('--patients', type=int, nargs='+', default=[50_000], help='число пациентов')
+    parser.add_argument('--operations', type=int, default=100_000, help='операций каждого вида')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    for patients in args.patients:
+        summary, overdue, alerts = bench(patients, args.operations, args.seed)
+        print(f'{patients:,} пациентов, просрочено {overdue:,}, тревог {alerts:,}')
+        print(f'  {"операция":<12} {"медиана, мкс":>13} {"p99, мкс":>10} {"максимум, мкс":>14}')
+        for name, (median, p99, worst) in summary.items():
+            print(f'  {name:<12} {median:>13.2f} {p99:>10.2f} {worst:>14.2f}')
+
+if __name__ == '__main__':
+    main()
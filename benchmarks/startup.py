@@ -0,0 +1,96 @@
+"""
+Замер холодного старта приложения: время модульных импортов app.py
+
+Импорты верхнего уровня app.py (вместе со streamlit) выполняются в новом
+процессе интерпретатора с -X importtime, --repeat раз; выводятся медиана
+времени и самые тяжёлые пакеты. Проверка завершается с кодом 1, если
+медиана превышает --budget или при старте загружен модуль из --forbid
+(по умолчанию pandas и plotly.express — они нужны только для отображения
+результатов).
+
+Пример:
+    python -m benchmarks.startup --budget 800 --repeat 5
+"""
+
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, 'app.py')
+DEFAULT_BUDGET_MS = 800
+DEFAULT_FORBIDDEN = ('pandas', 'plotly.express')
+TOP_PACKAGES = 8
+
+def startup_imports(path=APP_PATH):
+    """Код модульных импортов приложения"""
+    with open(path, encoding='utf-8') as handle:
+        tree = ast.parse(handle.read(), path)
+    return '\n'.join(ast.unparse(node) for node in tree.body
+                     if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+def _probe(imports, forbidden):
+    """Код процесса замера: время импортов и загруженные запрещённые модули"""
+    return '\n'.join((
+        'import sys, time',
+        'started = time.perf_counter()',
+        imports,
+        'elapsed = time.perf_counter() - started',
+        'import json',
+        f'print(json.dumps({{"seconds": elapsed, "forbidden": [m for m in {list(forbidden)!r} if m in sys.modules]}}))'
+    ))
+
+def _packages(importtime):
+    """Накопленное время импорта пакетов верхнего уровня из вывода -X importtime, мс"""
+    packages = {}
+    for line in importtime.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith(' ') or name.startswith('  '):
+            continue
+        packages[name.strip()] = int(cumulative) / 1000
+    return packages
+
+def measure(path=APP_PATH, forbidden=DEFAULT_FORBIDDEN, repeat=5):
+    """Медиана времени импортов (мс), время пакетов последнего запуска и загруженные запрещённые модули"""
+    code = _probe(startup_imports(path), forbidden)
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, (ROOT, os.environ.get('PYTHONPATH')))))
+    timings = []
+    for _ in range(repeat):
+        completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT, env=environment,
+                                   capture_output=True, text=True, check=True)
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        timings.append(result['seconds'] * 1000)
+    return statistics.median(timings), _packages(completed.stderr), result['forbidden']
+
+def main(argv=None):
+    """Точка входа командной строки"""
+    parser = argparse.ArgumentParser(description='Замер холодного старта приложения')
+    parser.add_argument('--app', default=APP_PATH, help='файл приложения')
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET_MS, help='допустимое время импортов, мс')
+    parser.add_argument('--forbid', nargs='*', default=list(DEFAULT_FORBIDDEN),
+                        help='модули, которые не должны загружаться при старте')
+    parser.add_argument('--repeat', type=int, default=5, help='число запусков')
+    args = parser.parse_args(argv)
+
+    median, packages, forbidden = measure(args.app, args.forbid, args.repeat)
+    print(f'Импорты {os.path.basename(args.app)}: медиана {median:.0f} мс (бюджет {args.budget:.0f} мс)')
+    for name, milliseconds in sorted(packages.items(), key=lambda item: -item[1])[:TOP_PACKAGES]:
+        print(f'  {name:<30} {milliseconds:>8.1f} мс')
+    failed = False
+    if median > args.budget:
+        print(f'Превышен бюджет холодного старта: {median:.0f} мс > {args.budget:.0f} мс')
+        failed = True
+    if forbidden:
+        print(f'При старте загружены модули, которые должны импортироваться лениво: {", ".join(forbidden)}')
+        failed = True
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Бенчмарк хранилища оценок SQLite (store.py)
+
+Замеряется скорость записи: по одной оценке в транзакции (как в приложении)
+и пакетами add_batch; затем база заполняется до --rows строк и замеряются
+запросы «последние N оценок пациента» и «пациенты с высоким риском сейчас».
+
+Пример:
+    python -m benchmarks.store --rows 10000000 --patients 10000 --db /tmp/assessments.db
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import generate_cohort, to_records
+from calculations import calculate_all, calculate_all_batch
+from store import AssessmentStore
+
+CHUNK = 100_000
+
+def remove_database(path):
+    """Удаление базы вместе с файлами журнала WAL"""
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+def bench_single(store, count, seed):
+    """Оценок в секунду при записи по одной в транзакции"""
+    records = to_records(generate_cohort(count, seed=seed))
+    results = [calculate_all(record) for record in records]
+    started = time.perf_counter()
+    for index, (record, result) in enumerate(zip(records, results)):
+        store.add(f'S{index % 100}', record, result)
+    return count / (time.perf_counter() - started)
+
+def fill(store, rows, patients, seed, report=print):
+    """Заполнение базы пакетами; возвращает оценок в секунду (с учётом подготовки строк)"""
+    rng = np.random.default_rng(seed)
+    clock = 1.7e9
+    elapsed = 0.0
+    for start in range(0, rows, CHUNK):
+        size = min(CHUNK, rows - start)
+        columns = generate_cohort(size, seed=seed + start)
+        scores = calculate_all_batch(columns)
+        patient_ids = [f'P{index:06d}' for index in rng.integers(0, patients, size)]
+        times = clock + np.arange(start, start + size, dtype=np.float64)
+        started = time.perf_counter()
+        store.add_batch(patient_ids, columns, scores, assessed_at=times)
+        elapsed += time.perf_counter() - started
+        if report and (start // CHUNK) % 10 == 9:
+            report(f'  записано {start + size:,} строк, {(start + size) / elapsed:,.0f} оценок/с')
+    return rows / elapsed
+
+def bench_queries(store, patients, repeat, seed):
+    """Медиана и максимум времени запросов, мс"""
+    rng = np.random.default_rng(seed)
+    timings = {'latest': [], 'high_risk': []}
+    for patient in rng.integers(0, patients, repeat):
+        started = time.perf_counter()
+        store.latest(f'P{patient:06d}', 10)
+        timings['latest'].append(time.perf_counter() - started)
+    for _ in range(max(1, repeat // 10)):
+        started = time.perf_counter()
+        high = store.high_risk('moews')
+        timings['high_risk'].append(time.perf_counter() - started)
+    summary = {name: (float(np.median(values)) * 1000, float(np.max(values)) * 1000) for name, values in timings.items()}
+    return summary, len(high)
+
+def main(argv=None):
+    """Точка входа командной строки"""
+    parser = argparse.ArgumentParser(description='Бенчмарк хранилища оценок SQLite')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='строк в базе для замера запросов')
+    parser.add_argument('--patients', type=int, default=10_000, help='число пациентов')
+    parser.add_argument('--single', type=int, default=2000, help='оценок для замера записи по одной')
+    parser.add_argument('--repeat', type=int, default=1000, help='запросов для замера')
+    parser.add_argument('--db', help='файл базы (по умолчанию — временный, удаляется после замера)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    directory = None
+    path = args.db
+    if path is None:
+        directory = tempfile.TemporaryDirectory()
+        path = os.path.join(directory.name, 'assessments.db')
+    remove_database(path)
+    try:
+        with AssessmentStore(path) as store:
+            print(f'Запись по одной оценке в транзакции: {bench_single(store, args.single, args.seed):,.0f} оценок/с')
+            print(f'Заполнение базы до {args.rows:,} строк пакетами по {CHUNK:,}:')
+            rate = fill(store, args.rows, args.patients, args.seed)
+            print(f'Пакетная запись: {rate:,.0f} оценок/с')
+            summary, high = bench_queries(store, args.patients, args.repeat, args.seed)
+            print(f'Последние 10 оценок пациента: медиана {summary["latest"][0]:.3f} мс, '
+                  f'максимум {summary["latest"][1]:.3f} мс')
+            print(f'Пациенты с высоким риском MOEWS ({high}): медиана {summary["high_risk"][0]:.3f} мс, '
+                  f'максимум {summary["high_risk"][1]:.3f} мс')
+            print(f'Размер базы: {os.path.getsize(path) / 2**20:,.0f} МБ')
+    finally:
+        if directory is not None:
+            directory.cleanup()
+
+if __name__ == '__main__':
+    main()
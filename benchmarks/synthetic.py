@@ -0,0 +1,121 @@
+"""
+Генератор синтетических акушерских пациентов для бенчмарков
+
+Показатели генерируются векторно с фиксированным seed: большая часть
+когорты — физиологическая норма беременных, меньшая — пациентки
+с признаками инфекции/сепсиса со смещёнными показателями. Значения
+округляются до шага полей ввода приложения, часть значений пропущена.
+"""
+
+import numpy as np
+
+from calculations import CHOICE_OPTIONS, CHOICE_PARAMS, INPUT_RANGES, NUMERIC_PARAMS
+
+# Параметры распределений: (норма, сепсис); для нормальных — (среднее, SD),
+# для логнормальных — (медиана, sigma)
+_NORMAL = {
+    'temp': ((36.8, 0.4), (38.4, 1.0)),
+    'hr': ((86, 12), (118, 20)),
+    'rr': ((17, 3), (25, 6)),
+    'sbp': ((116, 12), (96, 18)),
+    'dbp': ((72, 9), (58, 12)),
+    'gcs': ((15, 0), (13.5, 2.0))
+}
+_LOGNORMAL = {
+    'wbc': ((10.5, 0.25), (16.0, 0.45)),
+    'bands': ((3.0, 0.6), (9.0, 0.6)),
+    'lactate': ((1.2, 0.35), (3.0, 0.5))
+}
+# Вероятности вариантов CHOICE_OPTIONS: (норма, сепсис)
+_CHOICES = {
+    'mental': ((0.98, 0.02), (0.75, 0.25)),
+    'o2_therapy': ((0.93, 0.05, 0.02), (0.55, 0.30, 0.15)),
+    'pph': ((0.97, 0.03), (0.85, 0.15))
+}
+
+def _quantize(values, key):
+    """Ограничение диапазоном поля ввода и округление до его шага"""
+    # Диапазон поля ввода приложения; целые границы — поле с шагом 1, дробные — с шагом 0.1
+    low, high = INPUT_RANGES[key]
+    values = np.clip(values, low, high)
+    if isinstance(low, int):
+        return np.round(values)
+    return np.round(values, 1)
+
+def generate_cohort(n, seed=0, septic_rate=0.1, missing_rate=0.05):
+    """Когорта из n пациентов: словарь столбцов (float64 с NaN, object с None)"""
+    rng = np.random.default_rng(seed)
+    septic = rng.random(n) < septic_rate
+    columns = {}
+
+    for key, (normal, sepsis) in _NORMAL.items():
+        mean = np.where(septic, sepsis[0], normal[0])
+        sd = np.where(septic, sepsis[1], normal[1])
+        columns[key] = rng.normal(mean, sd)
+    for key, (normal, sepsis) in _LOGNORMAL.items():
+        median = np.where(septic, sepsis[0], normal[0])
+        sigma = np.where(septic, sepsis[1], normal[1])
+        columns[key] = median * np.exp(rng.normal(0.0, sigma))
+    # SpO2: дефицит насыщения от 100% распределён по гамма-закону
+    columns['spo2'] = 100 - rng.gamma(np.where(septic, 3.0, 1.5), np.where(septic, 2.5, 1.0))
+
+    for key in NUMERIC_PARAMS:
+        values = _quantize(columns[key], key)
+        values[rng.random(n) < missing_rate] = np.nan
+        columns[key] = values
+
+    for key, (normal, sepsis) in _CHOICES.items():
+        options = np.array(CHOICE_OPTIONS[key], dtype=object)
+        draw = rng.random(n)
+        normal_index = np.searchsorted(np.cumsum(normal), draw, side='right')
+        sepsis_index = np.searchsorted(np.cumsum(sepsis), draw, side='right')
+        index = np.minimum(np.where(septic, sepsis_index, normal_index), len(options) - 1)
+        values = options[index]
+        values[rng.random(n) < missing_rate] = None
+        columns[key] = values
+
+    return columns
+
+def to_records(columns, limit=None):
+    """Список словарей values (None — нет значения) для скалярных функций"""
+    n = len(columns['temp']) if limit is None else min(limit, len(columns['temp']))
+    numeric = {key: columns[key][:n].tolist() for key in NUMERIC_PARAMS}
+    choice = {key: columns[key][:n].tolist() for key in CHOICE_PARAMS}
+    records = []
+    for row in range(n):
+        record = {key: (None if values[row] != values[row] else values[row]) for key, values in numeric.items()}
+        for key, values in choice.items():
+            record[key] = values[row]
+        records.append(record)
+    return records
+
+def write_csv(path, n, seed=0, chunk_size=500_000):
+    """Запись когорты в CSV блоками (для бенчмарков потоковой обработки)"""
+    import pandas as pd
+
+    with open(path, 'w', encoding='utf-8', newline='') as handle:
+        for index, start in enumerate(range(0, n, chunk_size)):
+            size = min(chunk_size, n - start)
+            frame = pd.DataFrame(generate_cohort(size, seed=seed + index))
+            frame.insert(0, 'patient_id', np.arange(start, start + size))
+            frame.to_csv(handle, header=index == 0, index=False)
+
+def write_parquet(path, n, seed=0, chunk_size=500_000):
+    """Запись когорты в Parquet, по группе строк на блок"""
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for index, start in enumerate(range(0, n, chunk_size)):
+            size = min(chunk_size, n - start)
+            frame = pd.DataFrame(generate_cohort(size, seed=seed + index))
+            frame.insert(0, 'patient_id', np.arange(start, start + size))
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
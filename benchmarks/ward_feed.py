@@ -0,0 +1,101 @@
+"""
+Имитация потока показателей для монитора отделения и замер цикла обновления
+
+Режим генерации: в каталоге создаётся по файлу JSONL на пациента с начальными
+показателями, затем каждые --interval секунд у --changes случайных пациентов
+дописываются новые значения 1–3 параметров.
+
+Режим --measure: для каждого числа пациентов из --patients замеряется цикл
+WardMonitor (опрос каталога, пересчёт и выдача изменившихся пациентов)
+при --changes изменившихся пациентах за цикл.
+
+Пример:
+    python -m benchmarks.ward_feed --dir ward_feed --patients 200 --changes 20
+    python -m benchmarks.ward_feed --measure --patients 50 200 1000 --changes 20
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import generate_cohort, to_records
+from calculations import CHOICE_PARAMS, NUMERIC_PARAMS
+from ward_monitor import JsonlFeed, WardMonitor
+
+PARAMS = NUMERIC_PARAMS + CHOICE_PARAMS
+
+def patient_path(directory, index):
+    """Файл показателей пациента"""
+    return os.path.join(directory, f'patient_{index:05d}.jsonl')
+
+def append(directory, index, values):
+    """Дописывание строки показателей пациента"""
+    with open(patient_path(directory, index), 'a', encoding='utf-8') as handle:
+        handle.write(json.dumps({'patient_id': f'P{index:05d}', 'time': round(time.time(), 3), **values}) + '\n')
+
+def populate(directory, patients, seed=0):
+    """Начальные показатели всех пациентов"""
+    os.makedirs(directory, exist_ok=True)
+    for index, values in enumerate(to_records(generate_cohort(patients, seed=seed))):
+        append(directory, index, values)
+
+def change(directory, patients, changes, rng):
+    """Новые значения 1–3 параметров у changes случайных пациентов"""
+    fresh = to_records(generate_cohort(changes, seed=int(rng.integers(1 << 31))))
+    for index, values in zip(rng.choice(patients, size=min(changes, patients), replace=False), fresh):
+        keys = rng.choice(PARAMS, size=int(rng.integers(1, 4)), replace=False)
+        append(directory, int(index), {key: values[key] for key in keys})
+
+def measure(patients, changes, cycles, seed=0):
+    """Средняя и максимальная длительность цикла монитора, мс"""
+    rng = np.random.default_rng(seed)
+    with tempfile.TemporaryDirectory() as directory:
+        populate(directory, patients, seed)
+        monitor = WardMonitor(JsonlFeed(directory))
+        monitor.poll()
+        for _ in monitor.drain():
+            pass
+        timings = []
+        for _ in range(cycles):
+            change(directory, patients, changes, rng)
+            started = time.perf_counter()
+            monitor.poll()
+            for _ in monitor.drain():
+                pass
+            timings.append(time.perf_counter() - started)
+    timings = np.asarray(timings) * 1000
+    return float(timings.mean()), float(timings.max())
+
+def main(argv=None):
+    """Точка входа командной строки"""
+    parser = argparse.ArgumentParser(description='Имитация показателей для монитора отделения')
+    parser.add_argument('--dir', default='ward_feed', help='каталог файлов JSONL')
+    parser.add_argument('--patients', type=int, nargs='+', default=[200], help='число пациентов')
+    parser.add_argument('--changes', type=int, default=20, help='изменившихся пациентов за цикл')
+    parser.add_argument('--interval', type=float, default=2.0, help='интервал между изменениями, с')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--measure', action='store_true', help='замерить цикл монитора вместо генерации')
+    parser.add_argument('--cycles', type=int, default=50, help='циклов замера')
+    args = parser.parse_args(argv)
+
+    if args.measure:
+        print(f'{"пациентов":>10} {"изменений":>10} {"среднее, мс":>12} {"максимум, мс":>13}')
+        for patients in args.patients:
+            mean, worst = measure(patients, args.changes, args.cycles, args.seed)
+            print(f'{patients:>10} {args.changes:>10} {mean:>12.2f} {worst:>13.2f}')
+        return
+
+    patients = args.patients[0]
+    rng = np.random.default_rng(args.seed)
+    populate(args.dir, patients, args.seed)
+    print(f'Каталог {args.dir}: {patients} пациентов, {args.changes} изменений каждые {args.interval} с')
+    while True:
+        time.sleep(args.interval)
+        change(args.dir, patients, args.changes, rng)
+
+if __name__ == '__main__':
+    main()
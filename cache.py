@@ -0,0 +1,130 @@
+"""
+Ограниченный LRU-кэш со статистикой попаданий и кэш результатов по шкалам
+"""
+
+import threading
+from collections import OrderedDict
+
+_MISSING = object()
+
+class LRUCache:
+    """Потокобезопасный LRU-кэш фиксированного размера со счётчиками попаданий и вытеснений"""
+
+    def __init__(self, maxsize=256):
+        if maxsize <= 0:
+            raise ValueError('Размер кэша должен быть положительным')
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        """Значение по ключу с учётом попадания или промаха"""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """Запись значения; при переполнении вытесняется давно не использованный ключ"""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """Значение из кэша или результат compute(), сохранённый в кэш"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """Очистка кэша без сброса счётчиков"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """Счётчики кэша"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hitRate': self.hits / lookups if lookups else 0.0
+            }
+
+class ScaleCache:
+    """
+    Мемоизация функций calculate_* по шкалам: ключ каждой шкалы строится только
+    из параметров, которые она читает, поэтому пациенты с одинаковыми значениями
+    этих параметров получают один и тот же результат из кэша. Для каждой шкалы —
+    свой LRU-кэш размера maxsize. Результаты общие для всех вызывающих и не должны
+    изменяться на месте.
+    """
+
+    def __init__(self, functions, params, maxsize=1024, versions=None):
+        self.functions = dict(functions)
+        self.params = {scale_id: tuple(params[scale_id]) for scale_id in self.functions}
+        self.maxsize = maxsize
+        self.caches = {scale_id: LRUCache(maxsize) for scale_id in self.functions}
+        self.versions = dict(versions or {})
+
+    def calculate(self, scale_id, values):
+        """Результат шкалы scale_id для словаря values"""
+        key = tuple([values.get(name) for name in self.params[scale_id]])
+        cache = self.caches[scale_id]
+        try:
+            result = cache.get(key, _MISSING)
+        except TypeError:
+            # Нехэшируемые значения считаем без кэша
+            return self.functions[scale_id](values)
+        if result is _MISSING:
+            result = self.functions[scale_id](values)
+            cache.put(key, result)
+        return result
+
+    def calculate_all(self, values):
+        """Результаты всех шкал для словаря values"""
+        return {scale_id: self.calculate(scale_id, values) for scale_id in self.functions}
+
+    def invalidate(self, scale_id=None):
+        """Сброс записей одной шкалы или всех шкал (счётчики сохраняются)"""
+        for cached_id in ([scale_id] if scale_id is not None else self.caches):
+            self.caches[cached_id].clear()
+
+    def sync(self, versions):
+        """Сброс шкал, у которых изменился отпечаток определения; возвращает их список"""
+        changed = [scale_id for scale_id in self.caches if versions.get(scale_id) != self.versions.get(scale_id)]
+        for scale_id in changed:
+            self.invalidate(scale_id)
+        self.versions.update(versions)
+        return changed
+
+    def stats(self):
+        """Суммарные счётчики (в формате LRUCache.stats) и счётчики по шкалам в 'scales'"""
+        scales = {scale_id: cache.stats() for scale_id, cache in self.caches.items()}
+        total = {name: sum(item[name] for item in scales.values())
+                 for name in ('size', 'maxsize', 'hits', 'misses', 'evictions')}
+        lookups = total['hits'] + total['misses']
+        total['hitRate'] = total['hits'] / lookups if lookups else 0.0
+        total['scales'] = scales
+        return total
+
+def values_key(values):
+    """Хэшируемый ключ словаря values, не зависящий от порядка ключей"""
+    return tuple(sorted(values.items()))
@@ -2,347 +2,778 @@
 Модуль для расчёта диагностических шкал сепсиса
 """
 
+import hashlib
+from bisect import bisect_right
+
+import numpy as np
+
 def parse_float(value):
-    """Безопасное преобразование в float"""
-    if value is None or value == '':
+    """Безопасное преобразование в float (NaN считается отсутствующим значением)"""
+    if value is None or isinstance(value, str) and value == '':
         return None
     try:
-        return float(value)
+        result = float(value)
     except (ValueError, TypeError):
         return None
+    if result != result:
+        return None
+    return result
 
-def calculate_sirs(values):
-    """Расчёт шкалы SIRS"""
-    score = 0
-    used_params = 0
-    
-    temp = parse_float(values.get('temp'))
-    hr = parse_float(values.get('hr'))
-    rr = parse_float(values.get('rr'))
-    wbc = parse_float(values.get('wbc'))
-    
-    if temp is not None:
-        used_params += 1
-        if temp > 38 or temp < 36:
-            score += 1
-    
-    if hr is not None:
-        used_params += 1
-        if hr > 90:
-            score += 1
-    
-    if rr is not None:
-        used_params += 1
-        if rr > 20:
-            score += 1
-    
-    if wbc is not None:
-        used_params += 1
-        if wbc > 12 or wbc < 4:
-            score += 1
-    
-    risk = 'Высокий риск' if score >= 2 else 'Низкий риск'
-    risk_class = 'high' if score >= 2 else 'low'
-    interpretation = 'Пациент соответствует критериям SIRS' if score >= 2 else 'Пациент не соответствует критериям SIRS'
-    
-    return {
-        'score': score,
-        'usedParams': used_params,
+def parse_choice(value):
+    """Безопасное чтение категориального параметра (None, '' и NaN — нет значения)"""
+    if value is None or isinstance(value, str) and value == '':
+        return None
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+def _above(value):
+    """Наименьшее число, строго большее value: граница вида «> value» в таблице диапазонов"""
+    return float(np.nextafter(value, np.inf))
+
+# Описание шкал в виде таблиц.
+#
+# Для числового параметра задаются возрастающие нижние границы диапазонов
+# (значение, равное границе, относится к диапазону справа) и баллы: первый
+# элемент — баллы ниже первой границы, далее — по одному на каждый диапазон.
+# Значения между соседними диапазонами клинических критериев (например,
+# температура 38.05 между «37.5–38» и «38.1–38.9» в MOEWS) относятся
+# к диапазону с большим числом баллов.
+#
+# riskBreaks — нижние границы суммы баллов для следующих уровней риска,
+# riskLevels — код риска (0 — низкий, 1 — средний, 2 — высокий) для каждого
+# уровня, interpretations — текст интерпретации для каждого уровня.
+
+SCALES = {
+    'sirs': {
+        'name': 'SIRS',
         'totalParams': 4,
-        'risk': risk,
-        'riskClass': f'{risk_class}-risk',
-        'interpretation': interpretation
+        'numeric': {
+            'temp': ((36, _above(38)), (1, 0, 1)),
+            'hr': ((_above(90),), (0, 1)),
+            'rr': ((_above(20),), (0, 1)),
+            'wbc': ((4, _above(12)), (1, 0, 1))
+        },
+        'choice': {},
+        'riskBreaks': (2,),
+        'riskLevels': (0, 2),
+        'interpretations': ('Пациент не соответствует критериям SIRS', 'Пациент соответствует критериям SIRS')
+    },
+    'qsofa': {
+        'name': 'qSOFA',
+        'totalParams': 3,
+        'numeric': {
+            'sbp': ((100,), (1, 0)),
+            'rr': ((_above(22),), (0, 1)),
+            'gcs': ((13,), (1, 0))
+        },
+        'choice': {},
+        'riskBreaks': (2,),
+        'riskLevels': (0, 2),
+        'interpretations': ('Требуется наблюдение', 'Показана госпитализация в ОРИТ')
+    },
+    'omqsofa': {
+        'name': 'omqSOFA',
+        'totalParams': 3,
+        'numeric': {
+            'sbp': ((90,), (1, 0)),
+            'rr': ((_above(25),), (0, 1))
+        },
+        'choice': {
+            'mental': {'not_alert': 1}
+        },
+        'riskBreaks': (2,),
+        'riskLevels': (0, 2),
+        'interpretations': ('Требуется наблюдение', 'Показана госпитализация в ОРИТ')
+    },
+    'moews': {
+        'name': 'MOEWS',
+        'totalParams': 9,
+        'numeric': {
+            # Температура
+            'temp': ((35.1, _above(35.9), 37.5, _above(38), _above(38.9)), (3, 1, 0, 1, 2, 3)),
+            # ЧД
+            'rr': ((10, _above(11), 21, _above(29)), (3, 1, 0, 2, 3)),
+            # SpO2
+            'spo2': ((91, 94, _above(95)), (3, 2, 1, 0)),
+            # ЧСС
+            'hr': ((50, _above(59), 100, _above(109), _above(129)), (3, 2, 0, 1, 2, 3)),
+            # АД систолическое
+            'sbp': ((90, _above(99), 140, _above(149), _above(159)), (3, 1, 0, 1, 2, 3)),
+            # АД диастолическое
+            'dbp': ((_above(45), 90, _above(99), _above(109)), (1, 0, 1, 2, 3))
+        },
+        'choice': {
+            # Кислородная терапия
+            'o2_therapy': {'mask': 3, 'nasal': 2},
+            # Ментальный статус
+            'mental': {'not_alert': 3},
+            # ППК/риск ССЗ
+            'pph': {'yes': 3}
+        },
+        'riskBreaks': (3, 5),
+        'riskLevels': (0, 1, 2),
+        'interpretations': ('Текущий план лечения сохраняется', 'Наблюдения повторяются', 'Показана госпитализация в ОРИТ')
+    },
+    'sos': {
+        'name': 'SOS',
+        'totalParams': 8,
+        'numeric': {
+            # Температура
+            'temp': ((30, 32, 34, _above(35.9), 38.5, _above(38.9), _above(40.9)), (4, 3, 2, 1, 0, 1, 3, 4)),
+            # ЧСС
+            'hr': ((120, _above(129), _above(149), _above(179)), (0, 1, 2, 3, 4)),
+            # ЧД
+            'rr': ((6, 10, _above(11), 25, _above(34), _above(49)), (4, 2, 1, 0, 1, 3, 4)),
+            # АД систолическое
+            'sbp': ((70, _above(90)), (4, 2, 0)),
+            # SpO2
+            'spo2': ((85, 90, _above(91)), (4, 3, 1, 0)),
+            # Лейкоциты
+            'wbc': ((1, 3, _above(5.6), 17, _above(24.9), _above(39.9)), (4, 2, 1, 0, 1, 2, 4)),
+            # Юные нейтрофилы
+            'bands': ((10,), (0, 2)),
+            # Лактат
+            'lactate': ((4,), (0, 2))
+        },
+        'choice': {},
+        'riskBreaks': (6,),
+        'riskLevels': (0, 2),
+        'interpretations': ('Риск сепсиса низкий', 'Показана госпитализация в ОРИТ')
     }
+}
 
-def calculate_qsofa(values):
-    """Расчёт шкалы qSOFA"""
-    score = 0
-    used_params = 0
-    
-    sbp = parse_float(values.get('sbp'))
-    rr = parse_float(values.get('rr'))
-    gcs = parse_float(values.get('gcs'))
-    
-    if sbp is not None:
-        used_params += 1
-        if sbp < 100:
-            score += 1
-    
-    if rr is not None:
-        used_params += 1
-        if rr > 22:
-            score += 1
-    
-    if gcs is not None:
-        used_params += 1
-        if gcs < 13:
-            score += 1
-    
-    risk = 'Высокий риск' if score >= 2 else 'Низкий риск'
-    risk_class = 'high' if score >= 2 else 'low'
-    interpretation = 'Показана госпитализация в ОРИТ' if score >= 2 else 'Требуется наблюдение'
-    
+RISK_LABELS = ('Низкий риск', 'Средний риск', 'Высокий риск')
+RISK_CLASS_NAMES = ('low', 'medium', 'high')
+
+def _check_scale(scale_id, scale):
+    """Проверка согласованности таблицы шкалы"""
+    for key, (breaks, points) in scale['numeric'].items():
+        if len(points) != len(breaks) + 1:
+            raise ValueError(f'{scale_id}.{key}: баллов должно быть на один больше, чем границ')
+        if any(left >= right for left, right in zip(breaks, breaks[1:])):
+            raise ValueError(f'{scale_id}.{key}: границы диапазонов должны строго возрастать')
+    # Неотрицательные баллы — условие упакованного расчёта calculate_all
+    for key, points in [(key, points) for key, (_, points) in scale['numeric'].items()] + \
+            [(key, tuple(points.values())) for key, points in scale['choice'].items()]:
+        if min(points, default=0) < 0:
+            raise ValueError(f'{scale_id}.{key}: баллы должны быть неотрицательными')
+    levels = len(scale['riskBreaks']) + 1
+    if len(scale['riskLevels']) != levels or len(scale['interpretations']) != levels:
+        raise ValueError(f'{scale_id}: число уровней риска не совпадает с riskBreaks')
+
+for _scale_id, _scale in SCALES.items():
+    _check_scale(_scale_id, _scale)
+
+def _compile_scale(scale):
+    """Подготовка таблицы шкалы к расчёту: кортежи для bisect и массивы NumPy для np.searchsorted"""
     return {
-        'score': score,
-        'usedParams': used_params,
-        'totalParams': 3,
-        'risk': risk,
-        'riskClass': f'{risk_class}-risk',
-        'interpretation': interpretation
+        'numeric': tuple((key, tuple(breaks), tuple(points)) for key, (breaks, points) in scale['numeric'].items()),
+        'choice': tuple(scale['choice'].items()),
+        'params': {key: (tuple(breaks), tuple(points)) for key, (breaks, points) in scale['numeric'].items()},
+        'choiceParams': dict(scale['choice']),
+        'totalParams': scale['totalParams'],
+        'riskBreaks': tuple(scale['riskBreaks']),
+        'riskLevels': tuple(scale['riskLevels']),
+        'bands': tuple(
+            (RISK_LABELS[level], f'{RISK_CLASS_NAMES[level]}-risk', interpretation)
+            for level, interpretation in zip(scale['riskLevels'], scale['interpretations'])
+        ),
+        'numericArrays': tuple(
+            (key, np.asarray(breaks, dtype=np.float64), np.asarray(points, dtype=np.int64))
+            for key, (breaks, points) in scale['numeric'].items()
+        ),
+        'riskBreaksArray': np.asarray(scale['riskBreaks'], dtype=np.int64),
+        'riskLevelsArray': np.asarray(scale['riskLevels'], dtype=np.int64)
     }
 
-def calculate_omqsofa(values):
-    """Расчёт шкалы omqSOFA"""
-    score = 0
-    used_params = 0
-    
-    sbp = parse_float(values.get('sbp'))
-    rr = parse_float(values.get('rr'))
-    mental = values.get('mental')
-    
-    if sbp is not None:
-        used_params += 1
-        if sbp < 90:
-            score += 1
-    
-    if rr is not None:
-        used_params += 1
-        if rr > 25:
-            score += 1
-    
-    if mental is not None and mental != '':
-        used_params += 1
-        if mental == 'not_alert':
-            score += 1
-    
-    risk = 'Высокий риск' if score >= 2 else 'Низкий риск'
-    risk_class = 'high' if score >= 2 else 'low'
-    interpretation = 'Показана госпитализация в ОРИТ' if score >= 2 else 'Требуется наблюдение'
+_TABLES = {scale_id: _compile_scale(scale) for scale_id, scale in SCALES.items()}
+
+# Параметры, которые читает каждая шкала
+SCALE_PARAMS = {
+    scale_id: tuple(scale['numeric']) + tuple(scale['choice'])
+    for scale_id, scale in SCALES.items()
+}
+
+# Отпечатки определений шкал: меняются при любом изменении границ, баллов или интерпретаций
+SCALE_VERSIONS = {
+    scale_id: hashlib.sha1(repr(scale).encode('utf-8')).hexdigest()[:12]
+    for scale_id, scale in SCALES.items()
+}
+
+def _scale_result(table, score, used_params):
+    """Словарь результата шкалы по сумме баллов и числу учтённых параметров"""
+    risk, risk_class, interpretation = table['bands'][bisect_right(table['riskBreaks'], score)]
     
     return {
         'score': score,
         'usedParams': used_params,
-        'totalParams': 3,
+        'totalParams': table['totalParams'],
         'risk': risk,
-        'riskClass': f'{risk_class}-risk',
+        'riskClass': risk_class,
         'interpretation': interpretation
     }
 
-def calculate_moews(values):
-    """Расчёт шкалы MOEWS"""
+def scale_result(scale_id, score, used_params):
+    """Результат шкалы scale_id в формате calculate_* по готовой сумме баллов"""
+    return _scale_result(_TABLES[scale_id], score, used_params)
+
+def parameter_points(scale_id, key, value):
+    """Баллы одного параметра в шкале или None, если значение отсутствует"""
+    table = _TABLES[scale_id]
+    if key in table['params']:
+        value = parse_float(value)
+        if value is None:
+            return None
+        breaks, points = table['params'][key]
+        return points[bisect_right(breaks, value)]
+    value = parse_choice(value)
+    if value is None:
+        return None
+    return table['choiceParams'][key].get(value, 0)
+
+def _calculate_scale(table, values):
+    """Расчёт шкалы по её таблице: сумма баллов по диапазонам параметров"""
     score = 0
     used_params = 0
     
-    # Температура
-    temp = parse_float(values.get('temp'))
-    if temp is not None:
+    for key, breaks, points in table['numeric']:
+        value = values.get(key)
+        # Числа float и int используются напрямую, остальное разбирает parse_float
+        value_type = type(value)
+        if value_type is not float and value_type is not int:
+            value = parse_float(value)
+            if value is None:
+                continue
+        elif value != value:
+            continue
         used_params += 1
-        if temp >= 39 or temp <= 35:
-            score += 3
-        elif 38.1 <= temp <= 38.9:
-            score += 2
-        elif (35.1 <= temp <= 35.9) or (37.5 <= temp <= 38):
-            score += 1
-    
-    # ЧД
-    rr = parse_float(values.get('rr'))
-    if rr is not None:
-        used_params += 1
-        if rr >= 30 or rr < 10:
-            score += 3
-        elif 21 <= rr <= 29:
-            score += 2
-        elif 10 <= rr <= 11:
-            score += 1
-    
-    # SpO2
-    spo2 = parse_float(values.get('spo2'))
-    if spo2 is not None:
-        used_params += 1
-        if spo2 <= 90:
-            score += 3
-        elif 91 <= spo2 <= 93:
-            score += 2
-        elif 94 <= spo2 <= 95:
-            score += 1
-    
-    # Кислородная терапия
-    o2_therapy = values.get('o2_therapy')
-    if o2_therapy is not None and o2_therapy != '':
-        used_params += 1
-        if o2_therapy == 'mask':
-            score += 3
-        elif o2_therapy == 'nasal':
-            score += 2
-    
-    # ЧСС
-    hr = parse_float(values.get('hr'))
-    if hr is not None:
+        score += points[bisect_right(breaks, value)]
+    
+    for key, points in table['choice']:
+        value = values.get(key)
+        if type(value) is not str:
+            value = parse_choice(value)
+            if value is None:
+                continue
+        elif not value:
+            continue
         used_params += 1
-        if hr < 50 or hr >= 130:
-            score += 3
-        elif (50 <= hr <= 59) or (110 <= hr <= 129):
-            score += 2
-        elif 100 <= hr <= 109:
-            score += 1
+        score += points.get(value, 0)
     
-    # АД систолическое
-    sbp = parse_float(values.get('sbp'))
-    if sbp is not None:
-        used_params += 1
-        if sbp < 90 or sbp >= 160:
-            score += 3
-        elif 150 <= sbp <= 159:
-            score += 2
-        elif (90 <= sbp <= 99) or (140 <= sbp <= 149):
-            score += 1
-    
-    # АД диастолическое
-    dbp = parse_float(values.get('dbp'))
-    if dbp is not None:
-        used_params += 1
-        if dbp >= 110:
-            score += 3
-        elif 100 <= dbp <= 109:
-            score += 2
-        elif dbp <= 45 or (90 <= dbp <= 99):
-            score += 1
-    
-    # Ментальный статус
-    mental = values.get('mental')
-    if mental is not None and mental != '':
-        used_params += 1
-        if mental == 'not_alert':
-            score += 3
-    
-    # ППК/риск ССЗ
-    pph = values.get('pph')
-    if pph is not None and pph != '':
-        used_params += 1
-        if pph == 'yes':
-            score += 3
-    
-    # Определение риска
-    if score <= 2:
-        risk = 'Низкий риск'
-        risk_class = 'low'
-        interpretation = 'Текущий план лечения сохраняется'
-    elif score <= 4:
-        risk = 'Средний риск'
-        risk_class = 'medium'
-        interpretation = 'Наблюдения повторяются'
-    else:
-        risk = 'Высокий риск'
-        risk_class = 'high'
-        interpretation = 'Показана госпитализация в ОРИТ'
-    
-    return {
-        'score': score,
-        'usedParams': used_params,
-        'totalParams': 9,
-        'risk': risk,
-        'riskClass': f'{risk_class}-risk',
-        'interpretation': interpretation
-    }
+    return _scale_result(table, score, used_params)
+
+def calculate_sirs(values):
+    """Расчёт шкалы SIRS"""
+    return _calculate_scale(_TABLES['sirs'], values)
+
+def calculate_qsofa(values):
+    """Расчёт шкалы qSOFA"""
+    return _calculate_scale(_TABLES['qsofa'], values)
+
+def calculate_omqsofa(values):
+    """Расчёт шкалы omqSOFA"""
+    return _calculate_scale(_TABLES['omqsofa'], values)
+
+def calculate_moews(values):
+    """Расчёт шкалы MOEWS"""
+    return _calculate_scale(_TABLES['moews'], values)
 
 def calculate_sos(values):
     """Расчёт шкалы SOS"""
-    score = 0
-    used_params = 0
-    
-    # Температура
-    temp = parse_float(values.get('temp'))
-    if temp is not None:
-        used_params += 1
-        if temp > 40.9 or temp < 30:
-            score += 4
-        elif (39 <= temp <= 40.9) or (30 <= temp <= 31.9):
-            score += 3
-        elif 32 <= temp <= 33.9:
-            score += 2
-        elif (38.5 <= temp <= 38.9) or (34 <= temp <= 35.9):
-            score += 1
-    
-    # ЧСС
-    hr = parse_float(values.get('hr'))
-    if hr is not None:
-        used_params += 1
-        if hr > 179:
-            score += 4
-        elif 150 <= hr <= 179:
-            score += 3
-        elif 130 <= hr <= 149:
-            score += 2
-        elif 120 <= hr <= 129:
-            score += 1
-    
-    # ЧД
-    rr = parse_float(values.get('rr'))
-    if rr is not None:
-        used_params += 1
-        if rr > 49 or rr <= 5:
-            score += 4
-        elif 35 <= rr <= 49:
-            score += 3
-        elif 6 <= rr <= 9:
-            score += 2
-        elif (25 <= rr <= 34) or (10 <= rr <= 11):
-            score += 1
-    
-    # АД систолическое
-    sbp = parse_float(values.get('sbp'))
-    if sbp is not None:
-        used_params += 1
-        if sbp < 70:
-            score += 4
-        elif 70 <= sbp <= 90:
-            score += 2
-    
-    # SpO2
-    spo2 = parse_float(values.get('spo2'))
-    if spo2 is not None:
-        used_params += 1
-        if spo2 < 85:
-            score += 4
-        elif 85 <= spo2 <= 89:
-            score += 3
-        elif 90 <= spo2 <= 91:
-            score += 1
-    
-    # Лейкоциты
-    wbc = parse_float(values.get('wbc'))
-    if wbc is not None:
-        used_params += 1
-        if wbc > 39.9 or wbc < 1:
-            score += 4
-        elif (25 <= wbc <= 39.9) or (1 <= wbc <= 2.9):
-            score += 2
-        elif (17 <= wbc <= 24.9) or (3 <= wbc <= 5.6):
-            score += 1
-    
-    # Юные нейтрофилы
-    bands = parse_float(values.get('bands'))
-    if bands is not None:
-        used_params += 1
-        if bands >= 10:
-            score += 2
-    
-    # Лактат
-    lactate = parse_float(values.get('lactate'))
-    if lactate is not None:
-        used_params += 1
-        if lactate >= 4:
-            score += 2
-    
-    risk = 'Высокий риск' if score >= 6 else 'Низкий риск'
-    risk_class = 'high' if score >= 6 else 'low'
-    interpretation = 'Показана госпитализация в ОРИТ' if score >= 6 else 'Риск сепсиса низкий'
-    
+    return _calculate_scale(_TABLES['sos'], values)
+
+
+SCALE_FUNCTIONS = {
+    'sirs': calculate_sirs,
+    'qsofa': calculate_qsofa,
+    'omqsofa': calculate_omqsofa,
+    'moews': calculate_moews,
+    'sos': calculate_sos
+}
+
+NUMERIC_PARAMS = ('temp', 'hr', 'rr', 'sbp', 'dbp', 'spo2', 'wbc', 'bands', 'lactate', 'gcs')
+CHOICE_PARAMS = ('mental', 'o2_therapy', 'pph')
+
+# Границы и варианты полей ввода приложения
+INPUT_RANGES = {
+    'temp': (20.0, 45.0),
+    'hr': (0, 300),
+    'rr': (0, 100),
+    'sbp': (0, 300),
+    'dbp': (0, 200),
+    'spo2': (0, 100),
+    'wbc': (0.0, 100.0),
+    'bands': (0, 100),
+    'lactate': (0.0, 20.0),
+    'gcs': (3, 15)
+}
+CHOICE_OPTIONS = {
+    'mental': ('alert', 'not_alert'),
+    'o2_therapy': ('air', 'nasal', 'mask'),
+    'pph': ('no', 'yes')
+}
+
+# Нормализованная запись пациента и расчёт всех шкал за один проход
+
+_NAN = float('nan')
+
+class PatientRecord:
+    """Параметры пациента, разобранные один раз
+
+    numeric — кортеж float в порядке NUMERIC_PARAMS (NaN — нет значения),
+    choice — кортеж str или None в порядке CHOICE_PARAMS.
+    """
+
+    __slots__ = ('numeric', 'choice')
+
+    def __init__(self, numeric, choice):
+        self.numeric = numeric
+        self.choice = choice
+
+    def get(self, key, default=None):
+        """Значение параметра по имени (None — нет значения), как у словаря values"""
+        if key in _NUMERIC_INDEX:
+            value = self.numeric[_NUMERIC_INDEX[key]]
+            return default if value != value else value
+        if key in _CHOICE_INDEX:
+            value = self.choice[_CHOICE_INDEX[key]]
+            return default if value is None else value
+        return default
+
+    def as_values(self):
+        """Словарь в формате values (None — нет значения)"""
+        return {key: self.get(key) for key in NUMERIC_PARAMS + CHOICE_PARAMS}
+
+    def __repr__(self):
+        return f'PatientRecord({self.as_values()!r})'
+
+_NUMERIC_INDEX = {key: index for index, key in enumerate(NUMERIC_PARAMS)}
+_CHOICE_INDEX = {key: index for index, key in enumerate(CHOICE_PARAMS)}
+
+def parse_record(values):
+    """Разбор словаря values в PatientRecord: каждый параметр разбирается ровно один раз"""
+    get = values.get
+    numeric = []
+    for key in NUMERIC_PARAMS:
+        value = get(key)
+        value_type = type(value)
+        if value_type is int:
+            value = float(value)
+        elif value_type is not float:
+            value = parse_float(value)
+            if value is None:
+                value = _NAN
+        numeric.append(value)
+    choice = []
+    for key in CHOICE_PARAMS:
+        value = get(key)
+        if type(value) is not str or not value:
+            value = parse_choice(value)
+        choice.append(value)
+    return PatientRecord(tuple(numeric), tuple(choice))
+
+# Однопроходный расчёт записи: суммы всех шкал упакованы в одно целое.
+# Поле шкалы — SCORE_BITS бит суммы баллов и выше них биты числа учтённых
+# параметров; баллы неотрицательны и поле не переполняется, поэтому вклад
+# параметра во все шкалы сразу — одно целое, а сумма записи — сумма вкладов.
+_MAX_SCORE = max(
+    sum(max(points) for _, points in scale['numeric'].values())
+    + sum(max(points.values(), default=0) for points in scale['choice'].values())
+    for scale in SCALES.values()
+)
+_SCORE_BITS = _MAX_SCORE.bit_length()
+_SCORE_MASK = (1 << _SCORE_BITS) - 1
+_USED_BITS = max(len(params) for params in SCALE_PARAMS.values()).bit_length()
+_FIELD_BITS = _SCORE_BITS + _USED_BITS
+_FIELD_MASK = (1 << _FIELD_BITS) - 1
+_SCALE_SHIFTS = tuple(_FIELD_BITS * index for index in range(len(_TABLES)))
+
+def _build_record_terms():
+    """Вклады параметров в упакованную сумму
+
+    Для числового параметра — объединённые границы всех шкал и вклад каждого
+    диапазона между ними (один bisect на параметр вместо одного на шкалу);
+    для категориального — вклад каждого варианта с баллами и вклад прочих значений.
+    """
+    tables = tuple(zip(_SCALE_SHIFTS, _TABLES.values()))
+    numeric = []
+    for key in NUMERIC_PARAMS:
+        scales = [(shift, table['params'][key]) for shift, table in tables if key in table['params']]
+        bounds = tuple(sorted({bound for _, (breaks, _) in scales for bound in breaks}))
+        cells = []
+        for cell in range(len(bounds) + 1):
+            packed = 0
+            for shift, (breaks, points) in scales:
+                band = bisect_right(breaks, bounds[cell - 1]) if cell else 0
+                packed += (points[band] + (1 << _SCORE_BITS)) << shift
+            cells.append(packed)
+        numeric.append((bounds, tuple(cells)))
+    choice = []
+    for key in CHOICE_PARAMS:
+        scales = [(shift, table['choiceParams'][key]) for shift, table in tables if key in table['choiceParams']]
+        present = sum(1 << (shift + _SCORE_BITS) for shift, _ in scales)
+        options = {
+            option: present + sum(points.get(option, 0) << shift for shift, points in scales)
+            for _, points in scales for option in points
+        }
+        choice.append((options, present))
+    return tuple(numeric), tuple(choice)
+
+_NUMERIC_TERMS, _CHOICE_TERMS = _build_record_terms()
+
+# Для каждого значения поля шкалы (сумма баллов, число параметров) — словарь результата и номер диапазона риска
+_RESULT_TEMPLATES = tuple(
+    (scale_id, shift, tuple(
+        _scale_result(table, field & _SCORE_MASK, field >> _SCORE_BITS)
+        for field in range(1 << _FIELD_BITS)
+    ), tuple(
+        bisect_right(table['riskBreaks'], field & _SCORE_MASK)
+        for field in range(1 << _FIELD_BITS)
+    ))
+    for (scale_id, table), shift in zip(_TABLES.items(), _SCALE_SHIFTS)
+)
+
+def _record_scores(record):
+    """Упакованные суммы баллов и числа учтённых параметров всех шкал по PatientRecord"""
+    total = 0
+    for value, (bounds, cells) in zip(record.numeric, _NUMERIC_TERMS):
+        if value == value:
+            total += cells[bisect_right(bounds, value)]
+    for value, (options, present) in zip(record.choice, _CHOICE_TERMS):
+        if value is not None:
+            total += options.get(value, present)
+    return total
+
+def calculate_all(record):
+    """Расчёт всех шкал по одной записи (принимает PatientRecord или словарь values)"""
+    if not isinstance(record, PatientRecord):
+        record = parse_record(record)
+    total = _record_scores(record)
+    return {
+        scale_id: results[(total >> shift) & _FIELD_MASK].copy()
+        for scale_id, shift, results, _ in _RESULT_TEMPLATES
+    }
+
+# Компактные результаты: числа и номер диапазона риска, тексты — из общей таблицы шкалы при показе
+
+# Ключ словаря результата -> атрибут ScaleResult
+_RESULT_KEYS = {
+    'score': 'score',
+    'usedParams': 'used_params',
+    'totalParams': 'total_params',
+    'risk': 'risk',
+    'riskClass': 'risk_class',
+    'interpretation': 'interpretation'
+}
+
+class ScaleResult:
+    """Результат шкалы без собственных строк
+
+    Хранит баллы, число учтённых параметров и номер диапазона риска;
+    подпись риска, класс и интерпретация берутся из таблицы шкалы при
+    обращении. Читается по ключам как словарь calculate_* (result['riskClass']),
+    to_dict() возвращает сам словарь.
+    """
+
+    __slots__ = ('scale_id', 'score', 'used_params', 'band')
+
+    def __init__(self, scale_id, score, used_params, band=None):
+        self.scale_id = scale_id
+        self.score = score
+        self.used_params = used_params
+        self.band = bisect_right(_TABLES[scale_id]['riskBreaks'], score) if band is None else band
+
+    @property
+    def level(self):
+        """Код риска: 0 — низкий, 1 — средний, 2 — высокий"""
+        return _TABLES[self.scale_id]['riskLevels'][self.band]
+
+    @property
+    def total_params(self):
+        return _TABLES[self.scale_id]['totalParams']
+
+    @property
+    def risk(self):
+        return _TABLES[self.scale_id]['bands'][self.band][0]
+
+    @property
+    def risk_class(self):
+        return _TABLES[self.scale_id]['bands'][self.band][1]
+
+    @property
+    def interpretation(self):
+        return _TABLES[self.scale_id]['bands'][self.band][2]
+
+    def __getitem__(self, key):
+        return getattr(self, _RESULT_KEYS[key])
+
+    def get(self, key, default=None):
+        """Значение по ключу словаря calculate_*"""
+        return getattr(self, _RESULT_KEYS[key]) if key in _RESULT_KEYS else default
+
+    def keys(self):
+        return _RESULT_KEYS.keys()
+
+    def to_dict(self):
+        """Словарь результата в формате calculate_*"""
+        return _scale_result(_TABLES[self.scale_id], self.score, self.used_params)
+
+    def __eq__(self, other):
+        if isinstance(other, ScaleResult):
+            return (self.scale_id, self.score, self.used_params) == (other.scale_id, other.score, other.used_params)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f'ScaleResult({self.scale_id!r}, score={self.score}, used_params={self.used_params}, band={self.band})'
+
+def calculate_all_compact(record):
+    """Расчёт всех шкал по одной записи в виде {шкала: ScaleResult}"""
+    if not isinstance(record, PatientRecord):
+        record = parse_record(record)
+    total = _record_scores(record)
+    results = {}
+    for scale_id, shift, _, bands in _RESULT_TEMPLATES:
+        field = (total >> shift) & _FIELD_MASK
+        results[scale_id] = ScaleResult(scale_id, field & _SCORE_MASK, field >> _SCORE_BITS, bands[field])
+    return results
+
+def results_to_dicts(results):
+    """Результаты шкал (ScaleResult или словари) в словари формата calculate_*"""
     return {
+        scale_id: result.to_dict() if isinstance(result, ScaleResult) else result
+        for scale_id, result in results.items()
+    }
+
+# Пакетный (векторный) расчёт шкал по столбцам DataFrame или словаря массивов NumPy
+
+RISK_CLASSES = np.array(['low-risk', 'medium-risk', 'high-risk'], dtype=object)
+
+def _batch_length(data):
+    """Число строк в DataFrame или словаре массивов"""
+    if hasattr(data, 'columns'):
+        return len(data)
+    for column in data.values():
+        return len(column)
+    return 0
+
+def _batch_float(data, key, n):
+    """Векторное преобразование столбца в float64 (NaN — нет значения)"""
+    column = data.get(key)
+    if column is None:
+        return np.full(n, np.nan)
+    dtype = getattr(column, 'dtype', None)
+    if dtype is not None and dtype.kind in 'biuf':
+        if hasattr(column, 'to_numpy'):
+            return column.to_numpy(dtype=np.float64, na_value=np.nan)
+        return np.asarray(column, dtype=np.float64)
+    # Строки и смешанные типы разбираем так же, как parse_float
+    parsed = [parse_float(value) for value in column]
+    return np.array([np.nan if value is None else value for value in parsed], dtype=np.float64)
+
+def _batch_choice(data, key, n):
+    """Категориальный столбец как массив object (None — нет значения)"""
+    column = data.get(key)
+    if column is None:
+        return np.full(n, None, dtype=object)
+    if hasattr(column, 'to_numpy'):
+        column = column.to_numpy(dtype=object, na_value=None)
+    column = np.asarray(column, dtype=object)
+    missing = np.equal(column, None) | np.equal(column, '') | np.not_equal(column, column)
+    return np.where(missing.astype(bool), None, column)
+
+def _batch_columns(data, keys, n):
+    """Разбор нужных столбцов: числовые — в float64 с NaN, категориальные — в object с None"""
+    return {
+        key: _batch_choice(data, key, n) if key in CHOICE_PARAMS else _batch_float(data, key, n)
+        for key in keys
+    }
+
+def _band_index(breaks, column):
+    """Номер диапазона для каждого значения, то же, что np.searchsorted(breaks, column, side='right')
+
+    Для коротких таблиц границ подсчёт пересечённых границ выполняется
+    несколькими векторными сравнениями и заметно быстрее двоичного поиска
+    по неотсортированному столбцу.
+    """
+    index = np.zeros(len(column), dtype=np.intp)
+    for bound in breaks:
+        index += column >= bound
+    return index
+
+def _score_batch(table, columns, n):
+    """Баллы, число параметров и код риска по уже разобранным столбцам"""
+    score = np.zeros(n, dtype=np.int64)
+    used_params = np.zeros(n, dtype=np.int64)
+    
+    for key, breaks, points in table['numericArrays']:
+        column = columns[key]
+        present = ~np.isnan(column)
+        used_params += present
+        # Сравнения с NaN ложны, поэтому баллы пропущенных значений маскируются
+        score += points[_band_index(breaks, column)] * present
+    
+    for key, points in table['choice']:
+        column = columns[key]
+        used_params += np.not_equal(column, None).astype(bool)
+        for choice, value in points.items():
+            score += value * np.equal(column, choice).astype(bool)
+    
+    level = table['riskLevelsArray'][np.searchsorted(table['riskBreaksArray'], score, side='right')]
+    return score, used_params, level
+
+def _calculate_scale_batch(scale_id, data):
+    """Пакетный расчёт шкалы по её таблице"""
+    table = _TABLES[scale_id]
+    n = _batch_length(data)
+    keys = [key for key, _, _ in table['numericArrays']] + [key for key, _ in table['choice']]
+    score, used_params, level = _score_batch(table, _batch_columns(data, keys, n), n)
+    result = {
         'score': score,
         'usedParams': used_params,
-        'totalParams': 8,
-        'risk': risk,
-        'riskClass': f'{risk_class}-risk',
-        'interpretation': interpretation
+        'riskClass': RISK_CLASSES[level]
     }
+    if hasattr(data, 'columns'):
+        import pandas as pd
+        return pd.DataFrame(result, index=data.index)
+    return result
+
+def calculate_sirs_batch(data):
+    """Пакетный расчёт шкалы SIRS"""
+    return _calculate_scale_batch('sirs', data)
+
+def calculate_qsofa_batch(data):
+    """Пакетный расчёт шкалы qSOFA"""
+    return _calculate_scale_batch('qsofa', data)
+
+def calculate_omqsofa_batch(data):
+    """Пакетный расчёт шкалы omqSOFA"""
+    return _calculate_scale_batch('omqsofa', data)
+
+def calculate_moews_batch(data):
+    """Пакетный расчёт шкалы MOEWS"""
+    return _calculate_scale_batch('moews', data)
+
+def calculate_sos_batch(data):
+    """Пакетный расчёт шкалы SOS"""
+    return _calculate_scale_batch('sos', data)
+
+BATCH_FUNCTIONS = {
+    'sirs': calculate_sirs_batch,
+    'qsofa': calculate_qsofa_batch,
+    'omqsofa': calculate_omqsofa_batch,
+    'moews': calculate_moews_batch,
+    'sos': calculate_sos_batch
+}
+
+def parse_batch(data):
+    """Разбор всех параметров пакета: числовые — float64 с NaN, категориальные — object с None"""
+    return _batch_columns(data, NUMERIC_PARAMS + CHOICE_PARAMS, _batch_length(data))
+
+def score_parsed_batch(parsed):
+    """Баллы, число учтённых параметров и уровни риска (0–2) всех шкал по результату parse_batch"""
+    n = len(parsed[NUMERIC_PARAMS[0]])
+    return {scale_id: _score_batch(table, parsed, n) for scale_id, table in _TABLES.items()}
+
+def calculate_all_batch(data):
+    """Пакетный расчёт всех шкал: столбцы <шкала>_score, <шкала>_usedParams, <шкала>_riskClass"""
+    # Каждый столбец разбирается один раз и переиспользуется всеми шкалами
+    scored = score_parsed_batch(parse_batch(data))
+    
+    columns = {}
+    for scale_id, (score, used_params, level) in scored.items():
+        columns[f'{scale_id}_score'] = score
+        columns[f'{scale_id}_usedParams'] = used_params
+        columns[f'{scale_id}_riskClass'] = RISK_CLASSES[level]
+    if hasattr(data, 'columns'):
+        import pandas as pd
+        return pd.DataFrame(columns, index=data.index)
+    return columns
+
+# Наибольшая сумма баллов шкалы определяет разрядность массива баллов компактных результатов
+COMPACT_SCORE_DTYPE = np.min_scalar_type(_MAX_SCORE)
+
+class CompactResults:
+    """Результаты всех шкал пакета в типизированных массивах
+
+    scores, used_params и bands (номер диапазона риска) — массивы формы
+    (шкалы, строки) наименьшего подходящего беззнакового типа, шкалы —
+    в порядке SCALES. Строки риска не хранятся: result(), results() и
+    to_dict() собирают ScaleResult или словари calculate_* по строке,
+    to_columns() — столбцы calculate_all_batch.
+    """
+
+    __slots__ = ('scores', 'used_params', 'bands')
+
+    def __init__(self, scores, used_params, bands):
+        self.scores = scores
+        self.used_params = used_params
+        self.bands = bands
+
+    @classmethod
+    def from_scored(cls, scored):
+        """Из результата score_parsed_batch"""
+        scores, used_params, bands = [], [], []
+        for scale_id, (score, used, _) in scored.items():
+            scores.append(score)
+            used_params.append(used)
+            bands.append(np.searchsorted(_TABLES[scale_id]['riskBreaksArray'], score, side='right'))
+        shape = (len(_TABLES), len(scores[0]) if scores else 0)
+        return cls(
+            np.asarray(scores, dtype=COMPACT_SCORE_DTYPE).reshape(shape),
+            np.asarray(used_params, dtype=np.uint8).reshape(shape),
+            np.asarray(bands, dtype=np.uint8).reshape(shape)
+        )
+
+    def __len__(self):
+        return self.scores.shape[1]
+
+    @property
+    def nbytes(self):
+        """Объём массивов, байт"""
+        return self.scores.nbytes + self.used_params.nbytes + self.bands.nbytes
+
+    @property
+    def levels(self):
+        """Коды риска (0–2) формы (шкалы, строки)"""
+        levels = np.empty_like(self.bands)
+        for scale_index, table in enumerate(_TABLES.values()):
+            levels[scale_index] = table['riskLevelsArray'][self.bands[scale_index]]
+        return levels
+
+    def result(self, row, scale_id):
+        """ScaleResult шкалы scale_id для строки row"""
+        scale_index = _SCALE_INDEX[scale_id]
+        return ScaleResult(
+            scale_id, int(self.scores[scale_index, row]),
+            int(self.used_params[scale_index, row]), int(self.bands[scale_index, row])
+        )
+
+    def results(self, row):
+        """{шкала: ScaleResult} для строки row"""
+        return {scale_id: self.result(row, scale_id) for scale_id in _TABLES}
+
+    def to_dict(self, row):
+        """Результаты строки row в формате calculate_all"""
+        return {
+            scale_id: _scale_result(table, int(self.scores[scale_index, row]), int(self.used_params[scale_index, row]))
+            for scale_index, (scale_id, table) in enumerate(_TABLES.items())
+        }
+
+    def to_columns(self):
+        """Столбцы в формате calculate_all_batch (словарь массивов)"""
+        columns = {}
+        levels = self.levels
+        for scale_index, scale_id in enumerate(_TABLES):
+            columns[f'{scale_id}_score'] = self.scores[scale_index].astype(np.int64)
+            columns[f'{scale_id}_usedParams'] = self.used_params[scale_index].astype(np.int64)
+            columns[f'{scale_id}_riskClass'] = RISK_CLASSES[levels[scale_index]]
+        return columns
+
+_SCALE_INDEX = {scale_id: index for index, scale_id in enumerate(_TABLES)}
+
+def calculate_all_batch_compact(data):
+    """Пакетный расчёт всех шкал в CompactResults"""
+    return CompactResults.from_scored(score_parsed_batch(parse_batch(data)))
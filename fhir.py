@@ -0,0 +1,466 @@
+"""
+Потоковый приём показателей из выгрузок FHIR (ресурсы Observation)
+
+Вход — Bundle, NDJSON (по ресурсу или Bundle на строку, как в FHIR Bulk
+Data) или их последовательность, в том числе сжатые gzip (*.gz). Текст
+читается блоками и разбирается по одному значению JSON через
+json.JSONDecoder.raw_decode; у Bundle, не поместившегося в буфер, элементы
+entry разбираются по одному, поэтому в памяти никогда не находится весь
+файл — только последние значения параметров по пациентам.
+
+Наблюдения сопоставляются параметрам шкал по кодам LOINC (LOINC_CODES),
+включая компоненты панелей (например, панель АД 85354-9), единицы UCUM
+приводятся к единицам полей ввода (UNITS). Для каждого пациента хранится
+последнее по времени значение каждого параметра; при расчёте берутся
+значения не старше окна --window от последнего наблюдения пациента
+(или от --as-of, более поздние наблюдения тогда не учитываются).
+Категориальные параметры (ментальный статус, кислородная терапия, ПРК/ССЗ)
+из Observation не извлекаются.
+
+Пример:
+    python fhir.py export/Observation.ndjson scores.csv --window 24
+    python fhir.py bundle.json.gz scores.parquet --as-of 2024-05-01T12:00:00Z
+"""
+
+import argparse
+import gzip
+import json
+import re
+import sys
+import itertools
+import time
+from array import array
+from collections import Counter
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from calculations import NUMERIC_PARAMS
+from score_file import DEFAULT_CHUNK_SIZE, FORMATS, detect_format, open_writer, score_chunk
+
+LOINC_SYSTEM = 'http://loinc.org'
+
+# Код LOINC -> параметр шкал
+LOINC_CODES = {
+    '8310-5': 'temp',      # Температура тела
+    '8331-1': 'temp',      # Температура в полости рта
+    '8328-7': 'temp',      # Температура в подмышечной впадине
+    '8332-9': 'temp',      # Ректальная температура
+    '8333-7': 'temp',      # Температура барабанной перепонки
+    '8867-4': 'hr',        # ЧСС
+    '9279-1': 'rr',        # ЧД
+    '8480-6': 'sbp',       # АД систолическое
+    '8462-4': 'dbp',       # АД диастолическое
+    '59408-5': 'spo2',     # SpO2 по пульсоксиметрии
+    '2708-6': 'spo2',      # Насыщение кислородом артериальной крови
+    '6690-2': 'wbc',       # Лейкоциты, автоматический подсчёт
+    '26464-8': 'wbc',      # Лейкоциты
+    '764-1': 'bands',      # Палочкоядерные нейтрофилы на 100 лейкоцитов, ручной подсчёт
+    '26508-2': 'bands',    # Палочкоядерные нейтрофилы на 100 лейкоцитов
+    '2524-7': 'lactate',   # Лактат в сыворотке или плазме
+    '32693-4': 'lactate',  # Лактат в крови
+    '9269-2': 'gcs'        # Шкала комы Глазго, сумма
+}
+
+# Единицы (код UCUM или текст unit) -> (множитель, сдвиг) к единицам поля ввода;
+# None — значение без единиц (valueInteger или valueQuantity без unit/code)
+UNITS = {
+    'temp': {'Cel': (1.0, 0.0), '[degF]': (5 / 9, -32 * 5 / 9), 'K': (1.0, -273.15)},
+    'hr': {'/min': (1.0, 0.0), '{beats}/min': (1.0, 0.0), 'beats/min': (1.0, 0.0)},
+    'rr': {'/min': (1.0, 0.0), '{breaths}/min': (1.0, 0.0), 'breaths/min': (1.0, 0.0)},
+    'sbp': {'mm[Hg]': (1.0, 0.0), 'mmHg': (1.0, 0.0), 'kPa': (7.50062, 0.0)},
+    'dbp': {'mm[Hg]': (1.0, 0.0), 'mmHg': (1.0, 0.0), 'kPa': (7.50062, 0.0)},
+    'spo2': {'%': (1.0, 0.0), '1': (100.0, 0.0)},
+    'wbc': {'10*3/uL': (1.0, 0.0), '10*9/L': (1.0, 0.0), '/uL': (0.001, 0.0), '/mm3': (0.001, 0.0)},
+    'bands': {'%': (1.0, 0.0)},
+    # Молярная масса лактата 90.08 г/моль: 1 мг/дл = 10 / 90.08 ммоль/л
+    'lactate': {'mmol/L': (1.0, 0.0), 'mg/dL': (10 / 90.08, 0.0)},
+    'gcs': {'{score}': (1.0, 0.0), '1': (1.0, 0.0), None: (1.0, 0.0)}
+}
+
+# Наблюдения с этими статусами не учитываются
+SKIPPED_STATUSES = frozenset(('entered-in-error', 'cancelled'))
+
+# Знаков после запятой у значений, пересчитанных из других единиц
+CONVERTED_DECIMALS = 3
+
+DEFAULT_WINDOW_HOURS = 24.0
+READ_SIZE = 1 << 20
+# Предельный размер одного значения JSON (ресурса или элемента entry) в буфере
+MAX_VALUE_SIZE = 64 << 20
+
+_NON_SPACE = re.compile(r'\S')
+_MISSING = object()
+
+# Состояние пациента — массив float: времена параметров в порядке NUMERIC_PARAMS, затем значения (NaN — нет)
+_SLOTS = {key: index for index, key in enumerate(NUMERIC_PARAMS)}
+_WIDTH = len(NUMERIC_PARAMS)
+_EMPTY_STATE = array('d', [float('nan')] * 2 * _WIDTH)
+
+class _JsonStream:
+    """Текстовый поток с последовательным разбором значений JSON через raw_decode"""
+
+    def __init__(self, handle, read_size=READ_SIZE):
+        self.handle = handle
+        self.read_size = read_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        """Дочитывание блока в буфер; False — вход закончился"""
+        if self.eof:
+            return False
+        data = self.handle.read(self.read_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Следующий непробельный символ (позиция ставится на него); '' — конец входа"""
+        while True:
+            match = _NON_SPACE.search(self.buffer, self.pos)
+            if match:
+                self.pos = match.start()
+                return self.buffer[self.pos]
+            self.pos = len(self.buffer)
+            if not self._fill():
+                return ''
+
+    def expect(self, chars):
+        """Пропуск одного из символов chars (разделитель или скобка); возвращает его"""
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f'FHIR JSON: ожидался один из символов {chars!r}, получено {char!r}')
+        self.pos += 1
+        return char
+
+    def decode(self):
+        """Следующее значение JSON целиком (буфер дочитывается по мере надобности)"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if len(self.buffer) - self.pos > MAX_VALUE_SIZE or not self._fill():
+                    raise
+                continue
+            # Число на конце буфера могло быть обрезано — дочитываем и разбираем заново
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def try_decode(self):
+        """Значение, если оно целиком в буфере, иначе _MISSING (позиция не меняется)"""
+        try:
+            value, end = self.decoder.raw_decode(self.buffer, self.pos)
+        except json.JSONDecodeError:
+            return _MISSING
+        if end == len(self.buffer) and not self.eof:
+            return _MISSING
+        self.pos = end
+        return value
+
+def _unpack(resource):
+    """Ресурсы из значения: Bundle раскрывается по entry.resource, остальное — как есть"""
+    if not isinstance(resource, dict):
+        return
+    if resource.get('resourceType') != 'Bundle':
+        yield resource
+        return
+    for entry in resource.get('entry') or ():
+        if isinstance(entry, dict):
+            yield from _unpack(entry.get('resource'))
+
+def _walk_object(stream):
+    """Объект, не поместившийся в буфер: поля разбираются по одному, entry — поэлементно"""
+    stream.expect('{')
+    fields = {}
+    if stream.peek() == '}':
+        stream.pos += 1
+        return
+    while True:
+        key = stream.decode()
+        stream.expect(':')
+        if key == 'entry' and stream.peek() == '[':
+            stream.pos += 1
+            if stream.peek() == ']':
+                stream.pos += 1
+            else:
+                while True:
+                    entry = stream.decode()
+                    if isinstance(entry, dict):
+                        yield from _unpack(entry.get('resource'))
+                    if stream.expect(',]') == ']':
+                        break
+        else:
+            fields[key] = stream.decode()
+        if stream.expect(',}') == '}':
+            break
+    if fields.get('resourceType') != 'Bundle':
+        yield from _unpack(fields)
+
+def iter_resources(handle, read_size=READ_SIZE):
+    """Ресурсы FHIR из текстового потока: Bundle, NDJSON, массив ресурсов или их последовательность"""
+    stream = _JsonStream(handle, read_size)
+    while True:
+        char = stream.peek()
+        if not char:
+            return
+        if char == '[':
+            stream.pos += 1
+            if stream.peek() == ']':
+                stream.pos += 1
+                continue
+            while True:
+                yield from _unpack(stream.decode())
+                if stream.expect(',]') == ']':
+                    break
+            continue
+        if char != '{':
+            raise ValueError(f'FHIR JSON: ожидался объект ресурса, получено {char!r}')
+        value = stream.try_decode()
+        if value is not _MISSING:
+            yield from _unpack(value)
+        else:
+            yield from _walk_object(stream)
+
+def open_text(path):
+    """Текстовый файл UTF-8, сжатый gzip — по расширению .gz"""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+def parse_time(value):
+    """Время FHIR (dateTime/instant) в секундах эпохи; без часового пояса — UTC; None, если не разобрано"""
+    if not isinstance(value, str):
+        return None
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+def _observed_at(resource):
+    """Время наблюдения: effective[x], иначе issued"""
+    period = resource.get('effectivePeriod')
+    if isinstance(period, dict):
+        candidates = (period.get('end'), period.get('start'))
+    else:
+        candidates = (resource.get('effectiveDateTime'), resource.get('effectiveInstant'))
+    for value in candidates + (resource.get('issued'),):
+        moment = parse_time(value)
+        if moment is not None:
+            return moment
+    return None
+
+def _patient_id(subject):
+    """Идентификатор пациента из subject: 'Patient/123' -> '123', иначе ссылка или identifier.value"""
+    if not isinstance(subject, dict):
+        return None
+    reference = subject.get('reference')
+    if isinstance(reference, str) and reference:
+        return reference[len('Patient/'):] if reference.startswith('Patient/') else reference
+    identifier = subject.get('identifier')
+    if isinstance(identifier, dict) and identifier.get('value') is not None:
+        return str(identifier['value'])
+    return None
+
+def _parameter(code):
+    """Параметр шкал по CodeableConcept (первый известный код LOINC) или None"""
+    if not isinstance(code, dict):
+        return None
+    for coding in code.get('coding') or ():
+        if isinstance(coding, dict) and coding.get('system') == LOINC_SYSTEM:
+            key = LOINC_CODES.get(coding.get('code'))
+            if key is not None:
+                return key
+    return None
+
+def _value(part, key):
+    """Значение value[x] в единицах поля ввода; (значение, None) или (None, причина пропуска)"""
+    quantity = part.get('valueQuantity')
+    if isinstance(quantity, dict):
+        value = quantity.get('value')
+        unit = quantity.get('code') or quantity.get('unit')
+    else:
+        value = part.get('valueInteger')
+        unit = None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None, 'value'
+    conversion = UNITS[key].get(unit)
+    if conversion is None:
+        return None, 'unit'
+    factor, offset = conversion
+    if factor == 1.0 and offset == 0.0:
+        return float(value), None
+    # Округление убирает погрешность пересчёта на границах диапазонов (100.4 °F -> 38.0, а не 38.00000000000001)
+    return round(value * factor + offset, CONVERTED_DECIMALS), None
+
+class FhirIngest:
+    """Последние значения параметров шкал по пациентам из ресурсов Observation"""
+
+    def __init__(self, window=DEFAULT_WINDOW_HOURS * 3600, as_of=None):
+        self.window = window
+        self.as_of = as_of
+        # Пациент -> массив времён и значений параметров (_SLOTS); словари на пациента заняли бы в разы больше памяти
+        self.latest = {}
+        self.counts = Counter()
+
+    def add_resource(self, resource):
+        """Учёт одного ресурса; не-Observation и непригодные наблюдения считаются в counts"""
+        counts = self.counts
+        counts['resources'] += 1
+        if resource.get('resourceType') != 'Observation':
+            return
+        counts['observations'] += 1
+        if resource.get('status') in SKIPPED_STATUSES:
+            counts['skipped_status'] += 1
+            return
+        patient_id = _patient_id(resource.get('subject'))
+        if patient_id is None:
+            counts['skipped_subject'] += 1
+            return
+        observed_at = _observed_at(resource)
+        if observed_at is None:
+            counts['skipped_time'] += 1
+            return
+        if self.as_of is not None and observed_at > self.as_of:
+            counts['skipped_after_as_of'] += 1
+            return
+
+        mapped = False
+        for part in [resource] + [part for part in resource.get('component') or () if isinstance(part, dict)]:
+            key = _parameter(part.get('code'))
+            if key is None:
+                continue
+            mapped = True
+            value, reason = _value(part, key)
+            if reason is not None:
+                counts[f'skipped_{reason}'] += 1
+                continue
+            state = self.latest.get(patient_id)
+            if state is None:
+                state = self.latest[patient_id] = array('d', _EMPTY_STATE)
+            slot = _SLOTS[key]
+            # Сравнение с NaN (значения ещё нет) ложно — значение записывается
+            if not observed_at < state[slot]:
+                state[slot] = observed_at
+                state[slot + _WIDTH] = value
+            counts['values'] += 1
+        if not mapped:
+            counts['skipped_code'] += 1
+
+    def add_stream(self, handle, read_size=READ_SIZE):
+        """Учёт всех ресурсов текстового потока"""
+        for resource in iter_resources(handle, read_size):
+            self.add_resource(resource)
+
+    def add_file(self, path, read_size=READ_SIZE):
+        """Учёт всех ресурсов файла (NDJSON, Bundle, *.gz)"""
+        with open_text(path) as handle:
+            self.add_stream(handle, read_size)
+
+    def __len__(self):
+        return len(self.latest)
+
+    def records(self):
+        """(пациент, время последнего учтённого значения, values) по значениям внутри окна"""
+        for patient_id, state in self.latest.items():
+            times = [observed_at for observed_at in state[:_WIDTH] if observed_at == observed_at]
+            end = self.as_of if self.as_of is not None else max(times)
+            start = end - self.window if self.window is not None else float('-inf')
+            record = {key: state[slot + _WIDTH] for key, slot in _SLOTS.items() if state[slot] >= start}
+            if record:
+                yield patient_id, max(state[_SLOTS[key]] for key in record), record
+
+    def frames(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Блоки DataFrame: patient_id, observed_at (ISO 8601, UTC) и числовые параметры шкал внутри окна"""
+        items = iter(self.latest.items())
+        while True:
+            batch = list(itertools.islice(items, chunk_size))
+            if not batch:
+                return
+            # Состояния пациентов блока одной матрицей: окно применяется векторно
+            states = np.frombuffer(b''.join(state.tobytes() for _, state in batch), dtype=np.float64)
+            states = states.reshape(len(batch), 2 * _WIDTH)
+            times, values = states[:, :_WIDTH], states[:, _WIDTH:]
+            end = np.full(len(batch), self.as_of) if self.as_of is not None else np.nanmax(times, axis=1)
+            start = end - self.window if self.window is not None else np.full(len(batch), -np.inf)
+            inside = times >= start[:, None]
+            rows = inside.any(axis=1)
+            frame = pd.DataFrame(np.where(inside, values, np.nan)[rows], columns=list(NUMERIC_PARAMS))
+            frame.insert(0, 'patient_id', [patient_id for (patient_id, _), row in zip(batch, rows) if row])
+            observed_at = np.where(inside, times, -np.inf).max(axis=1)[rows]
+            frame.insert(1, 'observed_at', np.datetime_as_string(observed_at.astype('datetime64[s]'), timezone='UTC'))
+            yield frame
+
+def score_fhir(input_paths, output_path, window=DEFAULT_WINDOW_HOURS * 3600, as_of=None,
+               chunk_size=DEFAULT_CHUNK_SIZE, output_format=None):
+    """Приём файлов FHIR и расчёт всех шкал по пациентам; возвращает число пациентов, время и счётчики"""
+    started = time.perf_counter()
+    ingest = FhirIngest(window, as_of)
+    for path in input_paths:
+        ingest.add_file(path)
+
+    keep = ('patient_id', 'observed_at') + NUMERIC_PARAMS
+    rows = 0
+    writer = open_writer(output_path, detect_format(output_path, output_format))
+    try:
+        for frame in ingest.frames(chunk_size):
+            writer.write(score_chunk(frame, keep))
+            rows += len(frame)
+    finally:
+        writer.close()
+    return rows, time.perf_counter() - started, ingest.counts
+
+def build_parser():
+    """Аргументы командной строки"""
+    parser = argparse.ArgumentParser(description='Расчёт шкал сепсиса по выгрузке FHIR Observation')
+    parser.add_argument('inputs', nargs='+', help='файлы FHIR: Bundle или NDJSON, можно .gz')
+    parser.add_argument('output', help='выходной файл CSV, JSONL, Parquet или Arrow IPC')
+    parser.add_argument('--window', type=float, default=DEFAULT_WINDOW_HOURS,
+                        help=f'окно значений, часов (по умолчанию {DEFAULT_WINDOW_HOURS:g}; 0 — без ограничения)')
+    parser.add_argument('--as-of', help='момент оценки ISO 8601; по умолчанию — последнее наблюдение пациента')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f'пациентов в блоке расчёта (по умолчанию {DEFAULT_CHUNK_SIZE})')
+    parser.add_argument('--output-format', choices=sorted(set(FORMATS.values())), help='формат выходного файла')
+    return parser
+
+def main(argv=None):
+    """Точка входа командной строки"""
+    args = build_parser().parse_args(argv)
+    if args.chunk_size <= 0:
+        raise SystemExit('--chunk-size должен быть положительным')
+    as_of = None
+    if args.as_of is not None:
+        as_of = parse_time(args.as_of)
+        if as_of is None:
+            raise SystemExit(f'--as-of: не удалось разобрать время {args.as_of!r}')
+
+    rows, elapsed, counts = score_fhir(
+        args.inputs,
+        args.output,
+        window=args.window * 3600 if args.window > 0 else None,
+        as_of=as_of,
+        chunk_size=args.chunk_size,
+        output_format=args.output_format
+    )
+    rate = counts['resources'] / elapsed if elapsed > 0 else 0.0
+    print(f'Готово: {counts["resources"]} ресурсов ({rate:,.0f}/с), {counts["values"]} значений, '
+          f'{rows} пациентов за {elapsed:.1f} с')
+    skipped = {name[len('skipped_'):]: count for name, count in sorted(counts.items()) if name.startswith('skipped_')}
+    if skipped:
+        print('Пропущено наблюдений: ' + ', '.join(f'{name} {count}' for name, count in skipped.items()),
+              file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Инкрементальный расчёт шкал для потока обновлений показателей пациента
+
+Все пять шкал — суммы баллов по отдельным параметрам, поэтому для каждого
+пациента хранится текущий вклад каждого параметра в каждую шкалу. При
+изменении одного параметра пересчитываются только его слагаемые, а суммы
+шкал корректируются на разницу — обновление выполняется за O(1).
+"""
+
+from calculations import SCALE_PARAMS, ScaleResult, parameter_points, scale_result
+
+SCALE_IDS = tuple(SCALE_PARAMS)
+
+def _build_terms():
+    """Для каждого параметра — ячейки (номер слагаемого, номер шкалы, шкала) с его вкладом"""
+    terms = {}
+    count = 0
+    for scale_index, scale_id in enumerate(SCALE_IDS):
+        for key in SCALE_PARAMS[scale_id]:
+            terms.setdefault(key, []).append((count, scale_index, scale_id))
+            count += 1
+    return {key: tuple(cells) for key, cells in terms.items()}, count
+
+_TERMS, TERM_COUNT = _build_terms()
+
+class PatientScorer:
+    """Текущее состояние шкал одного пациента"""
+
+    __slots__ = ('terms', 'scores', 'used_params')
+
+    def __init__(self, values=None):
+        # Баллы каждого слагаемого (None — параметр отсутствует)
+        self.terms = [None] * TERM_COUNT
+        self.scores = [0] * len(SCALE_IDS)
+        self.used_params = [0] * len(SCALE_IDS)
+        if values:
+            for key, value in values.items():
+                self.set(key, value)
+
+    def set(self, key, value):
+        """Обновление одного параметра без формирования результатов; неизвестные ключи игнорируются"""
+        for term, scale_index, scale_id in _TERMS.get(key, ()):
+            before = self.terms[term]
+            after = parameter_points(scale_id, key, value)
+            if before is not None:
+                self.scores[scale_index] -= before
+                self.used_params[scale_index] -= 1
+            if after is not None:
+                self.scores[scale_index] += after
+                self.used_params[scale_index] += 1
+            self.terms[term] = after
+
+    def update(self, key, value):
+        """Обновление одного параметра; возвращает результаты всех шкал"""
+        self.set(key, value)
+        return self.results()
+
+    def update_many(self, values):
+        """Обновление нескольких параметров; возвращает результаты всех шкал"""
+        for key, value in values.items():
+            self.set(key, value)
+        return self.results()
+
+    def result(self, scale_id):
+        """Результат одной шкалы в формате calculate_*"""
+        scale_index = SCALE_IDS.index(scale_id)
+        return scale_result(scale_id, self.scores[scale_index], self.used_params[scale_index])
+
+    def results(self):
+        """Результаты всех шкал в формате calculate_*"""
+        return {
+            scale_id: scale_result(scale_id, self.scores[scale_index], self.used_params[scale_index])
+            for scale_index, scale_id in enumerate(SCALE_IDS)
+        }
+
+    def compact_results(self):
+        """Результаты всех шкал в виде {шкала: ScaleResult} без строк риска"""
+        return {
+            scale_id: ScaleResult(scale_id, self.scores[scale_index], self.used_params[scale_index])
+            for scale_index, scale_id in enumerate(SCALE_IDS)
+        }
+
+class WardScorer:
+    """Инкрементальные шкалы для множества наблюдаемых пациентов"""
+
+    __slots__ = ('patients',)
+
+    def __init__(self):
+        self.patients = {}
+
+    def __len__(self):
+        return len(self.patients)
+
+    def __contains__(self, patient_id):
+        return patient_id in self.patients
+
+    def patient(self, patient_id):
+        """Состояние пациента (создаётся при первом обращении)"""
+        scorer = self.patients.get(patient_id)
+        if scorer is None:
+            scorer = self.patients[patient_id] = PatientScorer()
+        return scorer
+
+    def update(self, patient_id, key, value):
+        """Новое значение одного параметра пациента; возвращает результаты всех шкал"""
+        return self.patient(patient_id).update(key, value)
+
+    def update_many(self, patient_id, values):
+        """Новые значения нескольких параметров пациента; возвращает результаты всех шкал"""
+        return self.patient(patient_id).update_many(values)
+
+    def results(self, patient_id):
+        """Текущие результаты всех шкал пациента"""
+        return self.patients[patient_id].results()
+
+    def compact_results(self, patient_id):
+        """Текущие результаты всех шкал пациента в виде ScaleResult"""
+        return self.patients[patient_id].compact_results()
+
+    def discharge(self, patient_id):
+        """Прекращение наблюдения за пациентом"""
+        self.patients.pop(patient_id, None)
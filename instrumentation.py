@@ -0,0 +1,249 @@
+"""
+Инструментирование горячих путей: счётчики вызовов и гистограммы задержек
+
+Включается переменной окружения SEPSIS_METRICS=1 (или вызовом enable())
+до установки обёрток. install(module) заменяет в модуле расчёта функции
+parse_float, parse_record и calculate_* обёртками с замером времени; так как
+функции модуля вызывают друг друга через его глобальные имена, замеряются
+и внутренние вызовы. Пока инструментирование выключено, install() ничего
+не делает, а timed() возвращает общий пустой контекст — исходные функции
+вызываются напрямую, без дополнительных накладных расходов.
+
+Гистограммы хранят заранее выделенные списки счётчиков по корзинам;
+метрики выгружаются в текстовом формате Prometheus в файл (write)
+или через локальный HTTP-эндпоинт (serve).
+
+Переменные окружения:
+    SEPSIS_METRICS       — 1/true/yes/on включает сбор метрик
+    SEPSIS_METRICS_FILE  — файл, в который export() записывает метрики
+    SEPSIS_METRICS_PORT  — порт эндпоинта /metrics, запускаемого export()
+"""
+
+import functools
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Верхние границы корзин гистограммы, секунды
+BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+           1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Функции модуля расчёта, оборачиваемые install()
+INSTRUMENTED_FUNCTIONS = (
+    'parse_float', 'parse_record',
+    'calculate_sirs', 'calculate_qsofa', 'calculate_omqsofa', 'calculate_moews', 'calculate_sos',
+    'calculate_all',
+    'calculate_sirs_batch', 'calculate_qsofa_batch', 'calculate_omqsofa_batch',
+    'calculate_moews_batch', 'calculate_sos_batch', 'calculate_all_batch'
+)
+
+CALL_METRIC = ('sepsis_call_duration_seconds', 'function', 'Время выполнения функций расчёта шкал')
+RENDER_METRIC = ('sepsis_render_duration_seconds', 'section', 'Время отрисовки разделов приложения')
+
+_NULL_CONTEXT = nullcontext()
+
+ENABLED = os.environ.get('SEPSIS_METRICS', '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+class Histogram:
+    """Гистограмма задержек с фиксированными корзинами и счётчиками, выделенными при создании"""
+
+    __slots__ = ('metric', 'label', 'value', 'bounds', 'counts', 'total', '_lock')
+
+    def __init__(self, metric, label, value, bounds=BUCKETS):
+        self.metric = metric
+        self.label = label
+        self.value = value
+        self.bounds = bounds
+        # Последняя корзина — значения больше верхней границы (+Inf)
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        """Учёт одного замера"""
+        index = bisect_left(self.bounds, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += seconds
+
+    @property
+    def count(self):
+        """Число замеров"""
+        return sum(self.counts)
+
+    def reset(self):
+        """Обнуление счётчиков"""
+        with self._lock:
+            self.counts = [0] * (len(self.bounds) + 1)
+            self.total = 0.0
+
+    def samples(self):
+        """Строки Prometheus: накопленные корзины, сумма и число замеров"""
+        with self._lock:
+            counts = list(self.counts)
+            total = self.total
+        label = f'{self.label}="{self.value}"'
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds, counts):
+            cumulative += count
+            lines.append(f'{self.metric}_bucket{{{label},le="{bound:g}"}} {cumulative}')
+        cumulative += counts[-1]
+        lines.append(f'{self.metric}_bucket{{{label},le="+Inf"}} {cumulative}')
+        lines.append(f'{self.metric}_sum{{{label}}} {total!r}')
+        lines.append(f'{self.metric}_count{{{label}}} {cumulative}')
+        return lines
+
+# Гистограммы по (метрика, значение метки)
+REGISTRY = {}
+_registry_lock = threading.Lock()
+
+def enable():
+    """Включение инструментирования (действует на последующие install() и timed())"""
+    global ENABLED
+    ENABLED = True
+
+def histogram(metric, value):
+    """Гистограмма для метрики (имя, метка, описание) и значения метки; создаётся при первом обращении"""
+    key = (metric[0], value)
+    found = REGISTRY.get(key)
+    if found is None:
+        with _registry_lock:
+            found = REGISTRY.setdefault(key, Histogram(metric[0], metric[1], value))
+    return found
+
+def instrument(function, name=None):
+    """Обёртка функции, замеряющая время каждого вызова"""
+    observe = histogram(CALL_METRIC, name or function.__name__).observe
+    clock = time.perf_counter
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        started = clock()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            observe(clock() - started)
+
+    wrapper.instrumented = True
+    return wrapper
+
+def install(module, names=INSTRUMENTED_FUNCTIONS):
+    """
+    Замена функций модуля расчёта обёртками с замером времени (только при включённом
+    инструментировании); словари SCALE_FUNCTIONS и BATCH_FUNCTIONS обновляются.
+    Вызывать до импорта функций из модуля по имени (from ... import).
+    Возвращает число обёрнутых функций.
+    """
+    if not ENABLED:
+        return 0
+    wrapped = {}
+    for name in names:
+        function = getattr(module, name, None)
+        if function is None or getattr(function, 'instrumented', False):
+            continue
+        wrapped[function] = instrument(function, name)
+        setattr(module, name, wrapped[function])
+    for registry in ('SCALE_FUNCTIONS', 'BATCH_FUNCTIONS'):
+        functions = getattr(module, registry, None)
+        if functions is not None:
+            for key, function in functions.items():
+                functions[key] = wrapped.get(function, function)
+    return len(wrapped)
+
+class _Timer:
+    """Контекст замера времени раздела"""
+
+    __slots__ = ('observe', 'started')
+
+    def __init__(self, observe):
+        self.observe = observe
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.observe(time.perf_counter() - self.started)
+        return False
+
+def timed(section):
+    """Контекст замера времени раздела отрисовки; при выключенном инструментировании — пустой"""
+    if not ENABLED:
+        return _NULL_CONTEXT
+    return _Timer(histogram(RENDER_METRIC, section).observe)
+
+def render():
+    """Все метрики в текстовом формате Prometheus"""
+    families = {}
+    for (metric, _), item in sorted(REGISTRY.items()):
+        families.setdefault(metric, []).append(item)
+    lines = []
+    for metric, description in ((CALL_METRIC[0], CALL_METRIC[2]), (RENDER_METRIC[0], RENDER_METRIC[2])):
+        if metric not in families:
+            continue
+        lines.append(f'# HELP {metric} {description}')
+        lines.append(f'# TYPE {metric} histogram')
+        for item in families[metric]:
+            lines.extend(item.samples())
+    return '\n'.join(lines) + '\n'
+
+def write(path):
+    """Атомарная запись метрик в файл (например, для textfile-коллектора node_exporter)"""
+    # Свой временный файл у каждого вызова: export() выполняется параллельно из нескольких сессий
+    directory, name = os.path.split(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory, prefix=f'.{name}.',
+                                     suffix='.tmp', delete=False) as handle:
+        handle.write(render())
+    try:
+        # NamedTemporaryFile создаётся с правами 0600, а файл читает внешний коллектор
+        os.chmod(handle.name, 0o644)
+        os.replace(handle.name, path)
+    except OSError:
+        os.unlink(handle.name)
+        raise
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """GET /metrics — метрики в формате Prometheus"""
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+_servers = {}
+
+def serve(port, host='127.0.0.1'):
+    """Запуск эндпоинта /metrics в фоновом потоке (повторный вызов для того же адреса ничего не делает)"""
+    with _registry_lock:
+        server = _servers.get((host, port))
+        if server is None:
+            server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name='metrics-endpoint', daemon=True).start()
+            _servers[(host, port)] = server
+    return server
+
+def export():
+    """Выгрузка по переменным окружения: запись в SEPSIS_METRICS_FILE, эндпоинт на SEPSIS_METRICS_PORT"""
+    if not ENABLED:
+        return
+    port = os.environ.get('SEPSIS_METRICS_PORT')
+    if port:
+        serve(int(port))
+    path = os.environ.get('SEPSIS_METRICS_FILE')
+    if path:
+        write(path)
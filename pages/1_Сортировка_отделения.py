@@ -0,0 +1,143 @@
+import hashlib
+import io
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from calculations import CHOICE_PARAMS, calculate_all_batch
+
+# Настройка страницы
+st.set_page_config(
+    page_title="Сортировка пациентов отделения",
+    page_icon="🗂️",
+    layout="wide"
+)
+
+SCALE_NAMES = {
+    'sirs': 'SIRS',
+    'qsofa': 'qSOFA',
+    'omqsofa': 'omqSOFA',
+    'moews': 'MOEWS',
+    'sos': 'SOS'
+}
+
+RISK_DISPLAY = {
+    'low-risk': '🟢 Низкий',
+    'medium-risk': '🟠 Средний',
+    'high-risk': '🔴 Высокий'
+}
+
+RISK_ORDER = {'low-risk': 0, 'medium-risk': 1, 'high-risk': 2}
+
+PAGE_SIZES = [25, 50, 100, 200]
+
+@st.cache_data(max_entries=8, show_spinner="Расчёт шкал...")
+def score_census(_content, digest, name):
+    """Пакетный расчёт всех шкал для загруженного файла (кэшируется по хэшу содержимого)"""
+    if name.lower().endswith('.parquet'):
+        census = pd.read_parquet(io.BytesIO(_content))
+    else:
+        census = pd.read_csv(io.BytesIO(_content), dtype={key: 'object' for key in CHOICE_PARAMS})
+    scores = calculate_all_batch(census)
+    return pd.concat([census, scores], axis=1)
+
+@st.cache_data(max_entries=8)
+def export_csv(_board, digest):
+    """Полная таблица результатов в CSV для выгрузки (строится один раз на файл)"""
+    return _board.to_csv(index=False).encode('utf-8')
+
+def triage_order(board, sort_scale):
+    """Порядок строк: уровень риска и баллы выбранной шкалы, затем второй из MOEWS/SOS"""
+    other = 'sos' if sort_scale == 'moews' else 'moews'
+    keys = []
+    for scale_id in (other, sort_scale):
+        keys.append(board[f'{scale_id}_score'].to_numpy())
+        keys.append(board[f'{scale_id}_riskClass'].map(RISK_ORDER).to_numpy())
+    # np.lexsort сортирует по последнему ключу в первую очередь
+    return np.lexsort(keys)[::-1]
+
+st.markdown("## 🗂️ Сортировка пациентов отделения")
+st.markdown(
+    "Загрузите CSV или Parquet с перечнем пациентов: столбцы `temp`, `hr`, `rr`, `sbp`, `dbp`, `spo2`, "
+    "`wbc`, `bands`, `lactate`, `gcs`, `mental`, `o2_therapy`, `pph` и любые столбцы-идентификаторы."
+)
+
+uploaded = st.file_uploader("Файл отделения (CSV или Parquet)", type=["csv", "parquet"])
+if uploaded is None:
+    st.info("Загрузите файл, чтобы рассчитать шкалы для всех пациентов")
+    st.stop()
+
+content = uploaded.getvalue()
+digest = hashlib.sha1(content).hexdigest()
+board = score_census(content, digest, uploaded.name)
+
+# Сводка по отделению
+summary_cols = st.columns(4)
+moews_counts = board['moews_riskClass'].value_counts()
+summary_cols[0].metric("Пациентов", len(board))
+summary_cols[1].metric("MOEWS: высокий риск", int(moews_counts.get('high-risk', 0)))
+summary_cols[2].metric("MOEWS: средний риск", int(moews_counts.get('medium-risk', 0)))
+summary_cols[3].metric("SOS: высокий риск", int((board['sos_riskClass'] == 'high-risk').sum()))
+
+# Фильтры и сортировка
+filter_cols = st.columns([1, 1, 1, 1])
+with filter_cols[0]:
+    sort_scale = st.selectbox(
+        "Ранжировать по",
+        options=['moews', 'sos'],
+        format_func=lambda x: SCALE_NAMES[x]
+    )
+with filter_cols[1]:
+    risk_filter = st.multiselect(
+        f"Риск по {SCALE_NAMES[sort_scale]}",
+        options=list(RISK_DISPLAY),
+        default=list(RISK_DISPLAY),
+        format_func=lambda x: RISK_DISPLAY[x]
+    )
+with filter_cols[2]:
+    min_score = st.number_input(f"Минимум баллов {SCALE_NAMES[sort_scale]}", min_value=0, value=0)
+with filter_cols[3]:
+    search = st.text_input("Поиск по идентификатору")
+
+mask = (board[f'{sort_scale}_riskClass'].isin(risk_filter).to_numpy()
+        & (board[f'{sort_scale}_score'].to_numpy() >= min_score))
+id_columns = [column for column in board.columns if not pd.api.types.is_numeric_dtype(board[column])
+              and column not in CHOICE_PARAMS and not column.endswith('_riskClass')]
+if search and id_columns:
+    matches = np.zeros(len(board), dtype=bool)
+    for column in id_columns:
+        matches |= board[column].astype(str).str.contains(search, case=False, regex=False).to_numpy()
+    mask = mask & matches
+
+order = triage_order(board, sort_scale)
+order = order[mask[order]]
+
+# Постраничный вывод: в браузер передаётся только текущая страница
+page_cols = st.columns([1, 1, 2])
+with page_cols[0]:
+    page_size = st.selectbox("Строк на странице", PAGE_SIZES, index=1)
+pages = max(1, -(-len(order) // page_size))
+if st.session_state.get('triage_page', 1) > pages:
+    st.session_state['triage_page'] = 1
+with page_cols[1]:
+    page = st.number_input(f"Страница (из {pages})", min_value=1, max_value=pages, key='triage_page')
+with page_cols[2]:
+    st.markdown(f"Найдено пациентов: **{len(order)}**")
+
+page_rows = board.iloc[order[(page - 1) * page_size:page * page_size]]
+view = page_rows.drop(columns=[column for column in page_rows.columns if column.endswith('_usedParams')])
+for scale_id in SCALE_NAMES:
+    view[f'{scale_id}_riskClass'] = view[f'{scale_id}_riskClass'].map(RISK_DISPLAY)
+view = view.rename(columns={
+    **{f'{scale_id}_score': f'{name}, баллы' for scale_id, name in SCALE_NAMES.items()},
+    **{f'{scale_id}_riskClass': f'{name}, риск' for scale_id, name in SCALE_NAMES.items()}
+})
+
+st.dataframe(view, use_container_width=True, hide_index=True)
+
+st.download_button(
+    "⬇️ Скачать результаты (CSV)",
+    data=export_csv(board, digest),
+    file_name="ward_triage.csv",
+    mime="text/csv"
+)
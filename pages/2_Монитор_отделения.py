@@ -0,0 +1,176 @@
+import html
+import os
+import time
+
+import streamlit as st
+from trends import trend_figure
+from ward_monitor import JsonlFeed, WardMonitor
+
+# Настройка страницы
+st.set_page_config(
+    page_title="Монитор отделения",
+    page_icon="📟",
+    layout="wide"
+)
+
+SCALE_NAMES = {
+    'sirs': 'SIRS',
+    'qsofa': 'qSOFA',
+    'omqsofa': 'omqSOFA',
+    'moews': 'MOEWS',
+    'sos': 'SOS'
+}
+
+RISK_COLORS = {
+    'low-risk': '#4CAF50',
+    'medium-risk': '#FF9800',
+    'high-risk': '#F44336'
+}
+
+TILES_PER_ROW = 6
+ALERTS_SHOWN = 5
+
+def render_tile(patient_id, results, updated):
+    """HTML плитки пациента: MOEWS крупно, остальные шкалы строкой, время обновления"""
+    moews = results['moews']
+    scales = ''.join(
+        f'<span style="color: {RISK_COLORS[result["riskClass"]]}; margin-right: 6px;">'
+        f'{SCALE_NAMES[scale_id]} {result["score"]}</span>'
+        for scale_id, result in results.items() if scale_id != 'moews'
+    )
+    return f"""
+        <div style="border-left: 6px solid {RISK_COLORS[moews['riskClass']]}; background-color: #f8f9fa;
+                    border-radius: 8px; padding: 8px 10px; margin-bottom: 8px;">
+            <div style="display: flex; justify-content: space-between;">
+                <strong>{html.escape(patient_id)}</strong>
+                <span style="color: #666; font-size: 0.8rem;">{time.strftime('%H:%M:%S', time.localtime(updated))}</span>
+            </div>
+            <div style="font-size: 1.4rem; font-weight: bold; color: {RISK_COLORS[moews['riskClass']]};">
+                MOEWS {moews['score']}
+            </div>
+            <div style="font-size: 0.8rem;">{scales}</div>
+        </div>
+        """
+
+def refresh(state, placeholders, budget):
+    """Цикл обновления в пределах бюджета: опрос, пересчёт изменившихся, перерисовка их плиток"""
+    started = time.perf_counter()
+    deadline = started + budget
+    monitor = state['monitor']
+    changed = monitor.poll(deadline)
+    rendered = []
+    for patient_id, results in monitor.drain(deadline):
+        state['tiles'][patient_id] = render_tile(patient_id, results, monitor.updated[patient_id])
+        state['risk'][patient_id] = results['moews']['riskClass']
+        placeholder = placeholders.get(patient_id)
+        if placeholder is not None:
+            placeholder.markdown(state['tiles'][patient_id], unsafe_allow_html=True)
+        rendered.append(patient_id)
+    return changed, rendered, time.perf_counter() - started
+
+def render_status(placeholder, state, changed, rendered, elapsed, budget):
+    """Строка состояния: число пациентов, высокий риск, длительность цикла и очередь"""
+    monitor = state['monitor']
+    high = sum(1 for risk in state['risk'].values() if risk == 'high-risk')
+    overdue = len(monitor.scheduler.overdue(time.time()))
+    placeholder.markdown(
+        f"Пациентов: **{len(monitor)}** · MOEWS высокий риск: **{high}** · просрочено оценок: **{overdue}** · "
+        f"изменилось: {changed}, перерисовано: {len(rendered)} · "
+        f"цикл {elapsed * 1000:.0f} мс из {budget * 1000:.0f} · в очереди: {len(monitor.pending)} · "
+        f"ошибок разбора: {monitor.feed.errors}"
+    )
+
+def render_alerts(placeholder, monitor):
+    """Последние тревоги планировщика: повышение риска пациента"""
+    alerts = list(monitor.scheduler.alerts)[-ALERTS_SHOWN:]
+    if not alerts:
+        placeholder.empty()
+        return
+    risk_classes = tuple(RISK_COLORS)
+    lines = [
+        f'<span style="color: {RISK_COLORS[risk_classes[alert["level"]]]};">⚠ '
+        f'{time.strftime("%H:%M:%S", time.localtime(alert["time"]))} '
+        f'<strong>{html.escape(alert["patient_id"])}</strong>: '
+        f'{", ".join(SCALE_NAMES[scale_id] for scale_id in alert["scales"])}</span>'
+        for alert in reversed(alerts)
+    ]
+    placeholder.markdown('<br>'.join(lines), unsafe_allow_html=True)
+
+st.markdown("## 📟 Монитор отделения")
+st.markdown(
+    "Показатели читаются из каталога файлов JSONL: каждая строка — объект с полем `patient_id` "
+    "и параметрами шкал. Пересчитываются и перерисовываются только пациенты с новыми данными."
+)
+
+control_cols = st.columns([2, 1, 1, 1])
+with control_cols[0]:
+    directory = st.text_input("Каталог с данными", value=os.environ.get('WARD_FEED_DIR', 'ward_feed'))
+with control_cols[1]:
+    interval = st.number_input("Интервал опроса, с", min_value=0.5, max_value=60.0, value=2.0, step=0.5)
+with control_cols[2]:
+    budget_ms = st.number_input("Бюджет цикла, мс", min_value=20, max_value=2000, value=200, step=20)
+with control_cols[3]:
+    live = st.checkbox("Автообновление", value=True)
+budget = budget_ms / 1000
+
+# Состояние монитора хранится в сессии: позиции чтения файлов, шкалы и готовые плитки
+state = st.session_state.get('ward_monitor')
+if state is None or state['directory'] != directory:
+    state = st.session_state['ward_monitor'] = {
+        'directory': directory,
+        'monitor': WardMonitor(JsonlFeed(directory)),
+        'tiles': {},
+        'risk': {}
+    }
+
+status = st.empty()
+alerts_placeholder = st.empty()
+changed, rendered, elapsed = refresh(state, {}, budget)
+
+# Тренд выбранного пациента: ряды прореживаются до фиксированного числа точек
+trend_cols = st.columns([1, 1, 2])
+with trend_cols[0]:
+    trend_patient = st.selectbox("Тренд пациента", options=[None] + sorted(state['tiles']),
+                                 format_func=lambda x: "—" if x is None else x)
+with trend_cols[1]:
+    trend_method = st.selectbox("Прореживание", options=['lttb', 'minmax'],
+                                format_func=lambda x: {'lttb': 'LTTB', 'minmax': 'Мин/макс'}[x])
+trend_placeholder = st.empty()
+
+def render_trend():
+    """График тренда выбранного пациента"""
+    if trend_patient is not None:
+        fig = trend_figure(state['monitor'].trends.buffer(trend_patient), method=trend_method, names=SCALE_NAMES)
+        fig.update_layout(height=300)
+        trend_placeholder.plotly_chart(fig, use_container_width=True)
+
+render_trend()
+
+# Сетка плиток: у каждого пациента свой контейнер, который обновляется отдельно
+patient_ids = sorted(state['tiles'])
+placeholders = {}
+for row_start in range(0, len(patient_ids), TILES_PER_ROW):
+    columns = st.columns(TILES_PER_ROW)
+    for column, patient_id in zip(columns, patient_ids[row_start:row_start + TILES_PER_ROW]):
+        with column:
+            placeholder = placeholders[patient_id] = st.empty()
+            placeholder.markdown(state['tiles'][patient_id], unsafe_allow_html=True)
+render_status(status, state, changed, rendered, elapsed, budget)
+render_alerts(alerts_placeholder, state['monitor'])
+
+if not patient_ids:
+    st.info(f"Нет данных в каталоге «{directory}»")
+
+# Автообновление: скрипт продолжает работать и меняет только плитки пациентов с новыми данными.
+# Новые пациенты меняют сетку, поэтому при их появлении страница перерисовывается целиком.
+while live:
+    # Пока очередь перерисовки не пуста, следующий цикл начинается сразу
+    if not state['monitor'].pending:
+        time.sleep(max(0.0, interval - elapsed))
+    changed, rendered, elapsed = refresh(state, placeholders, budget)
+    render_status(status, state, changed, rendered, elapsed, budget)
+    render_alerts(alerts_placeholder, state['monitor'])
+    if trend_patient in rendered:
+        render_trend()
+    if len(state['tiles']) != len(placeholders):
+        st.rerun()
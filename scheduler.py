@@ -0,0 +1,223 @@
+"""
+Планировщик повторных оценок по уровню риска и тревоги при его повышении
+
+Для каждого пациента по последнему результату шкал определяется уровень
+риска (наибольший по выбранным шкалам) и срок следующей оценки: чем выше
+риск, тем короче интервал (MOEWS: средний риск — «наблюдения повторяются»,
+высокий — госпитализация в ОРИТ и частый контроль).
+
+Сроки хранятся в двоичной куче с индексом позиций: у каждого пациента
+одна запись, перепланирование сдвигает её вверх или вниз, поэтому
+обновление, извлечение ближайшего пациента и выписка — O(log n) без
+перестроения кучи. Список просроченных пациентов обходит только верхнюю
+часть кучи со сроками не позже текущего времени, в порядке сроков.
+
+Тревога возникает, когда уровень риска повышается до alert_level и выше.
+Повторная тревога того же или более низкого уровня в течение cooldown
+секунд подавляется, поэтому колебания показателя около границы не дают
+серии тревог.
+"""
+
+import heapq
+import itertools
+import time
+from collections import deque
+
+from calculations import RISK_CLASS_NAMES, SCALE_PARAMS, ScaleResult
+
+SCALE_IDS = tuple(SCALE_PARAMS)
+RISK_LEVELS = {f'{name}-risk': level for level, name in enumerate(RISK_CLASS_NAMES)}
+
+# Интервал до следующей оценки по уровню риска, секунды: низкий, средний, высокий
+REASSESSMENT_INTERVALS = (4 * 3600, 3600, 15 * 60)
+DEFAULT_ALERT_LEVEL = RISK_LEVELS['medium-risk']
+DEFAULT_COOLDOWN = 30 * 60
+ALERT_HISTORY = 1000
+
+def risk_level(results, scales=SCALE_IDS):
+    """Наибольший уровень риска (0–2) по выбранным шкалам (ScaleResult или словари) и шкалы с этим уровнем"""
+    levels = {}
+    for scale_id in scales:
+        result = results[scale_id]
+        levels[scale_id] = result.level if isinstance(result, ScaleResult) else RISK_LEVELS[result['riskClass']]
+    level = max(levels.values())
+    return level, tuple(scale_id for scale_id, value in levels.items() if value == level)
+
+class _Patient:
+    """Состояние пациента: уровень риска, запись кучи и последняя тревога"""
+
+    __slots__ = ('patient_id', 'level', 'assessed_at', 'due', 'order', 'index', 'alerted_level', 'alerted_at')
+
+    def __init__(self, patient_id):
+        self.patient_id = patient_id
+        self.level = None
+        self.assessed_at = None
+        self.due = None
+        self.order = 0
+        # Позиция в куче (None — оценка не запланирована)
+        self.index = None
+        self.alerted_level = -1
+        self.alerted_at = float('-inf')
+
+    def key(self):
+        """Ключ кучи: срок, при равных сроках — порядок планирования"""
+        return self.due, self.order
+
+class ReassessmentScheduler:
+    """Сроки повторных оценок пациентов в куче и тревоги при повышении риска"""
+
+    def __init__(self, intervals=REASSESSMENT_INTERVALS, scales=SCALE_IDS, alert_level=DEFAULT_ALERT_LEVEL,
+                 cooldown=DEFAULT_COOLDOWN):
+        if len(intervals) != len(RISK_CLASS_NAMES):
+            raise ValueError('Нужен интервал для каждого уровня риска')
+        self.intervals = tuple(intervals)
+        self.scales = tuple(scales)
+        self.alert_level = alert_level
+        self.cooldown = cooldown
+        self.patients = {}
+        self.alerts = deque(maxlen=ALERT_HISTORY)
+        self._heap = []
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self.patients)
+
+    def __contains__(self, patient_id):
+        return patient_id in self.patients
+
+    def _place(self, state, index):
+        """Запись пациента в позицию index кучи"""
+        self._heap[index] = state
+        state.index = index
+
+    def _sift_up(self, index):
+        """Подъём записи к корню, пока её срок раньше срока родителя"""
+        heap = self._heap
+        state = heap[index]
+        key = state.key()
+        while index:
+            parent = (index - 1) >> 1
+            if heap[parent].key() <= key:
+                break
+            self._place(heap[parent], index)
+            index = parent
+        self._place(state, index)
+
+    def _sift_down(self, index):
+        """Опускание записи, пока срок одного из потомков раньше её срока"""
+        heap = self._heap
+        size = len(heap)
+        state = heap[index]
+        key = state.key()
+        while True:
+            child = 2 * index + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1].key() < heap[child].key():
+                child += 1
+            if heap[child].key() >= key:
+                break
+            self._place(heap[child], index)
+            index = child
+        self._place(state, index)
+
+    def _remove(self, state):
+        """Удаление записи пациента из кучи"""
+        index = state.index
+        state.index = None
+        last = self._heap.pop()
+        if last is not state:
+            self._place(last, index)
+            self._sift_down(index)
+            self._sift_up(last.index)
+
+    def _schedule(self, state, due):
+        """Срок due для пациента: новая запись или сдвиг существующей"""
+        state.due = due
+        state.order = next(self._counter)
+        if state.index is None:
+            self._heap.append(state)
+            self._sift_up(len(self._heap) - 1)
+        else:
+            self._sift_down(state.index)
+            self._sift_up(state.index)
+
+    def update(self, patient_id, results, now=None):
+        """
+        Новый результат пациента (словарь calculate_* по шкалам): срок следующей оценки
+        по уровню риска; возвращает тревогу (словарь) или None
+        """
+        now = time.time() if now is None else now
+        level, scales = risk_level(results, self.scales)
+        state = self.patients.get(patient_id)
+        if state is None:
+            state = self.patients[patient_id] = _Patient(patient_id)
+        previous = state.level
+        state.level = level
+        state.assessed_at = now
+        self._schedule(state, now + self.intervals[level])
+
+        if level < self.alert_level or (previous is not None and level <= previous):
+            return None
+        if level <= state.alerted_level and now - state.alerted_at < self.cooldown:
+            return None
+        state.alerted_level = level
+        state.alerted_at = now
+        alert = {'patient_id': patient_id, 'time': now, 'level': level, 'previous': previous, 'scales': scales}
+        self.alerts.append(alert)
+        return alert
+
+    def due(self, patient_id):
+        """Срок следующей оценки пациента (None — не запланирована)"""
+        state = self.patients[patient_id]
+        return None if state.index is None else state.due
+
+    def level(self, patient_id):
+        """Текущий уровень риска пациента"""
+        return self.patients[patient_id].level
+
+    def next_due(self):
+        """Пациент с ближайшим сроком: (patient_id, срок) или None"""
+        if not self._heap:
+            return None
+        state = self._heap[0]
+        return state.patient_id, state.due
+
+    def pop(self, now=None):
+        """
+        Извлечение пациента с ближайшим сроком, если он наступил к now (None — любой срок):
+        (patient_id, срок) или None. Следующий срок назначит новый результат или postpone
+        """
+        if not self._heap or (now is not None and self._heap[0].due > now):
+            return None
+        state = self._heap[0]
+        self._remove(state)
+        return state.patient_id, state.due
+
+    def overdue(self, now=None, limit=None):
+        """Просроченные пациенты [(patient_id, срок)] от самого давнего срока, не больше limit"""
+        now = time.time() if now is None else now
+        heap = self._heap
+        found = []
+        # Потомки записи кучи не раньше её самой: обход идёт от корня в порядке сроков
+        # и не заходит в поддеревья с непросроченным корнем
+        frontier = [(heap[0].key(), 0)] if heap and heap[0].due <= now else []
+        while frontier and (limit is None or len(found) < limit):
+            _, index = heapq.heappop(frontier)
+            state = heap[index]
+            found.append((state.patient_id, state.due))
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(heap) and heap[child].due <= now:
+                    heapq.heappush(frontier, (heap[child].key(), child))
+        return found
+
+    def postpone(self, patient_id, delay, now=None):
+        """Перенос следующей оценки пациента на delay секунд от now"""
+        now = time.time() if now is None else now
+        self._schedule(self.patients[patient_id], now + delay)
+
+    def discharge(self, patient_id):
+        """Удаление пациента из планировщика"""
+        state = self.patients.pop(patient_id, None)
+        if state is not None and state.index is not None:
+            self._remove(state)
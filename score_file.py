@@ -0,0 +1,450 @@
+"""
+Потоковый расчёт всех шкал для больших выгрузок CSV/JSONL/Parquet/Arrow IPC
+
+Входной файл читается блоками по chunk_size строк, каждый блок
+рассчитывается векторно и сразу дописывается в выходной файл, поэтому
+расход памяти не зависит от размера файла.
+
+Parquet и Arrow IPC читаются через pyarrow без разбора текста: из файла
+берутся только столбцы параметров шкал и --keep, Parquet — по группам строк,
+Arrow IPC — по пакетам записей из отображённого в память файла. В Parquet
+и Arrow IPC столбцы *_riskClass записываются со словарным кодированием.
+
+С --quarantine каждый блок перед расчётом проходит проверку validation.py:
+значения приводятся векторно (десятичная запятая — только с --decimal-comma),
+строки с неразобранными, выходящими за допустимый диапазон значениями или
+неизвестными вариантами не рассчитываются и записываются в файл карантина
+с номером строки, исходным текстом значений и кодами причин.
+
+В параллельном режиме (--workers > 1) файл делится на диапазоны байтов
+по границам строк, диапазоны рассчитываются в пуле процессов, каждый
+в свой файл-часть, а затем части склеиваются в исходном порядке строк.
+Поля CSV с переводами строк внутри кавычек в этом режиме не поддерживаются.
+
+Пример:
+    python score_file.py vitals.csv scores.csv --chunk-size 200000 --keep patient_id
+    python score_file.py vitals.csv scores.csv --workers 32 --shard-size 64
+    python score_file.py vitals.parquet scores.parquet --keep patient_id
+    python score_file.py vitals.csv scores.csv --quarantine rejected.csv
+    python score_file.py vitals.csv scores.csv --quarantine rejected.csv --decimal-comma
+"""
+
+import argparse
+import io
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from calculations import CHOICE_PARAMS, NUMERIC_PARAMS, calculate_all_batch
+from validation import quarantine_frame, validate
+
+DEFAULT_CHUNK_SIZE = 100_000
+DEFAULT_SHARD_SIZE_MB = 64
+
+FORMATS = {
+    '.csv': 'csv',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+    '.parquet': 'parquet',
+    '.arrow': 'arrow',
+    '.feather': 'arrow'
+}
+
+# Форматы, которые читаются и пишутся через pyarrow
+ARROW_FORMATS = ('parquet', 'arrow')
+
+RISK_CLASS_VALUES = ('low-risk', 'medium-risk', 'high-risk')
+
+def detect_format(path, explicit=None):
+    """Формат файла по явному указанию или по расширению"""
+    if explicit:
+        return explicit
+    for suffix, fmt in FORMATS.items():
+        if path.lower().endswith(suffix):
+            return fmt
+    raise ValueError(f'Не удалось определить формат файла {path}: укажите его явно')
+
+def _read_csv_chunks(source, chunk_size, columns, text_columns=()):
+    """Блоки CSV только с нужными столбцами; text_columns читаются как строки без выведения типа"""
+    reader = pd.read_csv(
+        source,
+        chunksize=chunk_size,
+        usecols=lambda name: name in columns,
+        dtype={**{key: 'object' for key in CHOICE_PARAMS}, **{key: 'string' for key in text_columns}}
+    )
+    with reader:
+        yield from reader
+
+def _read_jsonl_chunks(lines, chunk_size, columns, text_columns=()):
+    """Блоки JSONL: по chunk_size записей, только нужные ключи; text_columns — текстом JSON"""
+    records = []
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        record = {key: record.get(key) for key in columns}
+        for key in text_columns:
+            value = record[key]
+            if value is not None and not isinstance(value, str):
+                record[key] = json.dumps(value, ensure_ascii=False)
+        records.append(record)
+        if len(records) >= chunk_size:
+            yield pd.DataFrame.from_records(records, columns=columns)
+            records = []
+    if records:
+        yield pd.DataFrame.from_records(records, columns=columns)
+
+def _read_jsonl_file(path, chunk_size, columns, text_columns=()):
+    """Блоки JSONL из файла"""
+    with open(path, encoding='utf-8') as handle:
+        yield from _read_jsonl_chunks(handle, chunk_size, columns, text_columns)
+
+def _arrow_frame(batch, columns):
+    """Пакет записей Arrow в DataFrame с нужными столбцами (отсутствующие — пустые)"""
+    return batch.to_pandas().reindex(columns=columns)
+
+def _read_parquet_chunks(path, chunk_size, columns):
+    """Блоки Parquet: чтение по группам строк только нужных столбцов"""
+    import pyarrow.parquet as pq
+
+    with pq.ParquetFile(path) as parquet:
+        present = [name for name in columns if name in parquet.schema_arrow.names]
+        for batch in parquet.iter_batches(batch_size=chunk_size, columns=present):
+            yield _arrow_frame(batch, columns)
+
+def _read_arrow_chunks(path, chunk_size, columns):
+    """Блоки Arrow IPC (файл или поток): пакеты записей из отображённого в память файла"""
+    import pyarrow as pa
+
+    with pa.memory_map(path) as source:
+        try:
+            reader = pa.ipc.open_file(source)
+            batches = (reader.get_batch(index) for index in range(reader.num_record_batches))
+        except pa.ArrowInvalid:
+            source.seek(0)
+            reader = pa.ipc.open_stream(source)
+            batches = iter(reader)
+        present = [name for name in columns if name in reader.schema.names]
+        for batch in batches:
+            batch = batch.select(present)
+            for offset in range(0, batch.num_rows, chunk_size):
+                yield _arrow_frame(batch.slice(offset, chunk_size), columns)
+
+def _input_columns(keep):
+    """Сохраняемые столбцы и параметры шкал без повторов"""
+    return list(keep) + [key for key in NUMERIC_PARAMS + CHOICE_PARAMS if key not in keep]
+
+def iter_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE, fmt=None, keep=(), keep_as_text=False, all_as_text=False):
+    """
+    Чтение входного файла блоками DataFrame с параметрами шкал и сохраняемыми столбцами.
+    С keep_as_text сохраняемые столбцы CSV/JSONL читаются строками: тип, выведенный
+    по отдельному блоку, может отличаться от блока к блоку, а ведущие нули теряются.
+    С all_as_text строками читаются и параметры шкал (исходный текст для карантина)
+    """
+    columns = _input_columns(keep)
+    fmt = detect_format(path, fmt)
+    text_columns = tuple(columns) if all_as_text else tuple(keep) if keep_as_text else ()
+    if fmt == 'csv':
+        return _read_csv_chunks(path, chunk_size, columns, text_columns)
+    if fmt == 'parquet':
+        return _read_parquet_chunks(path, chunk_size, columns)
+    if fmt == 'arrow':
+        return _read_arrow_chunks(path, chunk_size, columns)
+    return _read_jsonl_file(path, chunk_size, columns, text_columns)
+
+def score_chunk(chunk, keep=()):
+    """Расчёт всех шкал для блока с сохранением указанных входных столбцов"""
+    scores = calculate_all_batch(chunk)
+    if not keep:
+        return scores
+    kept = chunk.reindex(columns=list(keep))
+    return pd.concat([kept, scores], axis=1)
+
+def write_chunk(handle, frame, fmt, first):
+    """Дописывание блока результатов в открытый выходной файл"""
+    if fmt == 'csv':
+        frame.to_csv(handle, header=first, index=False)
+        return
+    text = frame.to_json(orient='records', lines=True, force_ascii=False)
+    handle.write(text)
+    if text and not text.endswith('\n'):
+        handle.write('\n')
+
+def _arrow_table(frame):
+    """Блок результатов в таблицу Arrow; столбцы *_riskClass — словарные с постоянным словарём"""
+    import pyarrow as pa
+
+    frame = frame.copy(deep=False)
+    for name in frame.columns:
+        if name.endswith('_riskClass'):
+            values = frame[name].to_numpy(dtype=object)
+            codes = np.zeros(len(values), dtype=np.int8)
+            for code, risk_class in enumerate(RISK_CLASS_VALUES[1:], start=1):
+                codes[values == risk_class] = code
+            frame[name] = pd.Categorical.from_codes(codes, categories=RISK_CLASS_VALUES)
+    return pa.Table.from_pandas(frame, preserve_index=False)
+
+class _TextWriter:
+    """Запись блоков CSV/JSONL в текстовый файл"""
+
+    def __init__(self, path, fmt):
+        self.fmt = fmt
+        self.first = True
+        self.handle = open(path, 'w', encoding='utf-8', newline='')
+
+    def write(self, frame):
+        write_chunk(self.handle, frame, self.fmt, self.first)
+        self.first = False
+
+    def close(self):
+        self.handle.close()
+
+class _ArrowWriter:
+    """Запись блоков в Parquet или Arrow IPC; схема определяется первым блоком, остальные приводятся к ней"""
+
+    def __init__(self, path, fmt):
+        self.path = path
+        self.fmt = fmt
+        self.writer = None
+        self.schema = None
+
+    def write(self, frame):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = _arrow_table(frame)
+        if self.writer is None:
+            if self.fmt == 'parquet':
+                self.writer = pq.ParquetWriter(self.path, table.schema, compression='zstd')
+            else:
+                self.writer = pa.ipc.new_file(self.path, table.schema)
+            self.schema = table.schema
+        elif table.schema != self.schema:
+            table = table.cast(self.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+def open_writer(path, fmt):
+    """Потоковая запись блоков результатов в файл формата fmt"""
+    if fmt in ARROW_FORMATS:
+        return _ArrowWriter(path, fmt)
+    return _TextWriter(path, fmt)
+
+def check_chunk(chunk, first_row=0, decimal_comma=False):
+    """Проверка блока: приведённый блок только с допустимыми строками и карантин (или None)"""
+    clean, valid, reasons = validate(chunk, decimal_comma)
+    checked = chunk.copy(deep=False)
+    for key in clean:
+        checked[key] = clean[key]
+    if valid.all():
+        return checked, None
+    return checked[valid], quarantine_frame(chunk, valid, reasons, first_row)
+
+def score_file(input_path, output_path, chunk_size=DEFAULT_CHUNK_SIZE, input_format=None,
+               output_format=None, keep=(), progress=None, quarantine=None, quarantine_format=None,
+               decimal_comma=False):
+    """
+    Потоковый расчёт файла; возвращает число рассчитанных строк, время в секундах
+    и число строк в карантине. С quarantine строки, не прошедшие проверку,
+    пишутся в этот файл вместо расчёта; параметры CSV/JSONL при этом читаются
+    строками, чтобы в карантин попал исходный текст значений
+    """
+    input_format = detect_format(input_path, input_format)
+    output_format = detect_format(output_path, output_format)
+    rows = 0
+    scored = 0
+    quarantined_rows = 0
+    started = time.perf_counter()
+
+    writer = open_writer(output_path, output_format)
+    rejected = None if quarantine is None else open_writer(quarantine, detect_format(quarantine, quarantine_format))
+    try:
+        chunks = iter_chunks(input_path, chunk_size, input_format, keep, keep_as_text=True,
+                             all_as_text=rejected is not None)
+        for chunk in chunks:
+            if rejected is not None:
+                checked, quarantined = check_chunk(chunk, rows, decimal_comma)
+                if quarantined is not None:
+                    rejected.write(quarantined)
+                    quarantined_rows += len(quarantined)
+            else:
+                checked = chunk
+            writer.write(score_chunk(checked, keep))
+            rows += len(chunk)
+            scored += len(checked)
+            if progress is not None:
+                progress(rows, time.perf_counter() - started)
+        if rows == 0 and output_format in ARROW_FORMATS:
+            # Пустой Parquet/Arrow всё равно должен содержать схему
+            writer.write(score_chunk(pd.DataFrame(columns=_input_columns(keep)), keep))
+    finally:
+        writer.close()
+        if rejected is not None:
+            rejected.close()
+
+    return scored, time.perf_counter() - started, quarantined_rows
+
+def plan_shards(path, shard_size, fmt):
+    """Заголовок CSV и диапазоны байтов [start, end) для параллельного расчёта"""
+    header = b''
+    if fmt == 'csv':
+        with open(path, 'rb') as handle:
+            header = handle.readline()
+    size = os.path.getsize(path)
+    starts = range(len(header), size, shard_size)
+    return header, [(start, min(start + shard_size, size)) for start in starts]
+
+def _read_shard(path, start, end):
+    """Строки, начинающиеся внутри диапазона [start, end)"""
+    with open(path, 'rb') as handle:
+        # Строка, начатая в предыдущем диапазоне, принадлежит ему
+        handle.seek(start - 1 if start > 0 else 0)
+        if start > 0:
+            handle.readline()
+        position = handle.tell()
+        if position >= end:
+            return b''
+        data = handle.read(end - position)
+        if data and not data.endswith(b'\n'):
+            data += handle.readline()
+        return data
+
+def _score_shard(task):
+    """Расчёт одного диапазона в процессе пула: результат пишется в файл-часть"""
+    path, fmt, header, start, end, part_path, output_format, keep, chunk_size = task
+    data = _read_shard(path, start, end)
+    columns = _input_columns(keep)
+    if not data:
+        chunks = [pd.DataFrame(columns=columns).astype({key: 'string' for key in keep})]
+    elif fmt == 'csv':
+        chunks = _read_csv_chunks(io.BytesIO(header + data), chunk_size, columns, keep)
+    else:
+        chunks = _read_jsonl_chunks(io.StringIO(data.decode('utf-8')), chunk_size, columns, keep)
+
+    rows = 0
+    with open(part_path, 'w', encoding='utf-8', newline='') as handle:
+        for chunk in chunks:
+            write_chunk(handle, score_chunk(chunk, keep), output_format, rows == 0)
+            rows += len(chunk)
+    return rows
+
+def _merge_parts(part_paths, output_path, output_format):
+    """Склейка файлов-частей в исходном порядке (заголовок CSV — только из первой части)"""
+    with open(output_path, 'wb') as output:
+        for index, part_path in enumerate(part_paths):
+            with open(part_path, 'rb') as part:
+                if output_format == 'csv' and index > 0:
+                    part.readline()
+                shutil.copyfileobj(part, output, 16 * 1024 * 1024)
+            os.remove(part_path)
+
+def score_file_parallel(input_path, output_path, workers=None, shard_size_mb=DEFAULT_SHARD_SIZE_MB,
+                        chunk_size=DEFAULT_CHUNK_SIZE, input_format=None, output_format=None,
+                        keep=(), merge=True, progress=None):
+    """Параллельный расчёт файла в пуле процессов; возвращает число строк и время в секундах
+
+    При merge=False результаты остаются в файлах-частях <output>.partNNNNN.
+    """
+    input_format = detect_format(input_path, input_format)
+    output_format = detect_format(output_path, output_format)
+    if input_format in ARROW_FORMATS or output_format in ARROW_FORMATS:
+        raise ValueError('Параллельный режим поддерживает только CSV и JSONL')
+    started = time.perf_counter()
+
+    header, shards = plan_shards(input_path, int(shard_size_mb * 1024 * 1024), input_format)
+    part_paths = [f'{output_path}.part{index:05d}' for index in range(len(shards))]
+    tasks = [
+        (input_path, input_format, header, start, end, part_path, output_format, tuple(keep), chunk_size)
+        for (start, end), part_path in zip(shards, part_paths)
+    ]
+
+    rows = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for shard_rows in executor.map(_score_shard, tasks):
+            rows += shard_rows
+            if progress is not None:
+                progress(rows, time.perf_counter() - started)
+
+    if merge:
+        _merge_parts(part_paths, output_path, output_format)
+    return rows, time.perf_counter() - started
+
+def _report_progress(rows, elapsed):
+    """Вывод прогресса и пропускной способности в stderr"""
+    rate = rows / elapsed if elapsed > 0 else 0.0
+    print(f'{rows} строк, {elapsed:.1f} с, {rate:,.0f} строк/с', file=sys.stderr)
+
+def build_parser():
+    """Аргументы командной строки"""
+    parser = argparse.ArgumentParser(description='Потоковый расчёт шкал сепсиса для файла CSV/JSONL/Parquet/Arrow')
+    parser.add_argument('input', help='входной файл CSV, JSONL, Parquet или Arrow IPC')
+    parser.add_argument('output', help='выходной файл CSV, JSONL, Parquet или Arrow IPC')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f'строк в блоке (по умолчанию {DEFAULT_CHUNK_SIZE})')
+    parser.add_argument('--input-format', choices=sorted(set(FORMATS.values())), help='формат входного файла')
+    parser.add_argument('--output-format', choices=sorted(set(FORMATS.values())), help='формат выходного файла')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='число процессов; больше 1 — параллельный расчёт по диапазонам файла')
+    parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE_MB,
+                        help=f'размер диапазона для одного процесса, МБ (по умолчанию {DEFAULT_SHARD_SIZE_MB})')
+    parser.add_argument('--parts', action='store_true',
+                        help='не склеивать результат, оставить файлы-части <output>.partNNNNN')
+    parser.add_argument('--keep', nargs='*', default=[],
+                        help='входные столбцы, переносимые в результат (например, patient_id)')
+    parser.add_argument('--quarantine',
+                        help='проверять входные значения; недопустимые строки записать в этот файл с причинами')
+    parser.add_argument('--decimal-comma', action='store_true',
+                        help='принимать десятичную запятую («38,5») при проверке --quarantine')
+    parser.add_argument('--quarantine-format', choices=sorted(set(FORMATS.values())), help='формат файла карантина')
+    parser.add_argument('--quiet', action='store_true', help='не выводить прогресс по блокам')
+    return parser
+
+def main(argv=None):
+    """Точка входа командной строки"""
+    args = build_parser().parse_args(argv)
+    if args.chunk_size <= 0:
+        raise SystemExit('--chunk-size должен быть положительным')
+    if args.workers <= 0 or args.shard_size <= 0:
+        raise SystemExit('--workers и --shard-size должны быть положительными')
+
+    options = {
+        'chunk_size': args.chunk_size,
+        'input_format': args.input_format,
+        'output_format': args.output_format,
+        'keep': args.keep,
+        'progress': None if args.quiet else _report_progress
+    }
+    if args.workers > 1:
+        formats = (detect_format(args.input, args.input_format), detect_format(args.output, args.output_format))
+        if any(fmt in ARROW_FORMATS for fmt in formats):
+            raise SystemExit('--workers больше 1 поддерживается только для CSV и JSONL')
+        if args.quarantine:
+            raise SystemExit('--quarantine поддерживается только при --workers 1')
+        rows, elapsed = score_file_parallel(
+            args.input,
+            args.output,
+            workers=args.workers,
+            shard_size_mb=args.shard_size,
+            merge=not args.parts,
+            **options
+        )
+    else:
+        rows, elapsed, quarantined = score_file(args.input, args.output, quarantine=args.quarantine,
+                                                quarantine_format=args.quarantine_format,
+                                                decimal_comma=args.decimal_comma, **options)
+        if args.quarantine:
+            print(f'В карантине: {quarantined} строк ({args.quarantine})', file=sys.stderr)
+    rate = rows / elapsed if elapsed > 0 else 0.0
+    print(f'Готово: {rows} строк за {elapsed:.1f} с ({rate:,.0f} строк/с)', file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
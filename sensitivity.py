@@ -0,0 +1,178 @@
+"""
+Чувствительность шкал к параметрам пациента
+
+thresholds — для каждой шкалы и каждого заполненного параметра ближайшие
+границы диапазонов вниз и вверх, на которых меняются баллы параметра,
+и ближайшие границы, на которых меняется уровень риска шкалы (остальные
+параметры не меняются). Для категориальных параметров — варианты,
+которые меняют баллы.
+
+grid — сетка «что если» по двум числовым параметрам: баллы и уровни
+риска всех шкал для каждой пары значений. Баллы шкалы — сумма баллов
+параметров, поэтому сетка собирается из двух одномерных столбцов баллов
+сложением с транслированием NumPy, без расчёта по каждой точке.
+
+Пример:
+    thresholds(values)['moews']['params']['hr']['riskUp']
+    grid(values, 'hr', 'sbp')['levels']['moews']
+"""
+
+from bisect import bisect_right
+
+import numpy as np
+
+from calculations import CHOICE_OPTIONS, INPUT_RANGES, NUMERIC_PARAMS, RISK_CLASS_NAMES, SCALES, parse_record
+
+DEFAULT_GRID_SIZE = 300
+
+def _level(scale, score):
+    """Код риска (0 — низкий, 1 — средний, 2 — высокий) по сумме баллов"""
+    return scale['riskLevels'][bisect_right(scale['riskBreaks'], score)]
+
+def _limit(bound):
+    """Граница таблицы для показа: (число, граница вида «> число»)
+
+    Границы вида «> x» хранятся как наименьшее число больше x; для показа
+    выбирается запись с меньшим числом знаков.
+    """
+    below = float(np.nextafter(bound, -np.inf))
+    if len(repr(below)) < len(repr(bound)):
+        return below, True
+    return float(bound), False
+
+def _crossing(scale, value, bound, upward, points, score):
+    """Описание перехода через границу bound: условие, изменение значения и новый результат"""
+    limit, strict = _limit(bound)
+    # Ближайшее значение в новом диапазоне
+    target = float(bound) if upward else float(np.nextafter(bound, -np.inf))
+    if upward:
+        condition = f'> {limit:g}' if strict else f'≥ {limit:g}'
+    else:
+        condition = f'≤ {limit:g}' if strict else f'< {limit:g}'
+    level = _level(scale, score)
+    return {
+        'limit': limit,
+        'condition': condition,
+        'target': target,
+        'delta': limit - value,
+        'points': points,
+        'score': score,
+        'riskClass': f'{RISK_CLASS_NAMES[level]}-risk'
+    }
+
+def _numeric_thresholds(scale, score, value, breaks, points):
+    """Ближайшие границы вниз и вверх: смена баллов параметра и смена уровня риска"""
+    band = bisect_right(breaks, value)
+    current = points[band]
+    base = score - current
+    level = _level(scale, score)
+    result = {'value': value, 'points': current, 'down': None, 'up': None, 'riskDown': None, 'riskUp': None}
+    # Вверх: диапазон band + 1 начинается с breaks[band]; вниз: из диапазона band уходим ниже breaks[band - 1]
+    for upward, bands in ((False, range(band - 1, -1, -1)), (True, range(band + 1, len(points)))):
+        suffix = 'Up' if upward else 'Down'
+        for other in bands:
+            if points[other] == current:
+                continue
+            bound = breaks[other - 1] if upward else breaks[other]
+            crossing = _crossing(scale, value, bound, upward, points[other], base + points[other])
+            key = suffix.lower()
+            if result[key] is None:
+                result[key] = crossing
+            if _level(scale, base + points[other]) != level:
+                result[f'risk{suffix}'] = crossing
+                break
+    return result
+
+def thresholds(values, scale_ids=None):
+    """
+    Ближайшие границы, меняющие результат, для каждой шкалы и заполненного параметра.
+
+    Для числового параметра: value, points и переходы down/up (ближайшая смена
+    баллов) и riskDown/riskUp (ближайшая смена уровня риска) — словари с limit,
+    condition, target (ближайшее значение за границей), delta (изменение
+    значения до границы), points, score, riskClass или None. Для категориального:
+    value, points и options — варианты, дающие другие баллы, с points, score
+    и riskClass.
+    """
+    record = parse_record(values)
+    results = {}
+    for scale_id in scale_ids or SCALES:
+        scale = SCALES[scale_id]
+        present = {}
+        for key, (breaks, points) in scale['numeric'].items():
+            value = record.get(key)
+            if value is not None:
+                present[key] = (value, points[bisect_right(breaks, value)])
+        for key, choice_points in scale['choice'].items():
+            value = record.get(key)
+            if value is not None:
+                present[key] = (value, choice_points.get(value, 0))
+        score = sum(points for _, points in present.values())
+
+        params = {}
+        for key, (value, current) in present.items():
+            if key in scale['numeric']:
+                breaks, points = scale['numeric'][key]
+                params[key] = _numeric_thresholds(scale, score, value, breaks, points)
+                continue
+            options = {}
+            for option in CHOICE_OPTIONS[key]:
+                points = scale['choice'][key].get(option, 0)
+                if points != current:
+                    level = _level(scale, score - current + points)
+                    options[option] = {'points': points, 'score': score - current + points,
+                                       'riskClass': f'{RISK_CLASS_NAMES[level]}-risk'}
+            params[key] = {'value': value, 'points': current, 'options': options}
+
+        level = _level(scale, score)
+        results[scale_id] = {'score': score, 'riskClass': f'{RISK_CLASS_NAMES[level]}-risk', 'params': params}
+    return results
+
+def grid_axis(key, size=DEFAULT_GRID_SIZE):
+    """Равномерная ось сетки по диапазону поля ввода параметра"""
+    low, high = INPUT_RANGES[key]
+    return np.linspace(low, high, size)
+
+def grid(values, x_key, y_key, x_values=None, y_values=None, size=DEFAULT_GRID_SIZE, scale_ids=None):
+    """
+    Сетка «что если» по двум числовым параметрам (остальные — из values).
+
+    Возвращает x, y и для каждой шкалы scores и levels (0–2) — массивы формы
+    (len(y), len(x)); оси по умолчанию — size точек по диапазонам полей ввода.
+    """
+    for key in (x_key, y_key):
+        if key not in NUMERIC_PARAMS:
+            raise ValueError(f'{key}: сетка строится только по числовым параметрам')
+    if x_key == y_key:
+        raise ValueError('параметры осей сетки должны различаться')
+    x = grid_axis(x_key, size) if x_values is None else np.asarray(x_values, dtype=np.float64)
+    y = grid_axis(y_key, size) if y_values is None else np.asarray(y_values, dtype=np.float64)
+    record = parse_record(values)
+
+    scores = {}
+    levels = {}
+    for scale_id in scale_ids or SCALES:
+        scale = SCALES[scale_id]
+        # Баллы остальных параметров — постоянная часть суммы
+        base = 0
+        for key, (breaks, points) in scale['numeric'].items():
+            value = record.get(key)
+            if key not in (x_key, y_key) and value is not None:
+                base += points[bisect_right(breaks, value)]
+        for key, choice_points in scale['choice'].items():
+            value = record.get(key)
+            if value is not None:
+                base += choice_points.get(value, 0)
+        axis_points = []
+        for key, axis in ((x_key, x), (y_key, y)):
+            if key in scale['numeric']:
+                breaks, points = scale['numeric'][key]
+                axis_points.append(np.asarray(points)[np.searchsorted(breaks, axis, side='right')])
+            else:
+                axis_points.append(np.zeros(len(axis), dtype=np.int64))
+        score = base + axis_points[1][:, None] + axis_points[0][None, :]
+        scores[scale_id] = score
+        levels[scale_id] = np.asarray(scale['riskLevels'])[
+            np.searchsorted(scale['riskBreaks'], score, side='right')
+        ]
+    return {'x': x, 'y': y, 'scores': scores, 'levels': levels}
@@ -0,0 +1,336 @@
+"""
+Локальный HTTP-сервис расчёта шкал на asyncio с микропакетной обработкой
+
+Запросы, пришедшие в течение короткого окна (--window-ms), объединяются
+в один векторный расчёт calculate_all_batch, после чего каждому запросу
+возвращается его часть результата. Записи проверяются до постановки
+в пакет: запрос с недопустимым значением (число вне диапазона float,
+список вместо значения) получает ответ 400, не затрагивая остальные.
+
+Маршруты:
+    POST /score    — объект values (один пациент) или массив объектов (пакет)
+    GET  /health   — состояние сервиса
+    GET  /metrics  — счётчики и перцентили задержки
+
+Пример:
+    python service.py --port 8765 --window-ms 2
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+
+import numpy as np
+
+from calculations import CHOICE_PARAMS, NUMERIC_PARAMS, SCALE_PARAMS, calculate_all_batch, scale_result
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_WINDOW_MS = 2.0
+DEFAULT_MAX_BATCH = 4096
+LATENCY_WINDOW = 10_000
+MAX_BODY = 64 * 1024 * 1024
+
+STATUS_TEXT = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+    500: 'Internal Server Error'
+}
+
+def _numeric_column(values):
+    """Числовой столбец: быстрый путь через NumPy, иначе — исходный список для parse_float"""
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (ValueError, TypeError):
+        return values
+
+def record_error(values):
+    """Описание значения записи, которое нельзя рассчитать, или None"""
+    for key in NUMERIC_PARAMS:
+        value = values.get(key)
+        if value is None or isinstance(value, str):
+            continue
+        if not isinstance(value, (int, float)):
+            return f'{key}: ожидается число или строка'
+        try:
+            float(value)
+        except OverflowError:
+            return f'{key}: число вне диапазона'
+    for key in CHOICE_PARAMS:
+        value = values.get(key)
+        if value is not None and not isinstance(value, (str, int, float)):
+            return f'{key}: ожидается строка'
+    return None
+
+def records_to_columns(records):
+    """Список словарей values в словарь столбцов для calculate_all_batch"""
+    columns = {key: _numeric_column([record.get(key) for record in records]) for key in NUMERIC_PARAMS}
+    for key in CHOICE_PARAMS:
+        columns[key] = np.array([record.get(key) for record in records], dtype=object)
+    return columns
+
+def results_from_batch(batch, count):
+    """Разбор столбцов calculate_all_batch в словари результатов по шкалам для каждой строки"""
+    scores = {scale_id: batch[f'{scale_id}_score'].tolist() for scale_id in SCALE_PARAMS}
+    used = {scale_id: batch[f'{scale_id}_usedParams'].tolist() for scale_id in SCALE_PARAMS}
+    return [
+        {scale_id: scale_result(scale_id, scores[scale_id][row], used[scale_id][row]) for scale_id in SCALE_PARAMS}
+        for row in range(count)
+    ]
+
+class Metrics:
+    """Счётчики сервиса и скользящее окно задержек запросов"""
+
+    def __init__(self):
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.rows = 0
+        self.batches = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def observe(self, seconds):
+        """Учёт завершённого запроса"""
+        self.requests += 1
+        self.latencies.append(seconds)
+
+    def snapshot(self):
+        """Текущие значения метрик"""
+        latencies = np.fromiter(self.latencies, dtype=np.float64, count=len(self.latencies))
+        percentiles = {}
+        if latencies.size:
+            for name, value in zip(('p50', 'p95', 'p99'), np.percentile(latencies, (50, 95, 99))):
+                percentiles[f'latency_{name}_ms'] = round(float(value) * 1000, 3)
+        return {
+            'uptime_s': round(time.time() - self.started, 1),
+            'requests': self.requests,
+            'errors': self.errors,
+            'rows': self.rows,
+            'batches': self.batches,
+            'mean_batch_rows': round(self.rows / self.batches, 2) if self.batches else 0.0,
+            **percentiles
+        }
+
+class MicroBatcher:
+    """Сбор запросов за короткое окно и их совместный векторный расчёт"""
+
+    def __init__(self, metrics, window_ms=DEFAULT_WINDOW_MS, max_batch=DEFAULT_MAX_BATCH):
+        self.metrics = metrics
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue()
+        self.task = None
+
+    def start(self):
+        """Запуск фонового цикла обработки"""
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Остановка фонового цикла"""
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    async def score(self, records):
+        """Результаты для списка записей values после ближайшего пакетного расчёта"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((records, future))
+        return await future
+
+    async def _run(self):
+        """Цикл: первый запрос открывает окно, всё пришедшее до его конца считается вместе"""
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self.queue.get()]
+            rows = len(pending[0][0])
+            deadline = loop.time() + self.window
+            while rows < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                rows += len(item[0])
+            self._flush(pending)
+
+    def _flush(self, pending):
+        """Один векторный расчёт для всех собранных запросов"""
+        records = [record for request_records, _ in pending for record in request_records]
+        try:
+            results = results_from_batch(calculate_all_batch(records_to_columns(records)), len(records))
+        except Exception as error:
+            # Ошибка одного запроса не должна завершать ошибкой остальные запросы пакета
+            if len(pending) > 1:
+                for item in pending:
+                    self._flush([item])
+                return
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        self.metrics.rows += len(records)
+        self.metrics.batches += 1
+        offset = 0
+        for request_records, future in pending:
+            if not future.done():
+                future.set_result(results[offset:offset + len(request_records)])
+            offset += len(request_records)
+
+class RequestError(Exception):
+    """Некорректный запрос: код ответа и сообщение; после ответа соединение закрывается"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class ScoringService:
+    """HTTP/1.1 сервер с поддержкой keep-alive поверх asyncio.start_server"""
+
+    def __init__(self, window_ms=DEFAULT_WINDOW_MS, max_batch=DEFAULT_MAX_BATCH):
+        self.metrics = Metrics()
+        self.batcher = MicroBatcher(self.metrics, window_ms, max_batch)
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Запуск сервера до отмены задачи"""
+        self.batcher.start()
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.stop()
+
+    async def _handle_connection(self, reader, writer):
+        """Обработка запросов одного соединения"""
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                started = time.perf_counter()
+                status, payload = await self._dispatch(method, path, body)
+                if status == 200 and path == '/score':
+                    self.metrics.observe(time.perf_counter() - started)
+                elif status >= 400:
+                    self.metrics.errors += 1
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except RequestError as error:
+            self.metrics.errors += 1
+            self._write_response(writer, error.status, {'error': str(error)}, False)
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        """Строка запроса, заголовки и тело; None — соединение закрыто клиентом"""
+        line = await reader.readline()
+        if not line:
+            return None
+        parts = line.decode('latin-1').split()
+        if len(parts) < 2:
+            raise ConnectionError('Некорректная строка запроса')
+        headers = {}
+        while True:
+            header = await reader.readline()
+            if header in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = header.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get('content-length', 0) or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise RequestError(400, 'Некорректный заголовок Content-Length')
+        if length > MAX_BODY:
+            raise RequestError(413, 'Слишком большой запрос')
+        body = await reader.readexactly(length) if length else b''
+        return parts[0].upper(), parts[1].split('?', 1)[0], headers, body
+
+    async def _dispatch(self, method, path, body):
+        """Маршрутизация запроса; возвращает код ответа и объект для JSON"""
+        if path == '/health':
+            return 200, {'status': 'ok', 'queue': self.batcher.queue.qsize()}
+        if path == '/metrics':
+            return 200, self.metrics.snapshot()
+        if path != '/score':
+            return 404, {'error': f'Неизвестный путь {path}'}
+        if method != 'POST':
+            return 405, {'error': 'Используйте POST'}
+
+        try:
+            payload = json.loads(body or b'null')
+        except ValueError:
+            return 400, {'error': 'Тело запроса должно быть JSON'}
+        single = isinstance(payload, dict)
+        records = [payload] if single else payload
+        if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+            return 400, {'error': 'Ожидается объект values или массив объектов'}
+        if not records:
+            return 200, []
+        for record in records:
+            error = record_error(record)
+            if error is not None:
+                return 400, {'error': error}
+
+        try:
+            results = await self.batcher.score(records)
+        except Exception as error:
+            return 500, {'error': str(error)}
+        return 200, results[0] if single else results
+
+    def _write_response(self, writer, status, payload, keep_alive):
+        """Отправка JSON-ответа"""
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = (
+            f'HTTP/1.1 {status} {STATUS_TEXT.get(status, "")}\r\n'
+            'Content-Type: application/json; charset=utf-8\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'
+        )
+        writer.write(head.encode('latin-1') + body)
+
+def build_parser():
+    """Аргументы командной строки"""
+    parser = argparse.ArgumentParser(description='Локальный HTTP-сервис расчёта шкал сепсиса')
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'адрес (по умолчанию {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'порт (по умолчанию {DEFAULT_PORT})')
+    parser.add_argument('--window-ms', type=float, default=DEFAULT_WINDOW_MS,
+                        help=f'окно сбора микропакета, мс (по умолчанию {DEFAULT_WINDOW_MS})')
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH,
+                        help=f'максимум строк в микропакете (по умолчанию {DEFAULT_MAX_BATCH})')
+    return parser
+
+def main(argv=None):
+    """Точка входа командной строки"""
+    args = build_parser().parse_args(argv)
+    service = ScoringService(args.window_ms, args.max_batch)
+    print(f'Сервис расчёта шкал: http://{args.host}:{args.port}/score')
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
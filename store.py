@@ -0,0 +1,191 @@
+"""
+Хранилище оценок в SQLite (журнал WAL)
+
+Каждая оценка — строка таблицы assessments, которая только пополняется:
+пациент, время, входные параметры и для каждой шкалы баллы, число учтённых
+параметров и уровень риска (0 — низкий, 1 — средний, 2 — высокий).
+Триггер поддерживает таблицу latest с последней оценкой каждого пациента,
+поэтому запрос «пациенты с высоким риском сейчас» не просматривает историю.
+
+Запись выполняется пакетами в одной транзакции (executemany); запросы —
+постоянные строки SQL, которые sqlite3 подготавливает один раз и берёт
+из кэша выражений соединения.
+"""
+
+import sqlite3
+import threading
+import time
+
+from calculations import CHOICE_PARAMS, NUMERIC_PARAMS, SCALE_PARAMS, parse_choice, parse_float
+
+SCALE_IDS = tuple(SCALE_PARAMS)
+RISK_CLASS_LEVELS = {'low-risk': 0, 'medium-risk': 1, 'high-risk': 2}
+RISK_CLASS_BY_LEVEL = tuple(RISK_CLASS_LEVELS)
+HIGH_RISK = RISK_CLASS_LEVELS['high-risk']
+
+INPUT_COLUMNS = NUMERIC_PARAMS + CHOICE_PARAMS
+SCALE_COLUMNS = tuple(
+    f'{scale_id}_{field}' for scale_id in SCALE_IDS for field in ('score', 'used', 'risk')
+)
+COLUMNS = ('patient_id', 'assessed_at') + INPUT_COLUMNS + SCALE_COLUMNS
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS assessments (
+    id INTEGER PRIMARY KEY,
+    patient_id TEXT NOT NULL,
+    assessed_at REAL NOT NULL,
+    {', '.join(f'{key} REAL' for key in NUMERIC_PARAMS)},
+    {', '.join(f'{key} TEXT' for key in CHOICE_PARAMS)},
+    {', '.join(f'{column} INTEGER NOT NULL' for column in SCALE_COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS assessments_patient_time ON assessments (patient_id, assessed_at);
+CREATE INDEX IF NOT EXISTS assessments_time ON assessments (assessed_at);
+CREATE TABLE IF NOT EXISTS latest (
+    patient_id TEXT PRIMARY KEY,
+    assessment_id INTEGER NOT NULL,
+    assessed_at REAL NOT NULL,
+    {', '.join(f'{scale_id}_risk INTEGER NOT NULL' for scale_id in SCALE_IDS)}
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS assessments_latest AFTER INSERT ON assessments BEGIN
+    INSERT INTO latest (patient_id, assessment_id, assessed_at, {', '.join(f'{scale_id}_risk' for scale_id in SCALE_IDS)})
+    VALUES (NEW.patient_id, NEW.id, NEW.assessed_at, {', '.join(f'NEW.{scale_id}_risk' for scale_id in SCALE_IDS)})
+    ON CONFLICT (patient_id) DO UPDATE SET
+        assessment_id = excluded.assessment_id,
+        assessed_at = excluded.assessed_at,
+        {', '.join(f'{scale_id}_risk = excluded.{scale_id}_risk' for scale_id in SCALE_IDS)}
+    WHERE excluded.assessed_at >= latest.assessed_at;
+END;
+"""
+
+INSERT_SQL = f"INSERT INTO assessments ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+SELECT_COLUMNS = ', '.join(f'a.{column}' for column in ('id',) + COLUMNS)
+LATEST_SQL = f"""
+SELECT {SELECT_COLUMNS} FROM assessments a
+WHERE a.patient_id = ? ORDER BY a.assessed_at DESC LIMIT ?
+"""
+HIGH_RISK_SQL = {
+    scale_id: f"""
+SELECT {SELECT_COLUMNS} FROM latest l JOIN assessments a ON a.id = l.assessment_id
+WHERE l.{scale_id}_risk = ? ORDER BY a.assessed_at DESC
+"""
+    for scale_id in SCALE_IDS
+}
+
+def assessment_row(patient_id, values, results, assessed_at):
+    """Строка таблицы assessments по словарю values и результатам calculate_*"""
+    row = [str(patient_id), assessed_at]
+    row.extend(parse_float(values.get(key)) for key in NUMERIC_PARAMS)
+    row.extend(parse_choice(values.get(key)) for key in CHOICE_PARAMS)
+    for scale_id in SCALE_IDS:
+        result = results[scale_id]
+        row.extend((result['score'], result['usedParams'], RISK_CLASS_LEVELS[result['riskClass']]))
+    return row
+
+def batch_rows(patient_ids, assessed_at, columns, scores):
+    """Строки таблицы по столбцам входных данных и результату calculate_all_batch"""
+    n = len(patient_ids)
+    parts = [[str(patient_id) for patient_id in patient_ids]]
+    parts.append([float(assessed_at)] * n if isinstance(assessed_at, (int, float)) else list(map(float, assessed_at)))
+    for key in NUMERIC_PARAMS:
+        column = columns[key] if key in columns else [None] * n
+        parts.append([parse_float(value) for value in column])
+    for key in CHOICE_PARAMS:
+        column = columns[key] if key in columns else [None] * n
+        parts.append([parse_choice(value) for value in column])
+    for scale_id in SCALE_IDS:
+        parts.append([int(value) for value in scores[f'{scale_id}_score']])
+        parts.append([int(value) for value in scores[f'{scale_id}_usedParams']])
+        parts.append([RISK_CLASS_LEVELS[value] for value in scores[f'{scale_id}_riskClass']])
+    return zip(*parts)
+
+def _assessment(row):
+    """Словарь оценки из строки запроса"""
+    offset = 3 + len(INPUT_COLUMNS)
+    results = {}
+    for index, scale_id in enumerate(SCALE_IDS):
+        score, used, risk = row[offset + 3 * index:offset + 3 * index + 3]
+        results[scale_id] = {'score': score, 'usedParams': used, 'riskClass': RISK_CLASS_BY_LEVEL[risk]}
+    return {
+        'id': row[0],
+        'patient_id': row[1],
+        'assessed_at': row[2],
+        'values': dict(zip(INPUT_COLUMNS, row[3:offset])),
+        'results': results
+    }
+
+class AssessmentStore:
+    """Хранилище оценок; одно соединение на экземпляр, операции сериализуются блокировкой"""
+
+    def __init__(self, path, synchronous='NORMAL'):
+        self.path = path
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None,
+                                          cached_statements=64)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute(f'PRAGMA synchronous={synchronous}')
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        """Закрытие соединения"""
+        with self._lock:
+            self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _insert(self, rows):
+        """Вставка строк одной транзакцией; возвращает их число"""
+        with self._lock:
+            cursor = self.connection.cursor()
+            cursor.execute('BEGIN')
+            try:
+                cursor.executemany(INSERT_SQL, rows)
+                inserted = cursor.rowcount
+            except BaseException:
+                cursor.execute('ROLLBACK')
+                raise
+            cursor.execute('COMMIT')
+            return inserted
+
+    def add(self, patient_id, values, results, assessed_at=None):
+        """Сохранение одной оценки (results — словарь результатов calculate_* по шкалам)"""
+        return self.add_many([(patient_id, values, results, assessed_at)])
+
+    def add_many(self, assessments):
+        """Сохранение пакета оценок (patient_id, values, results, assessed_at) одной транзакцией"""
+        now = time.time()
+        return self._insert(
+            assessment_row(patient_id, values, results, now if assessed_at is None else assessed_at)
+            for patient_id, values, results, assessed_at in assessments
+        )
+
+    def add_batch(self, patient_ids, columns, scores, assessed_at=None):
+        """
+        Сохранение пакетного расчёта: columns — входные столбцы (DataFrame или словарь),
+        scores — результат calculate_all_batch, assessed_at — время или массив времён
+        """
+        return self._insert(batch_rows(patient_ids, time.time() if assessed_at is None else assessed_at,
+                                       columns, scores))
+
+    def latest(self, patient_id, limit=10):
+        """Последние limit оценок пациента, от новых к старым"""
+        with self._lock:
+            rows = self.connection.execute(LATEST_SQL, (str(patient_id), limit)).fetchall()
+        return [_assessment(row) for row in rows]
+
+    def high_risk(self, scale_id='moews'):
+        """Последние оценки пациентов, у которых по шкале scale_id сейчас высокий риск"""
+        if scale_id not in HIGH_RISK_SQL:
+            raise ValueError(f'Неизвестная шкала: {scale_id}')
+        with self._lock:
+            rows = self.connection.execute(HIGH_RISK_SQL[scale_id], (HIGH_RISK,)).fetchall()
+        return [_assessment(row) for row in rows]
+
+    def count(self):
+        """Число сохранённых оценок"""
+        with self._lock:
+            return self.connection.execute('SELECT count(*) FROM assessments').fetchone()[0]
@@ -0,0 +1,106 @@
+"""
+Пакетный расчёт (calculate_*_batch, calculate_all_batch) совпадает со скалярным
+"""
+
+import math
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from calculations import (BATCH_FUNCTIONS, CHOICE_OPTIONS, CHOICE_PARAMS, NUMERIC_PARAMS, SCALE_FUNCTIONS, SCALES,
+                          calculate_all, calculate_all_batch, calculate_sirs, parse_float)
+
+ROWS = 3000
+
+def _edge_values():
+    """Границы диапазонов всех шкал и соседние значения по обе стороны"""
+    edges = {key: set() for key in NUMERIC_PARAMS}
+    for scale in SCALES.values():
+        for key, (breaks, _) in scale['numeric'].items():
+            for bound in breaks:
+                bound = float(bound)
+                edges[key].update((bound, math.nextafter(bound, -math.inf), math.nextafter(bound, math.inf),
+                                   round(bound, 1)))
+    return {key: sorted(values) for key, values in edges.items()}
+
+EDGES = _edge_values()
+
+def _numeric_value(rng, key):
+    """Значение числового параметра: граница, случайное число, пусто или мусор"""
+    kind = rng.random()
+    if kind < 0.4 and EDGES[key]:
+        return rng.choice(EDGES[key])
+    if kind < 0.7:
+        return round(rng.uniform(0, 200), 1)
+    return rng.choice((None, '', float('nan'), 'abc', '38,5', ' 37.2 ', '1e2', 'nan'))
+
+def _choice_value(rng, key):
+    return rng.choice((*CHOICE_OPTIONS[key], None, '', float('nan'), 'unknown'))
+
+def random_rows(seed=0, rows=ROWS):
+    rng = random.Random(seed)
+    return [
+        {**{key: _numeric_value(rng, key) for key in NUMERIC_PARAMS},
+         **{key: _choice_value(rng, key) for key in CHOICE_PARAMS}}
+        for _ in range(rows)
+    ]
+
+def to_columns(rows):
+    """Столбцы как object-массивы: смешанные типы разбираются так же, как в скалярных функциях"""
+    return {key: np.array([row[key] for row in rows], dtype=object) for key in NUMERIC_PARAMS + CHOICE_PARAMS}
+
+def _assert_scale(scale_id, batch, expected, prefix=''):
+    assert list(batch[f'{prefix}score']) == [result['score'] for result in expected], scale_id
+    assert list(batch[f'{prefix}usedParams']) == [result['usedParams'] for result in expected], scale_id
+    assert list(batch[f'{prefix}riskClass']) == [result['riskClass'] for result in expected], scale_id
+
+@pytest.mark.parametrize('scale_id', list(SCALE_FUNCTIONS))
+def test_scale_batch_matches_scalar(scale_id):
+    rows = random_rows(seed=1)
+    expected = [SCALE_FUNCTIONS[scale_id](row) for row in rows]
+    _assert_scale(scale_id, BATCH_FUNCTIONS[scale_id](to_columns(rows)), expected)
+
+def test_all_batch_matches_scalar():
+    rows = random_rows(seed=2)
+    expected = [calculate_all(row) for row in rows]
+    for data in (to_columns(rows), pd.DataFrame(rows)):
+        batch = calculate_all_batch(data)
+        for scale_id in SCALE_FUNCTIONS:
+            _assert_scale(scale_id, batch, [results[scale_id] for results in expected], f'{scale_id}_')
+
+def test_float_columns_match_scalar():
+    # Быстрый путь для столбцов float64 (NaN — нет значения)
+    rows = random_rows(seed=3)
+    for row in rows:
+        for key in NUMERIC_PARAMS:
+            value = parse_float(row[key])
+            row[key] = math.nan if value is None else value
+    columns = {key: np.array([row[key] for row in rows], dtype=np.float64) for key in NUMERIC_PARAMS}
+    columns.update({key: np.array([row[key] for row in rows], dtype=object) for key in CHOICE_PARAMS})
+    batch = calculate_all_batch(columns)
+    expected = [calculate_all(row) for row in rows]
+    for scale_id in SCALE_FUNCTIONS:
+        _assert_scale(scale_id, batch, [results[scale_id] for results in expected], f'{scale_id}_')
+
+def test_nan_is_missing():
+    # NaN (и строка 'nan') считается отсутствующим значением, а не учтённым параметром
+    assert parse_float(float('nan')) is None
+    assert parse_float('nan') is None
+    assert calculate_sirs({'temp': float('nan'), 'hr': 'nan'})['usedParams'] == 0
+    assert calculate_sirs({'temp': float('nan'), 'hr': 120})['score'] == 1
+    batch = BATCH_FUNCTIONS['sirs']({'temp': np.array([np.nan]), 'hr': np.array([np.nan])})
+    assert batch['usedParams'][0] == 0
+
+@pytest.mark.parametrize('missing', [float('nan'), 'nan', 'NaN', None, ''])
+def test_nan_used_params(missing):
+    # Регрессия: до исправления NaN считался учтённым параметром (sirs 4, qsofa 3, omqsofa 2, moews 6, sos 8)
+    values = {key: missing for key in NUMERIC_PARAMS}
+    values.update(temp=38.5, sbp=85)
+    expected = {'sirs': 1, 'qsofa': 1, 'omqsofa': 1, 'moews': 2, 'sos': 2}
+    results = calculate_all(values)
+    assert {scale_id: result['usedParams'] for scale_id, result in results.items()} == expected
+    assert {scale_id: SCALE_FUNCTIONS[scale_id](values)['usedParams'] for scale_id in SCALE_FUNCTIONS} == expected
+    batch = calculate_all_batch(to_columns([{**values, **{key: None for key in CHOICE_PARAMS}}]))
+    assert {scale_id: int(batch[f'{scale_id}_usedParams'][0]) for scale_id in SCALE_FUNCTIONS} == expected
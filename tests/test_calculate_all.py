@@ -0,0 +1,22 @@
+"""
+Расчёт всех шкал за один проход (calculate_all, calculate_all_compact) совпадает с функциями calculate_*
+"""
+
+import pytest
+
+from calculations import SCALE_FUNCTIONS, calculate_all, calculate_all_compact, parse_record, results_to_dicts
+from test_batch import random_rows
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_calculate_all_matches_scale_functions(seed):
+    for row in random_rows(seed):
+        expected = {scale_id: function(row) for scale_id, function in SCALE_FUNCTIONS.items()}
+        assert calculate_all(row) == expected
+        assert calculate_all(parse_record(row)) == expected
+        assert results_to_dicts(calculate_all_compact(row)) == expected
+
+def test_results_are_independent():
+    # Словари результатов собираются из общих шаблонов, но не разделяются между вызовами
+    first = calculate_all({'hr': 120})
+    first['sirs']['score'] = 100
+    assert calculate_all({'hr': 120})['sirs']['score'] == 1
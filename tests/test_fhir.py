@@ -0,0 +1,81 @@
+"""
+Приём FHIR (fhir.py) на локальных файлах tests/fixtures/fhir
+
+bundle.json, observations.ndjson и observations.ndjson.gz содержат одни
+и те же ресурсы: у пациента p1 — температура в °F, две ЧСС в разное
+время, панель АД, лактат в мг/дл, ЧД старше окна и GCS (valueInteger);
+у p2 — SpO2 долей, лейкоциты в /мкл, температура в K, ЧСС со статусом
+entered-in-error и наблюдение с неизвестным кодом LOINC.
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from fhir import FhirIngest, iter_resources, open_text, parse_time, score_fhir
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'fhir')
+FILES = ('bundle.json', 'observations.ndjson', 'observations.ndjson.gz')
+HOUR = 3600
+
+P1 = {'temp': 38.0, 'hr': 125.0, 'sbp': 88.0, 'dbp': 60.0, 'lactate': 3.996, 'gcs': 14.0}
+P2 = {'temp': 37.0, 'spo2': 93.0, 'wbc': 15.0}
+
+def ingest(name, read_size=None, **options):
+    result = FhirIngest(**options)
+    if read_size is None:
+        result.add_file(os.path.join(FIXTURES, name))
+    else:
+        result.add_file(os.path.join(FIXTURES, name), read_size)
+    return result
+
+def records(result):
+    return {patient_id: record for patient_id, _, record in result.records()}
+
+@pytest.mark.parametrize('name', FILES)
+def test_mapping_and_units(name):
+    result = ingest(name)
+    assert records(result) == {'p1': P1, 'p2': P2}
+    counts = result.counts
+    assert counts['resources'] == 13
+    assert counts['observations'] == 12
+    assert counts['skipped_status'] == 1
+    assert counts['skipped_code'] == 1
+
+def test_latest_value_wins_regardless_of_order():
+    # ЧСС 80 в 09:00 идёт в файле после ЧСС 125 в 10:00
+    assert records(ingest('bundle.json'))['p1']['hr'] == 125.0
+
+def test_window():
+    # Без окна учитывается ЧД двухдневной давности
+    assert records(ingest('bundle.json', window=None))['p1'] == {**P1, 'rr': 30.0}
+    # Окно 1 ч от последнего наблюдения p1 (10:00) отсекает лактат 08:00
+    assert 'lactate' not in records(ingest('bundle.json', window=HOUR))['p1']
+
+def test_as_of():
+    result = ingest('bundle.json', window=2 * HOUR, as_of=parse_time('2024-05-01T09:30:00Z'))
+    # Наблюдения после as_of не учитываются (entered-in-error отброшено раньше); p2 наблюдался только позже
+    assert records(result) == {'p1': {'hr': 80.0, 'lactate': 3.996}}
+    assert result.counts['skipped_after_as_of'] == 8
+
+@pytest.mark.parametrize('read_size', [1, 7, 64, 1000])
+def test_bundle_larger_than_read_buffer(read_size):
+    # Bundle не помещается в буфер: entry разбираются по одному с дочитыванием блоков
+    assert os.path.getsize(os.path.join(FIXTURES, 'bundle.json')) > read_size
+    with open_text(os.path.join(FIXTURES, 'bundle.json')) as handle:
+        streamed = list(iter_resources(handle, read_size))
+    with open_text(os.path.join(FIXTURES, 'observations.ndjson')) as handle:
+        assert streamed == list(iter_resources(handle))
+    assert records(ingest('bundle.json', read_size)) == {'p1': P1, 'p2': P2}
+
+def test_score_fhir(tmp_path):
+    output = str(tmp_path / 'scores.csv')
+    rows, _, _ = score_fhir([os.path.join(FIXTURES, 'observations.ndjson.gz')], output)
+    assert rows == 2
+    frame = pd.read_csv(output, dtype={'patient_id': str}).set_index('patient_id')
+    assert frame.loc['p1', 'observed_at'] == '2024-05-01T10:00:00Z'
+    assert frame.loc['p1', 'temp'] == 38.0
+    assert frame.loc['p1', 'qsofa_score'] == 1
+    assert frame.loc['p1', 'moews_score'] > 0
+    assert frame.loc['p2', 'sirs_score'] == 1
@@ -0,0 +1,56 @@
+"""
+Потоковый расчёт файла (score_file.py): сохраняемые столбцы и шардирование
+"""
+
+import json
+
+from score_file import score_file, score_file_parallel
+
+IDS = ['007', '010', '', '0042', '59988', '00']
+
+def write_csv(path, ids):
+    lines = ['patient_id,temp,hr'] + [f'{patient_id},38.5,{100 + index % 30}' for index, patient_id in enumerate(ids)]
+    path.write_text('\n'.join(lines) + '\n')
+
+def test_zero_padded_id_survives_csv_round_trip(tmp_path):
+    source = tmp_path / 'vitals.csv'
+    write_csv(source, IDS)
+    output = tmp_path / 'scores.csv'
+    # Блоки по 2 строки: в одном из них id пустой, но остальные не становятся float
+    score_file(str(source), str(output), chunk_size=2, keep=['patient_id'])
+    ids = [line.split(',')[0] for line in output.read_text().splitlines()[1:]]
+    assert ids == IDS
+
+def test_zero_padded_id_in_jsonl(tmp_path):
+    source = tmp_path / 'vitals.csv'
+    write_csv(source, IDS)
+    output = tmp_path / 'scores.jsonl'
+    score_file(str(source), str(output), chunk_size=2, keep=['patient_id'])
+    ids = [json.loads(line)['patient_id'] for line in output.read_text().splitlines()]
+    assert ids == ['007', '010', None, '0042', '59988', '00']
+
+def test_parallel_matches_serial(tmp_path):
+    source = tmp_path / 'vitals.csv'
+    # Один пропущенный id: вывод не должен зависеть от того, в какой шард он попал
+    write_csv(source, [f'{index:05d}' if index != 1500 else '' for index in range(3000)])
+    for fmt in ('csv', 'jsonl'):
+        serial, parallel = tmp_path / f'serial.{fmt}', tmp_path / f'parallel.{fmt}'
+        score_file(str(source), str(serial), chunk_size=500, keep=['patient_id'])
+        rows, _ = score_file_parallel(str(source), str(parallel), workers=3, shard_size_mb=0.01,
+                                      chunk_size=500, keep=['patient_id'])
+        assert rows == 3000
+        assert parallel.read_bytes() == serial.read_bytes()
+
+def test_quarantine_keeps_input_text(tmp_path):
+    source = tmp_path / 'vitals.csv'
+    source.write_text('patient_id,temp,hr,rr\n001,16,120,20\n002,"38,50",999,20\n003,"37,5","1,200",20\n'
+                      '004,"37,5",90,20\n')
+    output, rejected = tmp_path / 'scores.csv', tmp_path / 'rejected.csv'
+    scored, _, quarantined = score_file(str(source), str(output), keep=['patient_id'], quarantine=str(rejected),
+                                        decimal_comma=True)
+    assert (scored, quarantined) == (1, 3)
+    lines = rejected.read_text().splitlines()
+    # Значения записываются так, как они были во входном файле, а не 16.0 и 120.0
+    assert lines[1].startswith('0,001,16,120,20,')
+    assert lines[2].startswith('1,002,"38,50",999,20,')
+    assert lines[3].startswith('2,003,"37,5","1,200",20,') and lines[3].endswith('hr:ambiguous_comma')
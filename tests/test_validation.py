@@ -0,0 +1,33 @@
+"""
+Проверка входных данных (validation.py): десятичная запятая и коды причин
+"""
+
+import numpy as np
+import pandas as pd
+
+from validation import coerce_numeric, validate
+
+def test_comma_is_not_numeric_by_default():
+    values, invalid, ambiguous = coerce_numeric(pd.Series(['38,5', '38.5', '', None]))
+    assert np.isnan(values[0]) and values[1] == 38.5
+    assert list(invalid) == [True, False, False, False]
+    assert not ambiguous.any()
+
+def test_decimal_comma():
+    column = pd.Series(['38,5', '1,200', '12,345', '0,500', '1,2000', '1.200,5', ' 37,2 '])
+    values, invalid, ambiguous = coerce_numeric(column, decimal_comma=True)
+    assert values[0] == 38.5 and values[3] == 0.5 and values[4] == 1.2 and values[6] == 37.2
+    # Запятая и ровно три цифры — возможно, разделитель тысяч
+    assert list(ambiguous) == [False, True, True, False, False, False, False]
+    assert np.isnan(values[1]) and np.isnan(values[2])
+    assert list(invalid) == [False, False, False, False, False, True, False]
+
+def test_validate_reasons():
+    frame = pd.DataFrame({'hr': ['1,200', '120', '120,5'], 'temp': ['38,5', '38.5', None]})
+    _, valid, reasons = validate(frame)
+    assert list(valid) == [False, True, False]
+    assert reasons == ['temp:not_numeric;hr:not_numeric', 'hr:not_numeric']
+    clean, valid, reasons = validate(frame, decimal_comma=True)
+    assert list(valid) == [False, True, True]
+    assert reasons == ['hr:ambiguous_comma']
+    assert clean['hr'].iloc[2] == 120.5 and clean['temp'].iloc[0] == 38.5
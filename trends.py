@@ -0,0 +1,210 @@
+"""
+Хранилище трендов шкал и прореживание рядов для графиков
+
+Для каждого пациента — кольцевой буфер фиксированной ёмкости на массивах
+NumPy: время измерения и баллы всех шкал. Добавление точки — O(1) без
+выделения памяти; при переполнении перезаписываются самые старые точки.
+
+Перед передачей в Plotly ряд прореживается до заданного числа точек:
+LTTB (Largest-Triangle-Three-Buckets) сохраняет форму кривой, min/max —
+экстремумы каждого интервала (пики баллов не теряются). Объём данных
+графика не зависит от длины истории.
+"""
+
+import numpy as np
+
+from incremental import SCALE_IDS
+
+# Сутки непрерывного мониторинга с частотой 1 Гц
+DEFAULT_CAPACITY = 86_400
+DEFAULT_MAX_POINTS = 1000
+
+TREND_SCALES = ('moews', 'sos', 'sirs')
+TREND_COLORS = {
+    'sirs': '#FF6B6B',
+    'qsofa': '#4ECDC4',
+    'omqsofa': '#45B7D1',
+    'moews': '#96CEB4',
+    'sos': '#E1B12C'
+}
+
+class TrendBuffer:
+    """Кольцевой буфер времени (секунды эпохи) и баллов шкал в порядке SCALE_IDS"""
+
+    __slots__ = ('times', 'scores', 'start', 'size')
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        if capacity <= 0:
+            raise ValueError('Ёмкость буфера должна быть положительной')
+        self.times = np.empty(capacity, dtype=np.float64)
+        self.scores = np.empty((capacity, len(SCALE_IDS)), dtype=np.int16)
+        self.start = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def capacity(self):
+        """Максимальное число точек"""
+        return len(self.times)
+
+    def append(self, timestamp, scores):
+        """Добавление точки: время и баллы всех шкал в порядке SCALE_IDS"""
+        capacity = len(self.times)
+        index = self.start + self.size
+        if index >= capacity:
+            index -= capacity
+        self.times[index] = timestamp
+        self.scores[index] = scores
+        if self.size < capacity:
+            self.size += 1
+        else:
+            self.start = index + 1 if index + 1 < capacity else 0
+
+    def append_results(self, timestamp, results):
+        """Добавление точки по результатам calculate_* всех шкал"""
+        self.append(timestamp, [results[scale_id]['score'] for scale_id in SCALE_IDS])
+
+    def extend(self, times, scores):
+        """Добавление ряда точек (массивы длины n и n × число шкал)"""
+        times = np.asarray(times, dtype=np.float64)
+        scores = np.asarray(scores, dtype=np.int16)
+        capacity = len(self.times)
+        if len(times) >= capacity:
+            times = times[-capacity:]
+            scores = scores[-capacity:]
+            self.times[:] = times
+            self.scores[:] = scores
+            self.start = 0
+            self.size = capacity
+            return
+        index = (self.start + self.size) % capacity
+        head = min(len(times), capacity - index)
+        self.times[index:index + head] = times[:head]
+        self.scores[index:index + head] = scores[:head]
+        self.times[:len(times) - head] = times[head:]
+        self.scores[:len(times) - head] = scores[head:]
+        overflow = self.size + len(times) - capacity
+        if overflow > 0:
+            self.start = (self.start + overflow) % capacity
+        self.size = min(capacity, self.size + len(times))
+
+    def arrays(self):
+        """Время и баллы в хронологическом порядке (без копирования, если буфер не перевёрнут)"""
+        end = self.start + self.size
+        if end <= len(self.times):
+            return self.times[self.start:end], self.scores[self.start:end]
+        end -= len(self.times)
+        return (np.concatenate((self.times[self.start:], self.times[:end])),
+                np.concatenate((self.scores[self.start:], self.scores[:end])))
+
+    def series(self, scale_id):
+        """Время и баллы одной шкалы"""
+        times, scores = self.arrays()
+        return times, scores[:, SCALE_IDS.index(scale_id)]
+
+class TrendStore:
+    """Тренды шкал для множества пациентов"""
+
+    __slots__ = ('capacity', 'buffers')
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.buffers = {}
+
+    def __len__(self):
+        return len(self.buffers)
+
+    def __contains__(self, patient_id):
+        return patient_id in self.buffers
+
+    def buffer(self, patient_id):
+        """Буфер пациента (создаётся при первом обращении)"""
+        buffer = self.buffers.get(patient_id)
+        if buffer is None:
+            buffer = self.buffers[patient_id] = TrendBuffer(self.capacity)
+        return buffer
+
+    def record(self, patient_id, timestamp, scores):
+        """Добавление точки пациента"""
+        self.buffer(patient_id).append(timestamp, scores)
+
+    def discharge(self, patient_id):
+        """Удаление трендов пациента"""
+        self.buffers.pop(patient_id, None)
+
+def minmax_decimate(times, values, buckets):
+    """Минимум и максимум каждого из buckets равных интервалов (до 2 × buckets точек)"""
+    n = len(times)
+    if n <= 2 * buckets:
+        return times, values
+    width = -(-n // buckets)
+    padded = np.pad(values, (0, width * buckets - n), mode='edge').reshape(buckets, width)
+    offsets = np.arange(buckets) * width
+    index = np.concatenate((offsets + padded.argmin(axis=1), offsets + padded.argmax(axis=1)))
+    index = np.unique(np.minimum(index, n - 1))
+    return times[index], values[index]
+
+def lttb(times, values, threshold):
+    """Прореживание Largest-Triangle-Three-Buckets до threshold точек"""
+    n = len(times)
+    if threshold >= n or threshold < 3:
+        return times, values
+    x = np.asarray(times, dtype=np.float64)
+    y = np.asarray(values, dtype=np.float64)
+    # Первая и последняя точки сохраняются, остальные делятся на threshold - 2 интервала
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[:n - 1], edges[:-1]) / counts
+    mean_y = np.add.reduceat(y[:n - 1], edges[:-1]) / counts
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    anchor = 0
+    for bucket in range(threshold - 2):
+        low, high = edges[bucket], edges[bucket + 1]
+        if bucket + 1 < threshold - 2:
+            next_x, next_y = mean_x[bucket + 1], mean_y[bucket + 1]
+        else:
+            next_x, next_y = x[-1], y[-1]
+        ax, ay = x[anchor], y[anchor]
+        # Удвоенная площадь треугольника (опорная точка, кандидат, среднее следующего интервала)
+        area = np.abs((ax - next_x) * (y[low:high] - ay) - (ax - x[low:high]) * (next_y - ay))
+        anchor = low + int(area.argmax())
+        selected[bucket + 1] = anchor
+    return times[selected], values[selected]
+
+DOWNSAMPLERS = {
+    'lttb': lttb,
+    'minmax': lambda times, values, points: minmax_decimate(times, values, max(1, points // 2))
+}
+
+def downsample(times, values, max_points=DEFAULT_MAX_POINTS, method='lttb'):
+    """Ряд, прореженный до max_points точек методом 'lttb' или 'minmax'"""
+    if method not in DOWNSAMPLERS:
+        raise ValueError(f'Неизвестный метод прореживания: {method}')
+    return DOWNSAMPLERS[method](times, values, max_points)
+
+def trend_figure(buffer, scales=TREND_SCALES, max_points=DEFAULT_MAX_POINTS, method='lttb', names=None):
+    """График трендов шкал по буферу с прореживанием каждого ряда до max_points точек"""
+    import plotly.graph_objects as go
+
+    times, scores = buffer.arrays()
+    fig = go.Figure()
+    for scale_id in scales:
+        x, y = downsample(times, scores[:, SCALE_IDS.index(scale_id)], max_points, method)
+        fig.add_trace(go.Scatter(
+            x=(x * 1000).astype('datetime64[ms]'),
+            y=y,
+            mode='lines',
+            line=dict(shape='hv', color=TREND_COLORS[scale_id]),
+            name=(names or {}).get(scale_id, scale_id)
+        ))
+    fig.update_layout(
+        xaxis_title="Время",
+        yaxis_title="Баллы",
+        showlegend=True,
+        margin=dict(t=30)
+    )
+    return fig
@@ -0,0 +1,139 @@
+"""
+Векторная проверка и приведение входных данных перед пакетным расчётом
+
+Числовые столбцы приводятся целиком: текст очищается от пробелов,
+с decimal_comma десятичная запятая («38,5») заменяется точкой, затем
+строки разбираются приведением pyarrow (без pyarrow — pd.to_numeric).
+Без decimal_comma значение с запятой не числовое; с decimal_comma
+значение вида «1,200» (запятая и ровно три цифры после неё) неоднозначно —
+это может быть разделитель тысяч — и тоже не принимается.
+Значение, которое не удалось разобрать, или значение вне допустимого
+диапазона (границы полей ввода приложения) делают строку недопустимой;
+категориальные параметры сверяются со списком вариантов полей ввода.
+Пустые значения допустимы — шкалы считаются по заполненным параметрам.
+
+Недопустимые строки не рассчитываются, а направляются в карантин
+с кодами причин вида «<параметр>:<причина>» через «;».
+"""
+
+import numpy as np
+import pandas as pd
+
+from calculations import CHOICE_OPTIONS, CHOICE_PARAMS, INPUT_RANGES, NUMERIC_PARAMS
+
+# Допустимые значения числовых параметров — границы полей ввода приложения
+RANGES = INPUT_RANGES
+
+NOT_NUMERIC = 'not_numeric'
+AMBIGUOUS_COMMA = 'ambiguous_comma'
+OUT_OF_RANGE = 'out_of_range'
+UNKNOWN_OPTION = 'unknown_option'
+
+# Число с точкой: знак, цифры, необязательная экспонента
+NUMBER_PATTERN = r'^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$'
+# Запятая как разделитель тысяч: «1,200», «12,345», «1,234,567» (но не «0,500»)
+THOUSANDS_PATTERN = r'^[+-]?[1-9]\d{0,2}(,\d{3})+$'
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+# Со pyarrow строки хранятся в памяти Arrow: строковые операции pandas идут через pyarrow.compute
+STRING_DTYPE = 'string' if pa is None else 'string[pyarrow]'
+
+def _parse_floats(text):
+    """Очищенные строки в float64 (NaN — не разобрано)"""
+    if pa is None:
+        return pd.to_numeric(text, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    strings = pa.array(text, type=pa.string(), from_pandas=True)
+    try:
+        return pc.cast(strings, pa.float64()).to_numpy(zero_copy_only=False)
+    except pa.ArrowInvalid:
+        # Приведение падает на первой ошибке: неразборчивые строки заранее заменяются на null
+        number = pc.match_substring_regex(strings, NUMBER_PATTERN)
+        return pc.cast(pc.if_else(number, strings, None), pa.float64()).to_numpy(zero_copy_only=False)
+
+def coerce_numeric(column, decimal_comma=False):
+    """
+    Столбец в float64 (NaN — пусто или не принято), маска значений, которые не удалось
+    разобрать, и маска неоднозначных значений с запятой (только при decimal_comma)
+    """
+    if isinstance(column, pd.Series) and column.dtype.kind in 'biuf':
+        none = np.zeros(len(column), dtype=bool)
+        return column.to_numpy(dtype=np.float64, na_value=np.nan), none, none
+    text = pd.Series(column, dtype=STRING_DTYPE).str.strip()
+    empty = text.isna() | (text == '')
+    ambiguous = np.zeros(len(text), dtype=bool)
+    if decimal_comma:
+        ambiguous = text.str.match(THOUSANDS_PATTERN).to_numpy(dtype=bool, na_value=False)
+        text = text.str.replace(',', '.', regex=False).mask(ambiguous)
+    values = _parse_floats(text)
+    invalid = np.isnan(values) & ~empty.to_numpy(dtype=bool, na_value=True) & ~ambiguous
+    return values, invalid, ambiguous
+
+def coerce_choice(column, options):
+    """Столбец вариантов (object, None — пусто или неизвестно) и маска неизвестных вариантов"""
+    text = pd.Series(column, dtype=STRING_DTYPE).str.strip().str.lower()
+    empty = (text.isna() | (text == '')).to_numpy(dtype=bool, na_value=True)
+    # Номер варианта; len(options) — пусто или не из списка
+    codes = np.full(len(text), len(options))
+    for code, option in enumerate(options):
+        codes[(text == option).to_numpy(dtype=bool, na_value=False)] = code
+    return np.array((*options, None), dtype=object)[codes], (codes == len(options)) & ~empty
+
+def validate(frame, decimal_comma=False):
+    """
+    Проверка блока: (приведённые столбцы параметров в DataFrame, маска допустимых строк,
+    коды причин для недопустимых строк в порядке их следования). decimal_comma —
+    принимать десятичную запятую в числовых значениях
+    """
+    n = len(frame)
+    columns = {}
+    problems = []
+    for key in NUMERIC_PARAMS:
+        if key not in frame:
+            columns[key] = np.full(n, np.nan)
+            continue
+        values, invalid, ambiguous = coerce_numeric(frame[key], decimal_comma)
+        low, high = RANGES[key]
+        with np.errstate(invalid='ignore'):
+            outside = ~np.isnan(values) & ((values < low) | (values > high))
+        columns[key] = np.where(invalid | outside, np.nan, values)
+        problems.append((f'{key}:{NOT_NUMERIC}', invalid))
+        problems.append((f'{key}:{AMBIGUOUS_COMMA}', ambiguous))
+        problems.append((f'{key}:{OUT_OF_RANGE}', outside))
+    for key in CHOICE_PARAMS:
+        if key not in frame:
+            columns[key] = np.full(n, None, dtype=object)
+            continue
+        columns[key], unknown = coerce_choice(frame[key], CHOICE_OPTIONS[key])
+        problems.append((f'{key}:{UNKNOWN_OPTION}', unknown))
+
+    valid = np.ones(n, dtype=bool)
+    for _, mask in problems:
+        valid &= ~mask
+    # Коды причин собираются только для недопустимых строк
+    invalid_rows = np.flatnonzero(~valid)
+    reasons = [[] for _ in invalid_rows]
+    for code, mask in problems:
+        for position in np.flatnonzero(mask[invalid_rows]):
+            reasons[position].append(code)
+    index = frame.index if isinstance(frame, pd.DataFrame) else None
+    # Явный object, чтобы pandas не превращал None в NaN строкового типа
+    clean = pd.DataFrame({
+        key: pd.Series(values, index=index, dtype=object if key in CHOICE_PARAMS else np.float64)
+        for key, values in columns.items()
+    }, index=index)
+    return clean, valid, [';'.join(codes) for codes in reasons]
+
+def quarantine_frame(frame, valid, reasons, first_row=0):
+    """
+    Недопустимые строки блока с номером строки во входном файле и причинами; значения
+    пишутся как есть, поэтому исходный текст сохраняется, только если блок прочитан строками
+    """
+    invalid_rows = np.flatnonzero(~valid)
+    rejected = frame.iloc[invalid_rows].astype('string').reset_index(drop=True)
+    rejected.insert(0, 'row', invalid_rows + first_row)
+    rejected['reasons'] = reasons
+    return rejected
@@ -0,0 +1,150 @@
+"""
+Источник данных и состояние монитора отделения
+
+Показатели поступают в каталог файлов JSONL, которые дописывает внешняя
+система (монитор у постели, МИС). Каждая строка — объект с полем patient_id
+и любыми параметрами шкал; null удаляет значение параметра. При опросе
+читаются только новые полные строки файлов, у которых изменились размер
+или время изменения; позиция чтения каждого файла сохраняется.
+
+Шкалы пересчитываются инкрементально (incremental.WardScorer) только для
+пациентов с новыми данными; такие пациенты попадают в очередь отрисовки.
+Баллы после каждой строки записываются в тренды (trends.TrendStore) со временем
+из поля time (секунды эпохи или ISO 8601) или временем опроса.
+По результатам изменившихся пациентов планировщик (scheduler.ReassessmentScheduler)
+назначает срок следующей оценки и поднимает тревоги при повышении риска.
+Опрос и отрисовка ограничены сроком (deadline): непрочитанные файлы
+и неотрисованные пациенты переходят на следующий цикл.
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+
+from incremental import WardScorer
+from scheduler import ReassessmentScheduler
+from trends import DEFAULT_CAPACITY, TrendStore
+
+class JsonlFeed:
+    """Каталог файлов JSONL с показателями; читает только дописанные строки"""
+
+    def __init__(self, directory, suffix='.jsonl'):
+        self.directory = directory
+        self.suffix = suffix
+        # Путь -> (позиция чтения, размер, время изменения) на момент последнего чтения
+        self.positions = {}
+        self.errors = 0
+        self._cursor = 0
+
+    def _changed_files(self):
+        """Файлы, изменившиеся с последнего чтения: (путь, размер, время изменения)"""
+        try:
+            entries = sorted(os.scandir(self.directory), key=lambda entry: entry.name)
+        except FileNotFoundError:
+            return []
+        changed = []
+        for entry in entries:
+            if not entry.name.endswith(self.suffix) or not entry.is_file():
+                continue
+            stat = entry.stat()
+            known = self.positions.get(entry.path)
+            if known is None or known[1] != stat.st_size or known[2] != stat.st_mtime_ns:
+                changed.append((entry.path, stat.st_size, stat.st_mtime_ns))
+        return changed
+
+    def _read(self, path, size, mtime):
+        """Новые полные строки файла"""
+        offset = self.positions.get(path, (0, 0, 0))[0]
+        if size < offset:
+            # Файл усечён или перезаписан — читаем заново
+            offset = 0
+        with open(path, 'rb') as handle:
+            handle.seek(offset)
+            data = handle.read(size - offset)
+        end = data.rfind(b'\n') + 1
+        self.positions[path] = (offset + end, size, mtime)
+        return data[:end].splitlines()
+
+    def poll(self, deadline=None):
+        """
+        Новые строки показателей в порядке записи: [(patient_id, {параметр: значение})].
+        После deadline (time.perf_counter) оставшиеся файлы читаются при следующем опросе.
+        """
+        updates = []
+        changed = self._changed_files()
+        if not changed:
+            return updates
+        # Чтение начинается с разных файлов, чтобы при нехватке времени ни один не голодал
+        start = self._cursor % len(changed)
+        for index in range(len(changed)):
+            if deadline is not None and index and time.perf_counter() > deadline:
+                self._cursor = start + index
+                break
+            for line in self._read(*changed[(start + index) % len(changed)]):
+                try:
+                    record = json.loads(line)
+                    patient_id = str(record.pop('patient_id'))
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    self.errors += 1
+                    continue
+                updates.append((patient_id, record))
+        return updates
+
+def _timestamp(value, default):
+    """Время строки в секундах эпохи: число или строка ISO 8601, иначе default"""
+    if isinstance(value, (int, float)) and value == value:
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            pass
+    return default
+
+class WardMonitor:
+    """Инкрементальные шкалы пациентов отделения и очередь пациентов для перерисовки"""
+
+    def __init__(self, feed, trend_capacity=DEFAULT_CAPACITY):
+        self.feed = feed
+        self.ward = WardScorer()
+        self.trends = TrendStore(trend_capacity)
+        self.scheduler = ReassessmentScheduler()
+        self.pending = set()
+        self.updated = {}
+
+    def __len__(self):
+        return len(self.ward)
+
+    def patient_ids(self):
+        """Идентификаторы наблюдаемых пациентов"""
+        return list(self.ward.patients)
+
+    def poll(self, deadline=None):
+        """Чтение новых данных и пересчёт шкал изменившихся пациентов; возвращает их число"""
+        now = time.time()
+        changed = set()
+        for patient_id, values in self.feed.poll(deadline):
+            timestamp = _timestamp(values.pop('time', None), now)
+            scorer = self.ward.patient(patient_id)
+            for key, value in values.items():
+                scorer.set(key, value)
+            self.trends.record(patient_id, timestamp, scorer.scores)
+            self.updated[patient_id] = timestamp
+            changed.add(patient_id)
+        for patient_id in changed:
+            self.scheduler.update(patient_id, self.ward.compact_results(patient_id), self.updated[patient_id])
+        self.pending.update(changed)
+        return len(changed)
+
+    def drain(self, deadline=None):
+        """Пациенты из очереди перерисовки с текущими результатами (ScaleResult), пока не истёк deadline"""
+        while self.pending:
+            if deadline is not None and time.perf_counter() > deadline:
+                return
+            patient_id = self.pending.pop()
+            yield patient_id, self.ward.compact_results(patient_id)
+
+    def results(self, patient_id):
+        """Текущие результаты всех шкал пациента"""
+        return self.ward.results(patient_id)